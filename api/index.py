@@ -1,10 +1,73 @@
 
 # api/index.py
-from fastapi import FastAPI, Response
-from pathlib import Path
-import json
-
-app = FastAPI()
+import hmac
+import logging
+import os
+import sqlite3
+from collections.abc import Mapping
+from contextlib import asynccontextmanager
+from fastapi import Body, Depends, FastAPI, Header, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from html import escape
+from pydantic import BaseModel, Field, ValidationError
+from typing import Any
+
+from flashcards.assets import ASSET_CACHE_CONTROL, Asset, AssetBundle
+from flashcards.decks import DECKS, Deck, card_id, get_deck, get_hsk_deck, render_deck_cards
+from flashcards.distractors import DistractorEngine
+from flashcards.edits import EditLog
+from flashcards.events import Answer, EventPipeline, EventStore
+from flashcards.freeze import load as load_frozen
+from flashcards.metrics import REGISTRY, MetricsMiddleware, span
+from flashcards.precache import build_manifest, external_urls
+from flashcards.projection import check_budget, dumps, project_card, project_deck, project_options
+from flashcards.quiz import DEFAULT_BATCH, DEFAULT_SEED, MAX_BATCH, Quiz, choices
+from flashcards.render import RenderCache, Rendered, cached_response
+from flashcards.review import GRADE_CORRECT, GRADE_INCORRECT, ReviewStore, Scheduler
+from flashcards.search import SearchIndex, search_all
+from flashcards.store import DeckStore, Snapshot
+from flashcards.tones import to_tone_marks_many
+
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    events.start()
+    yield
+    # Write any review answers still waiting for the background flush.
+    reviews.store.close()
+    # Count queued answer events and checkpoint them.
+    await events.close()
+
+app = FastAPI(lifespan=lifespan)
+# Server-Timing on every response, plus the counters behind /metrics.
+app.add_middleware(MetricsMiddleware)
+
+# "name:token,name:token"; the name is recorded as the actor of each edit.
+ADMIN_TOKENS = {
+    token.strip(): name.strip()
+    for name, _, token in (e.partition(":") for e in os.environ.get("FLASHCARDS_ADMIN_TOKENS", "").split(","))
+    if name.strip() and token.strip()
+}
+
+# Parsed once per process; re-read only when data.json changes on disk.
+# With admin tokens, card edits are logged to SQLite and overlaid per deck.
+store = DeckStore(edits=EditLog() if ADMIN_TOKENS else None)
+# Finished page bytes per route, rebuilt only when the snapshot version changes.
+pages = RenderCache()
+# Pages pre-rendered at build time (python -m flashcards.freeze), if built from this code.
+frozen = load_frozen()
+if frozen is not None:
+    pages.preload(frozen.entries)
+    store.trusted_versions.add(frozen.data_version)
+# Quiz batches keyed by (deck, seed, cursor, n); bounded, since callers choose the seed.
+quiz_batches = RenderCache(max_entries=1024)
+# Shared JS/CSS, served under content-hashed names so browsers can cache them forever.
+assets = AssetBundle()
+# Per-learner spaced-repetition state; answers are flushed to SQLite in the background.
+reviews = Scheduler(ReviewStore())
+# Answer events from the games, counted per card and distractor; checkpointed to SQLite.
+events = EventPipeline(EventStore())
 
 # Homepage HTML
 HOMEPAGE_HTML = r"""<!doctype html>
@@ -15,11 +78,7 @@ HOMEPAGE_HTML = r"""<!doctype html>
 <title>Mandarin Learning Helper by Kexin</title>
 <script src="https://cdn.tailwindcss.com"></script>
 <link href="https://fonts.googleapis.com/css2?family=Inter:wght@400;600;800&display=swap" rel="stylesheet">
-<style>
-  body { font-family: 'Inter', sans-serif; }
-  .btn { transition: transform .15s ease; }
-  .btn:hover { transform: translateY(-1px); }
-</style>
+<link href="__APP_CSS__" rel="stylesheet">
 </head>
 <body class="bg-gray-100 text-gray-800 flex items-center justify-center min-h-screen p-4">
 <div class="w-full max-w-2xl mx-auto bg-white rounded-2xl shadow-lg p-8 md:p-12">
@@ -30,50 +89,7 @@ HOMEPAGE_HTML = r"""<!doctype html>
 
   <main class="space-y-6">
     <div class="grid grid-cols-1 gap-6">
-      <!-- Game 1: Pinyin Listening -->
-      <div class="bg-gradient-to-br from-indigo-50 to-purple-50 rounded-xl p-6 border border-indigo-200">
-        <h2 class="text-xl font-bold text-indigo-900 mb-3">🎵 Pinyin Listening Game</h2>
-        <p class="text-gray-700 mb-4">Listen to Chinese words and choose the correct pinyin pronunciation.</p>
-        <a href="/game/pinyin" class="w-full bg-indigo-600 text-white px-6 py-3 rounded-lg font-semibold hover:bg-indigo-700 btn block text-center">
-          Play Game
-        </a>
-      </div>
-
-      <!-- Game 2: HSK Lesson 4-6 -->
-      <div class="bg-gradient-to-br from-green-50 to-blue-50 rounded-xl p-6 border border-green-200">
-        <h2 class="text-xl font-bold text-green-900 mb-3">📚 HSK 1 Lesson 4-6</h2>
-        <p class="text-gray-700 mb-4">Learn vocabulary with English to Chinese flash cards including pinyin.</p>
-        <a href="/game/hsk-4-6" class="w-full bg-green-600 text-white px-6 py-3 rounded-lg font-semibold hover:bg-green-700 btn block text-center">
-          Play Game
-        </a>
-      </div>
-
-      <!-- Game 3: HSK Lesson 7-9 -->
-      <div class="bg-gradient-to-br from-orange-50 to-pink-50 rounded-xl p-6 border border-orange-200">
-        <h2 class="text-xl font-bold text-orange-900 mb-3">📖 HSK 1 Lesson 7-9</h2>
-        <p class="text-gray-700 mb-4">Continue learning with more vocabulary flash cards and pinyin practice.</p>
-        <a href="/game/hsk-7-9" class="w-full bg-orange-600 text-white px-6 py-3 rounded-lg font-semibold hover:bg-orange-700 btn block text-center">
-          Play Game
-        </a>
-      </div>
-
-      <!-- Game 4: HSK Lesson 10-12 -->
-      <div class="bg-gradient-to-br from-purple-50 to-indigo-50 rounded-xl p-6 border border-purple-200">
-        <h2 class="text-xl font-bold text-purple-900 mb-3">🎯 HSK 1 Lesson 10-12</h2>
-        <p class="text-gray-700 mb-4">Advanced vocabulary with numbers, actions, and daily activities.</p>
-        <a href="/game/hsk-10-12" class="w-full bg-purple-600 text-white px-6 py-3 rounded-lg font-semibold hover:bg-purple-700 btn block text-center">
-          Play Game
-        </a>
-      </div>
-
-      <!-- Game 5: HSK Lesson 13-15 -->
-      <div class="bg-gradient-to-br from-teal-50 to-cyan-50 rounded-xl p-6 border border-teal-200">
-        <h2 class="text-xl font-bold text-teal-900 mb-3">🍽️ HSK 1 Lesson 13-15</h2>
-        <p class="text-gray-700 mb-4">Learn food vocabulary, restaurants, and directional words.</p>
-        <a href="/game/hsk-13-15" class="w-full bg-teal-600 text-white px-6 py-3 rounded-lg font-semibold hover:bg-teal-700 btn block text-center">
-          Play Game
-        </a>
-      </div>
+__DECK_CARDS__
     </div>
 
     <div class="text-center mt-8">
@@ -81,6 +97,7 @@ HOMEPAGE_HTML = r"""<!doctype html>
     </div>
   </main>
 </div>
+<script src="__APP_JS__"></script>
 </body>
 </html>"""
 
@@ -93,14 +110,7 @@ PINYIN_GAME_HTML = r"""<!doctype html>
 <title>Which one are you hearing?</title>
 <script src="https://cdn.tailwindcss.com"></script>
 <link href="https://fonts.googleapis.com/css2?family=Inter:wght@400;600;800&display=swap" rel="stylesheet">
-<style>
-  body { font-family: 'Inter', sans-serif; }
-  .card { min-height: 18rem; display:flex; flex-direction:column; justify-content:center; align-items:center; }
-  .btn { transition: transform .15s ease; }
-  .btn:hover { transform: translateY(-1px); }
-  .correct { background-color:#10b981 !important; color:#fff !important; border-color:#059669 !important; }
-  .incorrect { background-color:#ef4444 !important; color:#fff !important; border-color:#dc2626 !important; }
-</style>
+<link href="__APP_CSS__" rel="stylesheet">
 </head>
 <body class="bg-gray-100 text-gray-800 flex items-center justify-center min-h-screen p-4">
 <div class="w-full max-w-xl mx-auto bg-white rounded-2xl shadow-lg p-6 md:p-8">
@@ -146,141 +156,8 @@ PINYIN_GAME_HTML = r"""<!doctype html>
   </main>
 </div>
 
-<script>
-  const DATA = __DATA__;
-  const synth = window.speechSynthesis;
-
-  let items = Array.isArray(DATA?.pinyinPairs) ? DATA.pinyinPairs.slice(0) : [];
-  let i = 0;
-  let current = null; // {text, en, correct, distractor}
-
-  const playBtn = document.getElementById('play');
-  const repeatBtn = document.getElementById('repeat');
-  const nextBtn = document.getElementById('next');
-  const choicesDiv = document.getElementById('choices');
-  const counter = document.getElementById('counter');
-  const feedback = document.getElementById('feedback');
-  const promptNode = document.getElementById('prompt');
-  const meaningNode = document.getElementById('meaning');
-
-  // ---- Pinyin tone mark conversion (display only) ----
-  function toToneMarks(pinyinStr){
-    if(!pinyinStr) return "";
-    // Per-syllable: find trailing tone digit 1-4 (0/5 = neutral), apply to vowel.
-    const toneMap = {
-      'a': ['ā','á','ǎ','à'], 'e': ['ē','é','ě','è'], 'i': ['ī','í','ǐ','ì'],
-      'o': ['ō','ó','ǒ','ò'], 'u': ['ū','ú','ǔ','ù'], 'ü': ['ǖ','ǘ','ǚ','ǜ']
-    };
-    function convertSyllable(syl){
-      if(!syl) return syl;
-      // Handle ü written as "u:" or "v"
-      syl = syl.replace(/u:/gi,'ü').replace(/v/gi,'ü');
-      const m = syl.match(/^([a-zāēīōūǖü]+)([1-5])$/i);
-      let base = syl, tone = 0;
-      if(m){
-        base = m[1];
-        tone = parseInt(m[2],10);
-      }
-      if(tone===0 || tone===5 || !/[aeiouü]/i.test(base)) return base;
-      const lower = base.toLowerCase();
-      // Priority: a > e > o; for iu/ui mark second vowel
-      let idx = -1;
-      if(lower.includes('a')) idx = lower.indexOf('a');
-      else if(lower.includes('e')) idx = lower.indexOf('e');
-      else if(lower.includes('ou')) idx = lower.indexOf('o');
-      else if(lower.includes('o')) idx = lower.indexOf('o');
-      else if(lower.includes('iu')) idx = lower.indexOf('u'); // second in "iu"
-      else if(lower.includes('ui')) idx = lower.indexOf('i'); // second in "ui"
-      else {
-        // pick last vowel
-        const last = Math.max(lower.lastIndexOf('i'), lower.lastIndexOf('u'), lower.lastIndexOf('ü'));
-        idx = last;
-      }
-      if(idx < 0) return base;
-      const ch = base[idx];
-      const key = ch.toLowerCase();
-      const rep = toneMap[key] ? toneMap[key][tone-1] : ch;
-      // preserve case
-      const repFinal = (ch===ch.toUpperCase()) ? rep.toUpperCase() : rep;
-      return base.slice(0,idx) + repFinal + base.slice(idx+1);
-    }
-    // Split by space to keep multi-syllable spacing intact
-    return pinyinStr.split(/\s+/).map(convertSyllable).join(' ');
-  }
-
-  function shuffle(arr){
-    for(let k=arr.length-1;k>0;k--){
-      const j = Math.floor(Math.random()*(k+1));
-      [arr[k],arr[j]]=[arr[j],arr[k]];
-    }
-    return arr;
-  }
-  function speak(text){
-    if(!text) return;
-    if(synth.speaking) synth.cancel();
-    const u = new SpeechSynthesisUtterance(text);
-    u.lang = 'zh-CN';
-    u.rate = 0.95;
-    synth.speak(u);
-  }
-  function setCounter(){
-    counter.textContent = `${items.length ? i+1 : 0} / ${items.length}`;
-  }
-  function render(){
-    if(!items.length){
-      choicesDiv.innerHTML = '<p class="text-gray-500 col-span-2">No data found. Provide pinyinPairs in data.json.</p>';
-      counter.textContent = '0 / 0';
-      promptNode.textContent = '';
-      meaningNode.textContent = '';
-      feedback.textContent = '';
-      return;
-    }
-    feedback.textContent = '';
-    feedback.className = 'h-6 text-center font-medium mt-4';
-
-    const q = items[i % items.length];
-    current = q;
-
-    promptNode.textContent = q.text || '';
-    meaningNode.textContent = q.en || '';
-
-    const opts = shuffle([q.correct, q.distractor]);
-    choicesDiv.innerHTML = '';
-    opts.forEach(opt => {
-      const b = document.createElement('button');
-      b.textContent = toToneMarks(opt);       // display with accents
-      b.dataset.val = opt;                    // keep original numbered value for checking
-      b.className = 'w-full px-4 py-3 border border-gray-300 rounded-lg text-lg font-semibold bg-white text-gray-800 hover:bg-gray-50 btn';
-      b.onclick = () => check(b.dataset.val);
-      choicesDiv.appendChild(b);
-    });
-
-    setTimeout(()=> speak(q.text || ''), 150);
-    setCounter();
-  }
-  function check(selectedVal){
-    const buttons = choicesDiv.querySelectorAll('button');
-    buttons.forEach(btn => {
-      btn.disabled = true;
-      const isCorrect = btn.dataset.val === current.correct;
-      if(isCorrect) btn.classList.add('correct');
-      else if(btn.dataset.val === selectedVal) btn.classList.add('incorrect');
-    });
-    if(selectedVal === current.correct){
-      feedback.textContent = 'Correct';
-      feedback.classList.add('text-green-600');
-    } else {
-      feedback.textContent = 'Incorrect';
-      feedback.classList.add('text-red-600');
-    }
-  }
-
-  playBtn.addEventListener('click', () => speak(current?.text || ''));
-  repeatBtn.addEventListener('click', () => speak(current?.text || ''));
-  nextBtn.addEventListener('click', () => { i = (i + 1) % (items.length || 1); render(); });
-
-  render();
-</script>
+<script src="__APP_JS__"></script>
+<script>startPinyinGame(__DATA__);</script>
 </body>
 </html>"""
 
@@ -293,14 +170,7 @@ HSK_GAME_HTML = r"""<!doctype html>
 <title>__LESSON_TITLE__ Flash Cards</title>
 <script src="https://cdn.tailwindcss.com"></script>
 <link href="https://fonts.googleapis.com/css2?family=Inter:wght@400;600;800&display=swap" rel="stylesheet">
-<style>
-  body { font-family: 'Inter', sans-serif; }
-  .card { min-height: 18rem; display:flex; flex-direction:column; justify-content:center; align-items:center; }
-  .btn { transition: transform .15s ease; }
-  .btn:hover { transform: translateY(-1px); }
-  .correct { background-color:#10b981 !important; color:#fff !important; border-color:#059669 !important; }
-  .incorrect { background-color:#ef4444 !important; color:#fff !important; border-color:#dc2626 !important; }
-</style>
+<link href="__APP_CSS__" rel="stylesheet">
 </head>
 <body class="bg-gray-100 text-gray-800 flex items-center justify-center min-h-screen p-4">
 <div class="w-full max-w-2xl mx-auto bg-white rounded-2xl shadow-lg p-6 md:p-8">
@@ -338,197 +208,448 @@ HSK_GAME_HTML = r"""<!doctype html>
   </main>
 </div>
 
-<script>
-  const DATA = __DATA__;
-
-  let items = Array.isArray(DATA?.hskFlashcards) ? DATA.hskFlashcards.slice(0) : [];
-  let i = 0;
-  let current = null;
-
-  const choicesDiv = document.getElementById('choices');
-  const counter = document.getElementById('counter');
-  const feedback = document.getElementById('feedback');
-  const englishWordNode = document.getElementById('englishWord');
-  const nextBtn = document.getElementById('next');
-
-  function shuffle(arr){
-    for(let k=arr.length-1;k>0;k--){
-      const j = Math.floor(Math.random()*(k+1));
-      [arr[k],arr[j]]=[arr[j],arr[k]];
-    }
-    return arr;
-  }
-
-  // ---- Pinyin tone mark conversion (display only) ----
-  function toToneMarks(pinyinStr){
-    if(!pinyinStr) return "";
-    // Per-syllable: find trailing tone digit 1-4 (0/5 = neutral), apply to vowel.
-    const toneMap = {
-      'a': ['ā','á','ǎ','à'], 'e': ['ē','é','ě','è'], 'i': ['ī','í','ǐ','ì'],
-      'o': ['ō','ó','ǒ','ò'], 'u': ['ū','ú','ǔ','ù'], 'ü': ['ǖ','ǘ','ǚ','ǜ']
-    };
-    function convertSyllable(syl){
-      if(!syl) return syl;
-      // Handle ü written as "u:" or "v"
-      syl = syl.replace(/u:/gi,'ü').replace(/v/gi,'ü');
-      const m = syl.match(/^([a-zāēīōūǖü]+)([1-5])$/i);
-      let base = syl, tone = 0;
-      if(m){
-        base = m[1];
-        tone = parseInt(m[2],10);
-      }
-      if(tone===0 || tone===5 || !/[aeiouü]/i.test(base)) return base;
-      const lower = base.toLowerCase();
-      // Priority: a > e > o; for iu/ui mark second vowel
-      let idx = -1;
-      if(lower.includes('a')) idx = lower.indexOf('a');
-      else if(lower.includes('e')) idx = lower.indexOf('e');
-      else if(lower.includes('ou')) idx = lower.indexOf('o');
-      else if(lower.includes('o')) idx = lower.indexOf('o');
-      else if(lower.includes('iu')) idx = lower.indexOf('u'); // second in "iu"
-      else if(lower.includes('ui')) idx = lower.indexOf('i'); // second in "ui"
-      else {
-        // pick last vowel
-        const last = Math.max(lower.lastIndexOf('i'), lower.lastIndexOf('u'), lower.lastIndexOf('ü'));
-        idx = last;
-      }
-      if(idx < 0) return base;
-      const ch = base[idx];
-      const key = ch.toLowerCase();
-      const rep = toneMap[key] ? toneMap[key][tone-1] : ch;
-      // preserve case
-      const repFinal = (ch===ch.toUpperCase()) ? rep.toUpperCase() : rep;
-      return base.slice(0,idx) + repFinal + base.slice(idx+1);
-    }
-    // Split by space to keep multi-syllable spacing intact
-    return pinyinStr.split(/\s+/).map(convertSyllable).join(' ');
-  }
-
-  function setCounter(){
-    counter.textContent = `${items.length ? i+1 : 0} / ${items.length}`;
-  }
-
-  function render(){
-    if(!items.length){
-      choicesDiv.innerHTML = '<p class="text-gray-500 col-span-2">No data found. Provide hskFlashcards in data.json.</p>';
-      counter.textContent = '0 / 0';
-      englishWordNode.textContent = '';
-      feedback.textContent = '';
-      return;
-    }
-    feedback.textContent = '';
-    feedback.className = 'h-6 text-center font-medium mt-4';
-
-    const q = items[i % items.length];
-    current = q;
-
-    englishWordNode.textContent = q.english || '';
-
-    // Create all options (correct + distractors)
-    const allOptions = [q.correct, ...q.distractors];
-    const shuffledOptions = shuffle([...allOptions]);
-
-    choicesDiv.innerHTML = '';
-    shuffledOptions.forEach(opt => {
-      const button = document.createElement('button');
-      button.innerHTML = `
-        <div class="text-2xl md:text-3xl font-bold mb-2">${opt.chinese}</div>
-        <div class="text-sm text-gray-600">${toToneMarks(opt.pinyin)}</div>
-      `;
-      button.dataset.chinese = opt.chinese;
-      button.dataset.pinyin = opt.pinyin;
-      button.className = 'w-full px-6 py-4 border border-gray-300 rounded-lg bg-white text-gray-800 hover:bg-gray-50 btn text-center';
-      button.onclick = () => check(opt.chinese);
-      choicesDiv.appendChild(button);
-    });
-
-    setCounter();
-  }
-
-  function check(selectedChinese){
-    const buttons = choicesDiv.querySelectorAll('button');
-    buttons.forEach(btn => {
-      btn.disabled = true;
-      const isCorrect = btn.dataset.chinese === current.correct.chinese;
-      if(isCorrect) btn.classList.add('correct');
-      else if(btn.dataset.chinese === selectedChinese) btn.classList.add('incorrect');
-    });
-    if(selectedChinese === current.correct.chinese){
-      feedback.textContent = 'Correct! 🎉';
-      feedback.classList.add('text-green-600');
-    } else {
-      feedback.textContent = 'Incorrect. The correct answer is ' + current.correct.chinese + ' (' + toToneMarks(current.correct.pinyin) + ')';
-      feedback.classList.add('text-red-600');
-    }
-  }
-
-  nextBtn.addEventListener('click', () => { i = (i + 1) % (items.length || 1); render(); });
-
-  render();
-</script>
+<script src="__APP_JS__"></script>
+<script>startHskGame(__DATA__);</script>
 </body>
 </html>"""
 
+def _link_assets(template: str) -> str:
+    return template.replace("__APP_CSS__", assets.url("app.css")).replace("__APP_JS__", assets.url("app.js"))
+
+HOMEPAGE_HTML = _link_assets(HOMEPAGE_HTML)
+PINYIN_GAME_HTML = _link_assets(PINYIN_GAME_HTML)
+HSK_GAME_HTML = _link_assets(HSK_GAME_HTML)
+
+def render_home() -> Rendered:
+    return pages.get(
+        "home", "static", lambda: HOMEPAGE_HTML.replace("__DECK_CARDS__", render_deck_cards()),
+    )
+
+def _deck_payload(deck: Deck, snapshot: Snapshot) -> str:
+    cards = snapshot.deck(deck.key)
+    with span("project"):
+        projected = project_deck(deck.kind, cards)
+    # What to pass to /api/decks/<id>/delta as ?base=&since=.
+    projected["base"] = snapshot.base or snapshot.version
+    projected["version"] = snapshot.edit_version(deck.key)
+    with span("dumps"):
+        payload = dumps(projected)
+    check_budget("deck", deck.kind, f"/api/decks/{deck.id}", payload)
+    return payload
+
+def _quiz_payload(deck: Deck, snapshot: Snapshot, seed: int, cursor: int, n: int) -> str:
+    quiz = deck_quiz(deck, snapshot, seed)
+    with span("project"):
+        batch = quiz.batch(cursor, n)
+    with span("dumps"):
+        return dumps(batch)
+
+def _render_deck(deck: Deck, snapshot: Snapshot) -> str:
+    # Pages embed only the first batch of the default quiz; app.js prefetches the rest.
+    payload = _quiz_payload(deck, snapshot, DEFAULT_SEED, 0, DEFAULT_BATCH)
+    check_budget("page", deck.kind, deck.path, payload)
+    with span("replace"):
+        if deck.kind == "pinyin":
+            return PINYIN_GAME_HTML.replace("__DATA__", payload)
+        html = HSK_GAME_HTML.replace("__DATA__", payload)
+        return html.replace("__LESSON_TITLE__", escape(deck.title))
+
+def render_asset(asset: Asset) -> Rendered:
+    return pages.get(f"asset:{asset.name}", asset.digest, lambda: asset.body, media_type=asset.media_type)
+
+# Browsers fetch /sw.js on every navigation check; it must revalidate, never be immutable.
+SERVICE_WORKER_CACHE_CONTROL = "no-cache"
+
+def render_service_worker() -> Rendered:
+    worker = assets.service_worker
+    return pages.get("sw", worker.digest, lambda: worker.body, media_type=worker.media_type)
+
+def render_deck_page(deck: Deck) -> Rendered:
+    snapshot = store.snapshot()
+    return pages.get(deck.id, snapshot.deck_version(deck.key), lambda: _render_deck(deck, snapshot))
+
+def render_deck_json(deck: Deck) -> Rendered:
+    snapshot = store.snapshot()
+    return pages.get(
+        f"json:{deck.id}", snapshot.deck_version(deck.key), lambda: _deck_payload(deck, snapshot),
+        media_type="application/json",
+    )
+
+_card_index: dict[str, tuple[str, dict[str, dict]]] = {}
+
+def deck_cards(deck: Deck, snapshot: Snapshot) -> dict[str, dict]:
+    """Cards of ``deck`` keyed by :func:`card_id`, in file order (first duplicate wins)."""
+    cached = _card_index.get(deck.id)
+    version = snapshot.deck_version(deck.key)
+    if cached is None or cached[0] != version:
+        cards: dict[str, dict] = {}
+        for position, card in enumerate(snapshot.deck(deck.key)):
+            if isinstance(card, Mapping):
+                if cards.setdefault(card_id(card), card) is not card:
+                    # Same prompt and answer: one id, so only the first is quizzed, reviewed or found.
+                    logger.warning("%s[%d] repeats an earlier card (id %s) and is skipped; "
+                                   "see python -m flashcards.compile_decks", deck.key, position, card_id(card))
+        cached = _card_index[deck.id] = (version, cards)
+    return cached[1]
+
+_quizzes: dict[tuple[str, int], tuple[str, Quiz]] = {}
+
+# Seeded card orders kept per process; the oldest is dropped beyond this.
+MAX_QUIZZES = 64
+
+def deck_quiz(deck: Deck, snapshot: Snapshot, seed: int) -> Quiz:
+    """The card order for ``(deck, seed)``, rebuilt once per snapshot."""
+    cached = _quizzes.get((deck.id, seed))
+    version = snapshot.deck_version(deck.key)
+    if cached is None or cached[0] != version:
+        quiz = Quiz.build(deck, deck_cards(deck, snapshot), seed)
+        _quizzes.pop((deck.id, seed), None)
+        while len(_quizzes) >= MAX_QUIZZES:
+            _quizzes.pop(next(iter(_quizzes)), None)
+        cached = _quizzes[(deck.id, seed)] = (version, quiz)
+    return cached[1]
+
+_answers: dict[str, tuple[str, list[dict[str, str]]]] = {}
+_engine: tuple[tuple[str, ...], DistractorEngine] | None = None
+
+def distractor_engine(snapshot: Snapshot) -> DistractorEngine:
+    """Distractor indexes over every HSK deck; a deck's answers are re-read only when it changes."""
+    global _engine
+    hsk = [d for d in DECKS.values() if d.kind == "hsk"]
+    versions = tuple(snapshot.deck_version(d.key) for d in hsk)
+    if _engine is None or _engine[0] != versions:
+        for d, version in zip(hsk, versions):
+            if _answers.get(d.id, ("",))[0] != version:
+                _answers[d.id] = (version, DistractorEngine.answers(snapshot.deck(d.key)))
+        _engine = (versions, DistractorEngine.combine(_answers[d.id][1] for d in hsk))
+    return _engine[1]
+
+_search: dict[str, tuple[str, SearchIndex]] = {}
+
+def search_index(deck: Deck, snapshot: Snapshot) -> SearchIndex:
+    """Word lookup indexes over one deck, rebuilt once per deck version."""
+    cached = _search.get(deck.id)
+    version = snapshot.deck_version(deck.key)
+    if cached is None or cached[0] != version:
+        with span("index"):
+            index = SearchIndex.build([(deck, snapshot.deck(deck.key))])
+        cached = _search[deck.id] = (version, index)
+    return cached[1]
+
+def _require_deck(deck_id: str) -> Deck:
+    deck = get_deck(deck_id)
+    if deck is None:
+        raise HTTPException(status_code=404, detail=f"Unknown deck: {deck_id}")
+    return deck
+
+def render_quiz_batch(deck: Deck, snapshot: Snapshot, seed: int, cursor: int, n: int) -> Rendered:
+    return quiz_batches.get(
+        f"{deck.id}:{seed}:{cursor}:{n}", snapshot.deck_version(deck.key),
+        lambda: _quiz_payload(deck, snapshot, seed, cursor, n), media_type="application/json",
+    )
+
+def _page_routes() -> list[tuple[str, Rendered]]:
+    routes = [("/", render_home())]
+    for deck in DECKS.values():
+        page = render_deck_page(deck)
+        routes.append((deck.path, page))
+        if deck.kind == "hsk":
+            routes.append((f"/game/hsk-{deck.lesson}", page))
+        routes.append((f"/api/decks/{deck.id}", render_deck_json(deck)))
+    routes += [(asset.url, render_asset(asset)) for asset in assets.assets]
+    return routes
+
+def precache_routes() -> list[tuple[str, Rendered]]:
+    """Everything the service worker keeps offline: pages, deck JSON, assets and
+    every default-seed quiz batch, under the exact URLs app.js requests."""
+    snapshot = store.snapshot()
+    routes = _page_routes()
+    for deck in DECKS.values():
+        total = len(deck_quiz(deck, snapshot, DEFAULT_SEED).ids)
+        for cursor in range(DEFAULT_BATCH, total, DEFAULT_BATCH):
+            url = f"/api/quiz?deck={deck.id}&seed={DEFAULT_SEED}&n={DEFAULT_BATCH}&cursor={cursor}"
+            routes.append((url, render_quiz_batch(deck, snapshot, DEFAULT_SEED, cursor, DEFAULT_BATCH)))
+    return routes
+
+def render_precache_manifest() -> Rendered:
+    snapshot = store.snapshot()
+    return pages.get(
+        "precache", snapshot.version,
+        lambda: dumps(build_manifest(precache_routes(), external_urls(
+            [HOMEPAGE_HTML, PINYIN_GAME_HTML, HSK_GAME_HTML]))),
+        media_type="application/json",
+    )
+
+def static_routes() -> list[tuple[str, Rendered]]:
+    """Every GET response that is a pure function of the templates and data.json."""
+    return _page_routes() + [
+        ("/precache-manifest.json", render_precache_manifest()),
+        ("/sw.js", render_service_worker()),
+    ]
+
 @app.get("/")
-def homepage() -> Response:
-    return Response(content=HOMEPAGE_HTML, media_type="text/html")
+def homepage(request: Request) -> Response:
+    return cached_response(request, render_home())
 
 @app.get("/game/pinyin")
-def pinyin_game() -> Response:
-    data_path = Path(__file__).parent.parent / "data.json"
-    try:
-        data = json.loads(data_path.read_text(encoding="utf-8"))
-    except Exception:
-        data = {"pinyinPairs": []}
-    html = PINYIN_GAME_HTML.replace("__DATA__", json.dumps(data, ensure_ascii=False))
-    return Response(content=html, media_type="text/html")
-
-@app.get("/game/hsk-4-6")
-def hsk_game_4_6() -> Response:
-    data_path = Path(__file__).parent.parent / "data.json"
+def pinyin_game(request: Request) -> Response:
+    return cached_response(request, render_deck_page(DECKS["pinyin"]))
+
+# "/game/hsk-{lesson}" keeps the original per-lesson URLs working.
+@app.get("/game/hsk/{lesson}")
+@app.get("/game/hsk-{lesson}")
+def hsk_game(request: Request, lesson: str) -> Response:
+    deck = get_hsk_deck(lesson)
+    if deck is None:
+        raise HTTPException(status_code=404, detail=f"Unknown deck: {lesson}")
+    return cached_response(request, render_deck_page(deck))
+
+@app.get("/api/decks/{deck_id}")
+def deck_json(request: Request, deck_id: str) -> Response:
+    return cached_response(request, render_deck_json(_require_deck(deck_id)))
+
+@app.get("/precache-manifest.json")
+def precache_manifest(request: Request) -> Response:
+    return cached_response(request, render_precache_manifest())
+
+@app.get("/sw.js")
+def service_worker(request: Request) -> Response:
+    return cached_response(request, render_service_worker(), cache_control=SERVICE_WORKER_CACHE_CONTROL)
+
+@app.get("/static/{filename}")
+def static_asset(request: Request, filename: str) -> Response:
+    asset = assets.lookup(filename)
+    if asset is None:
+        raise HTTPException(status_code=404, detail=f"Unknown asset: {filename}")
+    return cached_response(request, render_asset(asset), cache_control=ASSET_CACHE_CONTROL)
+
+class PinyinBatch(BaseModel):
+    pinyin: list[str] = Field(max_length=10_000)
+
+@app.post("/api/pinyin/tone-marks")
+def pinyin_tone_marks(batch: PinyinBatch) -> dict:
+    """Bulk-convert numbered pinyin ("ni3 hao3") to tone marks ("nǐ hǎo")."""
+    return {"pinyin": to_tone_marks_many(batch.pinyin)}
+
+def _reviews_unavailable(e: Exception) -> HTTPException:
+    logger.warning("Review history in %s is unavailable: %s", reviews.store.path, e)
+    return HTTPException(status_code=503, detail="Review history is unavailable")
+
+@app.get("/api/review/next")
+def review_next(deck: str, learner: str = Query(min_length=1, max_length=64)) -> dict:
+    d = _require_deck(deck)
+    snapshot = store.snapshot()
+    cards = deck_cards(d, snapshot)
     try:
-        full_data = json.loads(data_path.read_text(encoding="utf-8"))
-        data = {"hskFlashcards": full_data.get("hskLesson4to6", [])}
-    except Exception:
-        data = {"hskFlashcards": []}
-    html = HSK_GAME_HTML.replace("__DATA__", json.dumps(data, ensure_ascii=False))
-    html = html.replace("__LESSON_TITLE__", "HSK 1 Lesson 4-6")
-    return Response(content=html, media_type="text/html")
-
-@app.get("/game/hsk-7-9")
-def hsk_game_7_9() -> Response:
-    data_path = Path(__file__).parent.parent / "data.json"
+        state = reviews.next(learner, d.id, cards, snapshot.deck_version(d.key))
+    except (sqlite3.Error, OSError) as e:
+        raise _reviews_unavailable(e)
+    if state is None:
+        return {"deck": d.id, "card": None}
+    return {
+        "deck": d.id,
+        "id": state.card,
+        "card": project_card(d.kind, cards[state.card]),
+        "due": state.due,
+        "new": state.is_new,
+    }
+
+class ReviewAnswer(BaseModel):
+    learner: str = Field(min_length=1, max_length=64)
+    deck: str
+    card: str
+    correct: bool | None = None
+    grade: int | None = Field(default=None, ge=0, le=5)
+
+@app.post("/api/review/answer")
+def review_answer(answer: ReviewAnswer) -> dict:
+    d = _require_deck(answer.deck)
+    if answer.grade is not None:
+        grade = answer.grade
+    elif answer.correct is not None:
+        grade = GRADE_CORRECT if answer.correct else GRADE_INCORRECT
+    else:
+        raise HTTPException(status_code=422, detail="Provide either 'correct' or 'grade'")
+    snapshot = store.snapshot()
     try:
-        full_data = json.loads(data_path.read_text(encoding="utf-8"))
-        data = {"hskFlashcards": full_data.get("hskLesson7to9", [])}
-    except Exception:
-        data = {"hskFlashcards": []}
-    html = HSK_GAME_HTML.replace("__DATA__", json.dumps(data, ensure_ascii=False))
-    html = html.replace("__LESSON_TITLE__", "HSK 1 Lesson 7-9")
-    return Response(content=html, media_type="text/html")
-
-@app.get("/game/hsk-10-12")
-def hsk_game_10_12() -> Response:
-    data_path = Path(__file__).parent.parent / "data.json"
+        state = reviews.answer(answer.learner, d.id, deck_cards(d, snapshot), snapshot.deck_version(d.key),
+                               answer.card, grade)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown card: {answer.card}")
+    except (sqlite3.Error, OSError) as e:
+        raise _reviews_unavailable(e)
+    return {"deck": d.id, "id": state.card, "due": state.due, "interval": state.interval,
+            "ease": state.ease, "reps": state.reps}
+
+@app.get("/api/decks/{deck_id}/distractors")
+def deck_distractors(deck_id: str, n: int = Query(3, ge=1, le=10), seed: int = 0) -> dict:
+    """Freshly generated distractors for every card, projected (tone marks) like the game pages;
+    the same seed gives the same output."""
+    deck = _require_deck(deck_id)
+    snapshot = store.snapshot()
+    cards = deck_cards(deck, snapshot)
+    generated = distractor_engine(snapshot).regenerate(deck.kind, cards.values(), n, seed)
+    return {
+        "deck": deck.id,
+        "seed": seed,
+        "cards": [{"id": cid, "distractors": project_options(deck.kind, d)} for cid, d in zip(cards, generated)],
+    }
+
+@app.get("/api/quiz")
+def quiz(request: Request, deck: str, n: int = Query(DEFAULT_BATCH, ge=1, le=MAX_BATCH),
+         seed: int = DEFAULT_SEED, cursor: int = Query(0, ge=0), card: str | None = None) -> Response:
+    """``n`` questions from ``cursor`` in the seeded order; ``card`` starts the batch at that card."""
+    d = _require_deck(deck)
+    snapshot = store.snapshot()
+    if card is not None:
+        try:
+            cursor = deck_quiz(d, snapshot, seed).position(card)
+        except ValueError:
+            raise HTTPException(status_code=404, detail=f"Unknown card: {card}")
+    return cached_response(request, render_quiz_batch(d, snapshot, seed, cursor, n))
+
+class AnswerEvent(BaseModel):
+    deck: str = Field(max_length=32)
+    card: str = Field(min_length=1, max_length=32)
+    correct: bool
+    chosen: str | None = Field(default=None, max_length=64)
+
+class EventBatch(BaseModel):
+    events: list[AnswerEvent] = Field(max_length=500)
+
+def _known_answers(batch: EventBatch) -> list[Answer]:
+    """Only cards and options the deck has, so the counters cannot grow with made-up ids."""
+    snapshot = store.snapshot()
+    answers = []
+    for e in batch.events:
+        deck = DECKS.get(e.deck)
+        card = deck_cards(deck, snapshot).get(e.card) if deck is not None else None
+        if card is None:
+            continue
+        chosen = None if e.correct else e.chosen
+        if chosen is not None and chosen not in choices(deck.kind, card):
+            continue
+        answers.append(Answer(e.deck, e.card, e.correct, chosen))
+    return answers
+
+@app.post("/api/events", status_code=202)
+async def answer_events(batch: EventBatch) -> dict:
+    """Answers buffered by the games (sent with ``navigator.sendBeacon``); counted in the background."""
+    # The snapshot may stat or reload data.json, so validate off the loop; the queue lives on it.
+    answers = await run_in_threadpool(_known_answers, batch)
+    if answers and not events.submit(answers):
+        raise HTTPException(status_code=503, detail="Event queue is full")
+    return {"accepted": len(answers)}
+
+@app.get("/api/stats/{deck_id}")
+def stats(deck_id: str) -> dict:
+    """Measured difficulty over the rolling window: answered cards, hardest first."""
+    deck = _require_deck(deck_id)
+    return events.stats(deck.id, deck_cards(deck, store.snapshot()))
+
+@app.get("/api/search")
+def search(q: str = Query(min_length=1, max_length=100), deck: str | None = None,
+           limit: int = Query(20, ge=1, le=100), offset: int = Query(0, ge=0)) -> dict:
+    """Cards matching English, hanzi or pinyin (tones optional), best first, with game deep links."""
+    q = q.strip()
+    if not q:
+        raise HTTPException(status_code=422, detail="Query is blank")
+    snapshot = store.snapshot()
+    decks = [_require_deck(deck)] if deck is not None else list(DECKS.values())
+    indexes = [search_index(d, snapshot) for d in decks]
+    with span("search"):
+        total, page = search_all(indexes, q, limit, offset)
+    return {
+        "query": q,
+        "total": total,
+        "offset": offset,
+        "limit": limit,
+        "results": [index.result(doc) for index, doc in page],
+    }
+
+def admin(authorization: str | None = Header(default=None)) -> str:
+    """The admin named by the bearer token; the admin API does not exist without tokens."""
+    if not ADMIN_TOKENS:
+        raise HTTPException(status_code=404, detail="Not Found")
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        raise HTTPException(status_code=401, detail="Missing bearer token",
+                            headers={"WWW-Authenticate": "Bearer"})
+    for known, name in ADMIN_TOKENS.items():
+        if hmac.compare_digest(known.encode(), token.strip().encode()):
+            return name
+    raise HTTPException(status_code=403, detail="Invalid token")
+
+def _validate_card(deck: Deck, body: dict[str, Any]) -> dict[str, Any]:
+    # Imported here: building the pydantic deck models is only worth it for admin edits.
+    from flashcards.schema import MODELS
     try:
-        full_data = json.loads(data_path.read_text(encoding="utf-8"))
-        data = {"hskFlashcards": full_data.get("hskLesson10to12", [])}
-    except Exception as e:
-        print(f"Error loading data: {e}")  # Debug print
-        data = {"hskFlashcards": []}
-    html = HSK_GAME_HTML.replace("__DATA__", json.dumps(data, ensure_ascii=False))
-    html = html.replace("__LESSON_TITLE__", "HSK 1 Lesson 10-12")
-    return Response(content=html, media_type="text/html")
-
-@app.get("/game/hsk-13-15")
-def hsk_game_13_15() -> Response:
-    data_path = Path(__file__).parent.parent / "data.json"
+        return MODELS[deck.kind].model_validate(body).model_dump()
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False, include_context=False))
+
+def _edit(deck: Deck, op: str, cid: str, card: dict[str, Any] | None, actor: str) -> dict:
     try:
-        full_data = json.loads(data_path.read_text(encoding="utf-8"))
-        data = {"hskFlashcards": full_data.get("hskLesson13to15", [])}
-    except Exception as e:
-        print(f"Error loading data: {e}")  # Debug print
-        data = {"hskFlashcards": []}
-    html = HSK_GAME_HTML.replace("__DATA__", json.dumps(data, ensure_ascii=False))
-    html = html.replace("__LESSON_TITLE__", "HSK 1 Lesson 13-15")
-    return Response(content=html, media_type="text/html")
+        snapshot = store.edit(deck.key, op, cid, card, actor)
+    except (sqlite3.Error, OSError) as e:
+        raise HTTPException(status_code=503, detail=f"Cannot record the edit: {e}")
+    return {"deck": deck.id, "version": snapshot.edit_version(deck.key),
+            "id": card_id(card) if card is not None else cid}
+
+@app.post("/api/admin/decks/{deck_id}/cards", status_code=201)
+def add_card(deck_id: str, body: dict[str, Any] = Body(), actor: str = Depends(admin)) -> dict:
+    deck = _require_deck(deck_id)
+    card = _validate_card(deck, body)
+    if card_id(card) in deck_cards(deck, store.snapshot()):
+        raise HTTPException(status_code=409, detail=f"Card already exists: {card_id(card)}")
+    return _edit(deck, "add", "", card, actor)
+
+@app.put("/api/admin/decks/{deck_id}/cards/{cid}")
+def update_card(deck_id: str, cid: str, body: dict[str, Any] = Body(), actor: str = Depends(admin)) -> dict:
+    """Replace a card in place; its id changes with its prompt or answer."""
+    deck = _require_deck(deck_id)
+    card = _validate_card(deck, body)
+    cards = deck_cards(deck, store.snapshot())
+    if cid not in cards:
+        raise HTTPException(status_code=404, detail=f"Unknown card: {cid}")
+    if card_id(card) != cid and card_id(card) in cards:
+        raise HTTPException(status_code=409, detail=f"Card already exists: {card_id(card)}")
+    return _edit(deck, "update", cid, card, actor)
+
+@app.delete("/api/admin/decks/{deck_id}/cards/{cid}")
+def delete_card(deck_id: str, cid: str, actor: str = Depends(admin)) -> dict:
+    deck = _require_deck(deck_id)
+    if cid not in deck_cards(deck, store.snapshot()):
+        raise HTTPException(status_code=404, detail=f"Unknown card: {cid}")
+    return _edit(deck, "delete", cid, None, actor)
+
+@app.get("/api/decks/{deck_id}/delta")
+def deck_delta(deck_id: str, since: int = Query(ge=0), base: str | None = None) -> dict:
+    """Cards added or changed, and ids removed, since edit version ``since`` of the deck JSON.
+
+    A ``base`` other than the current one means data.json itself changed: refetch the deck.
+    """
+    deck = _require_deck(deck_id)
+    snapshot = store.snapshot()
+    current = snapshot.base or snapshot.version
+    if base is not None and base != current:
+        raise HTTPException(status_code=410, detail=f"Deck {deck.id} was reloaded; fetch /api/decks/{deck.id}")
+    version = snapshot.edit_version(deck.key)
+    if since > version:
+        raise HTTPException(status_code=400, detail=f"Deck {deck.id} is at version {version}")
+    # Versions are dense per deck, so edit v sits at index v - 1.
+    edits = store.edits.deck(deck.key)[since:version] if store.edits is not None else []
+    touched = set().union(*(e.touched for e in edits))
+    cards = deck_cards(deck, snapshot)
+    return {
+        "deck": deck.id,
+        "base": current,
+        "since": since,
+        "version": version,
+        "upserted": [project_card(deck.kind, cards[cid]) for cid in cards if cid in touched],
+        "removed": sorted(touched.difference(cards)),
+    }
+
+@app.get("/metrics")
+def metrics() -> Response:
+    return Response(content=REGISTRY.expose(), media_type="text/plain; version=0.0.4")
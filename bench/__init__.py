@@ -0,0 +1,2 @@
+# bench/__init__.py
+"""Benchmarks and load tests for the FastAPI app (``python -m bench --help``)."""
@@ -0,0 +1,110 @@
+# bench/__main__.py
+"""Benchmark CLI.
+
+    python -m bench synth --cards 10000 --out /tmp/data-10k.json
+    python -m bench run --cards 1000,10000,100000 --mode asgi --out results.json
+    python -m bench run --mode asgi --cold          # old per-request read/parse/replace path
+    python -m bench run --mode uvicorn --workers 4 --baseline bench/baseline.json
+    python -m bench memory --cards 10000,100000 --workers 4
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+from bench import driver, memory, report, synth
+from flashcards import compile_decks
+
+DEFAULT_ROUTES = ["/", "/game/pinyin", "/game/hsk/4-6", "/api/decks/hsk-4-6"]
+
+
+def _cmd_synth(args: argparse.Namespace) -> int:
+    path = synth.write(args.out, args.cards, args.seed)
+    print(f"Wrote {args.cards} cards to {path} ({path.stat().st_size} bytes)")
+    return 0
+
+
+def _cmd_run(args: argparse.Namespace) -> int:
+    results = []
+    with tempfile.TemporaryDirectory(prefix="flashcards-bench-") as tmp:
+        for cards in args.cards:
+            data_path = synth.write(Path(tmp) / f"data-{cards}.json", cards, args.seed)
+            if args.mode == "asgi":
+                rows = driver.run_asgi(data_path, args.routes, args.requests, args.concurrency, args.cold)
+            else:
+                rows = driver.run_uvicorn(data_path, args.routes, args.requests, args.concurrency,
+                                          args.workers)
+            for row in rows:
+                row["cards"] = cards
+            results.extend(rows)
+    report.print_table(results)
+    document = report.results_document(results, {k: v for k, v in vars(args).items() if k != "func"})
+    if args.out:
+        Path(args.out).write_text(json.dumps(document, indent=2, default=str) + "\n", encoding="utf-8")
+    if args.baseline:
+        regressions = report.compare(report.load(args.baseline), document, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+def _cmd_memory(args: argparse.Namespace) -> int:
+    results = []
+    with tempfile.TemporaryDirectory(prefix="flashcards-bench-") as tmp:
+        for cards in args.cards:
+            data_path = synth.write(Path(tmp) / f"data-{cards}.json", cards, args.seed)
+            compiled_dir = Path(tmp) / f"decks-{cards}"
+            # Random synthetic cards occasionally collide; those are dropped, not reported.
+            with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+                compile_decks.main([str(data_path), "--out", str(compiled_dir), "--keep-going", "--quiet"])
+            results.extend(memory.run_memory(data_path, compiled_dir, args.workers))
+    report.print_memory_table(results)
+    if args.out:
+        document = report.results_document(results, {k: v for k, v in vars(args).items() if k != "func"})
+        Path(args.out).write_text(json.dumps(document, indent=2, default=str) + "\n", encoding="utf-8")
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m bench", description="Benchmark the flashcards app.")
+    sub = parser.add_subparsers(required=True)
+
+    p = sub.add_parser("synth", help="write a synthetic data.json")
+    p.add_argument("--cards", type=int, default=1000)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--out", type=Path, required=True)
+    p.set_defaults(func=_cmd_synth)
+
+    p = sub.add_parser("run", help="load-test the app against synthetic decks")
+    p.add_argument("--cards", type=lambda s: [int(x) for x in s.split(",")], default=[1000, 10000])
+    p.add_argument("--routes", nargs="+", default=DEFAULT_ROUTES)
+    p.add_argument("--mode", choices=["asgi", "uvicorn"], default="asgi")
+    p.add_argument("--requests", type=int, default=500, help="per route")
+    p.add_argument("--concurrency", type=int, default=8)
+    p.add_argument("--workers", type=int, default=1, help="uvicorn workers")
+    p.add_argument("--cold", action="store_true", help="asgi: re-read data and re-render every request")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--out", type=Path)
+    p.add_argument("--baseline", type=Path, help="fail if results regress against this file")
+    p.add_argument("--tolerance", type=float, default=0.2)
+    p.set_defaults(func=_cmd_run)
+
+    p = sub.add_parser("memory", help="deck memory per worker for each deck format")
+    p.add_argument("--cards", type=lambda s: [int(x) for x in s.split(",")], default=[10000, 100000])
+    p.add_argument("--workers", type=int, default=4)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--out", type=Path)
+    p.set_defaults(func=_cmd_memory)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+# bench/driver.py
+"""Load drivers: in-process ASGI calls, and real HTTP against uvicorn workers."""
+from __future__ import annotations
+
+import asyncio
+import http.client
+import os
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+from bench.report import child_pids, rss_mb, summarize
+from flashcards import asgi
+
+ROOT = Path(__file__).resolve().parent.parent
+
+REQUEST_HEADERS = {"accept-encoding": "gzip, br"}
+
+
+def run_asgi(data_path: Path, routes: list[str], requests: int, concurrency: int,
+             cold: bool = False) -> list[dict[str, Any]]:
+    """Drive ``api.index:app`` in this process against ``data_path``.
+
+    With ``cold=True`` the render caches, the per-version card/quiz/search
+    indexes and the store are reset before every request, so data.json is
+    re-read and every page rebuilt from it: the original per-request
+    read/parse/replace cost, for comparison.
+    """
+    import api.index as index
+    from flashcards.store import DeckStore
+
+    index.store = DeckStore(data_path)
+    index.pages.clear()
+
+    def reset() -> None:
+        if cold:
+            for cache in (index.pages, index.quiz_batches, index._card_index, index._quizzes,
+                          index._answers, index._search):
+                cache.clear()
+            index._engine = None
+            index.store._stat_key = None
+
+    async def worker(route: str, count: int, latencies: list[float], sizes: list[int]) -> None:
+        for _ in range(count):
+            reset()
+            start = time.perf_counter()
+            response = await asgi.request(index.app, route, headers=REQUEST_HEADERS)
+            latencies.append(time.perf_counter() - start)
+            if response.status != 200:
+                raise RuntimeError(f"{route} returned {response.status}")
+            sizes.append(len(response.body))
+
+    results = []
+    for route in routes:
+        latencies: list[float] = []
+        sizes: list[int] = []
+        asyncio.run(worker(route, 1, [], []))  # warm-up; excluded from timings
+        per_worker = max(1, requests // concurrency)
+
+        async def load() -> None:
+            await asyncio.gather(*(worker(route, per_worker, latencies, sizes)
+                                   for _ in range(concurrency)))
+
+        start = time.perf_counter()
+        asyncio.run(load())
+        elapsed = time.perf_counter() - start
+        results.append({
+            "mode": "asgi", "route": route, "cold": cold, "requests": len(latencies),
+            "bytes": sizes[-1] if sizes else 0, "rss_mb": rss_mb(),
+            **summarize(latencies, elapsed),
+        })
+    return results
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_for_port(port: int, proc: subprocess.Popen, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"uvicorn exited with status {proc.returncode}")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError("uvicorn did not start listening in time")
+
+
+def run_uvicorn(data_path: Path, routes: list[str], requests: int, concurrency: int,
+                workers: int = 1) -> list[dict[str, Any]]:
+    """Start ``uvicorn api.index:app`` and load it over real HTTP keep-alive connections."""
+    port = _free_port()
+    env = {**os.environ, "FLASHCARDS_DATA": str(data_path)}
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api.index:app", "--host", "127.0.0.1",
+         "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        cwd=ROOT, env=env,
+    )
+    try:
+        _wait_for_port(port, proc)
+
+        def client(route: str, count: int) -> tuple[list[float], int]:
+            conn = http.client.HTTPConnection("127.0.0.1", port)
+            conn.connect()
+            # Avoid Nagle / delayed-ACK stalls skewing small-response latencies.
+            conn.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            latencies, size = [], 0
+            try:
+                for _ in range(count):
+                    start = time.perf_counter()
+                    conn.request("GET", route, headers=REQUEST_HEADERS)
+                    response = conn.getresponse()
+                    body = response.read()
+                    latencies.append(time.perf_counter() - start)
+                    if response.status != 200:
+                        raise RuntimeError(f"{route} returned {response.status}")
+                    size = len(body)
+            finally:
+                conn.close()
+            return latencies, size
+
+        results = []
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for route in routes:
+                client(route, 1)  # warm-up
+                per_worker = max(1, requests // concurrency)
+                start = time.perf_counter()
+                outcomes = list(pool.map(lambda _: client(route, per_worker), range(concurrency)))
+                elapsed = time.perf_counter() - start
+                latencies = [lat for lats, _ in outcomes for lat in lats]
+                results.append({
+                    "mode": "uvicorn", "route": route, "workers": workers,
+                    "requests": len(latencies), "bytes": outcomes[0][1],
+                    "rss_mb": rss_mb([proc.pid, *child_pids(proc.pid)]),
+                    **summarize(latencies, elapsed),
+                })
+        return results
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
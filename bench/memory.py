@@ -0,0 +1,78 @@
+# bench/memory.py
+"""Deck memory across worker processes: parsed JSON vs compiled vs mmap'd binary.
+
+Each worker is a fresh interpreter that loads every deck in one format,
+reads every card (as rendering would) and then holds the result, like a
+uvicorn worker between requests. ``decks_mb`` is the RSS each worker grows
+by while loading; summed PSS shows how much of that is actually shared.
+"""
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any
+
+from bench.report import pss_mb, rss_mb
+
+ROOT = Path(__file__).resolve().parent.parent
+
+FORMATS = ("json", "compiled", "binary")
+
+# Runs in each worker; prints its RSS before/after loading, then waits for stdin to close.
+_PROBE = """
+import gc, json, sys
+from pathlib import Path
+from bench.report import rss_mb
+from flashcards.compiled import load_manifest
+from flashcards.decks import DECKS, card_id
+from flashcards.store import data_version
+
+fmt, data_path, compiled_dir = sys.argv[1:4]
+gc.collect()
+before = rss_mb()
+if fmt == "json":
+    data = json.loads(Path(data_path).read_bytes())
+else:
+    version = data_version(Path(data_path).read_bytes())
+    compiled = load_manifest(Path(compiled_dir), version, use_binary=fmt == "binary")
+    data = compiled.load()
+cards = sum(1 for d in DECKS.values() for card in data.get(d.key, ()) if card_id(card))
+gc.collect()
+print(json.dumps({"cards": cards, "before": before, "after": rss_mb()}), flush=True)
+sys.stdin.read()
+"""
+
+
+def _file_bytes(fmt: str, data_path: Path, compiled_dir: Path) -> int:
+    if fmt == "json":
+        return data_path.stat().st_size
+    suffix = ".bin" if fmt == "binary" else ".json"
+    return sum(p.stat().st_size for p in compiled_dir.glob(f"*{suffix}") if p.name != "manifest.json")
+
+
+def run_memory(data_path: Path, compiled_dir: Path, workers: int) -> list[dict[str, Any]]:
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [str(ROOT), os.environ.get("PYTHONPATH")]))}
+    results = []
+    for fmt in FORMATS:
+        procs = [
+            subprocess.Popen([sys.executable, "-c", _PROBE, fmt, str(data_path), str(compiled_dir)],
+                             cwd=ROOT, env=env, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+            for _ in range(workers)
+        ]
+        try:
+            reports = [json.loads(p.stdout.readline()) for p in procs]
+            pids = [p.pid for p in procs]
+            results.append({
+                "format": fmt, "workers": workers, "cards": reports[0]["cards"],
+                "file_bytes": _file_bytes(fmt, data_path, compiled_dir),
+                "decks_mb": round(sum(r["after"] - r["before"] for r in reports) / workers, 1),
+                "rss_mb": rss_mb(pids), "pss_mb": pss_mb(pids),
+            })
+        finally:
+            for p in procs:
+                p.stdin.close()
+                p.wait()
+    return results
@@ -0,0 +1,131 @@
+# bench/report.py
+"""Latency summaries, machine-readable results and baseline comparison."""
+from __future__ import annotations
+
+import json
+import os
+import platform
+import resource
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def summarize(latencies: list[float], elapsed: float) -> dict[str, float]:
+    values = sorted(latencies)
+    return {
+        "p50_ms": round(percentile(values, 50) * 1000, 3),
+        "p95_ms": round(percentile(values, 95) * 1000, 3),
+        "p99_ms": round(percentile(values, 99) * 1000, 3),
+        "rps": round(len(values) / elapsed, 1) if elapsed > 0 else 0.0,
+    }
+
+
+def rss_mb(pids: list[int] | None = None) -> float | None:
+    """Current resident set size in MiB, summed over ``pids`` (default: this process)."""
+    total_kb = 0
+    for pid in pids or ["self"]:
+        try:
+            for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+                if line.startswith("VmRSS:"):
+                    total_kb += int(line.split()[1])
+        except OSError:
+            if pids is None:
+                # No /proc (macOS): fall back to peak RSS, reported in bytes there.
+                peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+                return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+    return round(total_kb / 1024, 1)
+
+
+def pss_mb(pids: list[int]) -> float | None:
+    """Proportional set size in MiB summed over ``pids``: shared pages count once in total."""
+    total_kb = 0
+    for pid in pids:
+        try:
+            for line in Path(f"/proc/{pid}/smaps_rollup").read_text().splitlines():
+                if line.startswith("Pss:"):
+                    total_kb += int(line.split()[1])
+        except OSError:
+            return None
+    return round(total_kb / 1024, 1)
+
+
+def child_pids(pid: int) -> list[int]:
+    try:
+        children = Path(f"/proc/{pid}/task/{pid}/children").read_text().split()
+    except OSError:
+        return []
+    out = []
+    for child in map(int, children):
+        out.append(child)
+        out.extend(child_pids(child))
+    return out
+
+
+def results_document(results: list[dict[str, Any]], args: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "args": args,
+        },
+        "results": results,
+    }
+
+
+def _key(result: dict[str, Any]) -> tuple:
+    return result["mode"], result["cards"], result["route"], result.get("cold", False)
+
+
+def compare(baseline: dict[str, Any], current: dict[str, Any],
+            tolerance: float = 0.2) -> list[str]:
+    """Human-readable regressions of ``current`` against ``baseline`` (empty if none)."""
+    base = {_key(r): r for r in baseline["results"]}
+    regressions = []
+    for r in current["results"]:
+        b = base.get(_key(r))
+        if b is None:
+            continue
+        label = "{} cards={} {}".format(r["mode"], r["cards"], r["route"])
+        if b["p95_ms"] and r["p95_ms"] > b["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{label}: p95 {b['p95_ms']}ms -> {r['p95_ms']}ms")
+        if b["rps"] and r["rps"] < b["rps"] * (1 - tolerance):
+            regressions.append(f"{label}: req/s {b['rps']} -> {r['rps']}")
+    return regressions
+
+
+def print_table(results: list[dict[str, Any]]) -> None:
+    header = f"{'mode':<8} {'cards':>7} {'route':<24} {'p50ms':>8} {'p95ms':>8} {'p99ms':>8} {'req/s':>9} {'KiB':>8} {'RSS MiB':>8}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        mode = r["mode"] + ("*" if r.get("cold") else "")
+        rss = "-" if r.get("rss_mb") is None else f"{r['rss_mb']:.1f}"
+        print(f"{mode:<8} {r['cards']:>7} {r['route']:<24} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} "
+              f"{r['p99_ms']:>8.2f} {r['rps']:>9.1f} {r['bytes'] / 1024:>8.1f} {rss:>8}")
+
+
+def print_memory_table(results: list[dict[str, Any]]) -> None:
+    header = f"{'format':<9} {'cards':>7} {'workers':>7} {'file KiB':>9} {'decks MiB/worker':>17} {'RSS MiB':>8} {'PSS MiB':>8}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        pss = "-" if r.get("pss_mb") is None else f"{r['pss_mb']:.1f}"
+        print(f"{r['format']:<9} {r['cards']:>7} {r['workers']:>7} {r['file_bytes'] / 1024:>9.1f} "
+              f"{r['decks_mb']:>17.1f} {r['rss_mb']:>8.1f} {pss:>8}")
+
+
+def load(path: Path) -> dict[str, Any]:
+    return json.loads(Path(path).read_text(encoding="utf-8"))
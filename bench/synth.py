@@ -0,0 +1,63 @@
+# bench/synth.py
+"""Synthetic ``data.json`` generator in the real deck schema.
+
+Cards are split across ``pinyinPairs`` and every registered ``hskLesson*``
+key, with plausible pinyin from the real syllable table and CJK characters
+from the common-ideograph block, so payload sizes track real decks.
+"""
+from __future__ import annotations
+
+import json
+import random
+from pathlib import Path
+from typing import Any
+
+from flashcards.decks import DECKS
+from flashcards.tones import SYLLABLES
+
+WORDS = "apple bank book car cat city day dog friend home house money school tea time water work".split()
+
+
+def _word(rng: random.Random, syllables: int) -> tuple[str, str]:
+    chinese = "".join(chr(rng.randint(0x4E00, 0x9FA5)) for _ in range(syllables))
+    pinyin = " ".join(f"{rng.choice(SYLLABLES)}{rng.randint(1, 4)}" for _ in range(syllables))
+    return chinese, pinyin
+
+
+def _english(rng: random.Random) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 4))).capitalize()
+
+
+def pinyin_pair(rng: random.Random) -> dict[str, Any]:
+    text, correct = _word(rng, rng.randint(1, 3))
+    tokens = correct.split()
+    k = rng.randrange(len(tokens))
+    tone = int(tokens[k][-1]) % 4 + 1
+    tokens[k] = tokens[k][:-1] + str(tone)
+    return {"text": text, "en": _english(rng), "correct": correct, "distractor": " ".join(tokens)}
+
+
+def hsk_card(rng: random.Random) -> dict[str, Any]:
+    def option() -> dict[str, str]:
+        chinese, pinyin = _word(rng, rng.randint(1, 5))
+        return {"chinese": chinese, "pinyin": pinyin}
+
+    return {"english": _english(rng), "correct": option(), "distractors": [option() for _ in range(3)]}
+
+
+def generate(cards: int, seed: int = 0) -> dict[str, list[dict[str, Any]]]:
+    """``cards`` cards in total, spread evenly over every registered deck."""
+    rng = random.Random(seed)
+    decks = list(DECKS.values())
+    data: dict[str, list[dict[str, Any]]] = {d.key: [] for d in decks}
+    for i in range(cards):
+        deck = decks[i % len(decks)]
+        data[deck.key].append(pinyin_pair(rng) if deck.kind == "pinyin" else hsk_card(rng))
+    return data
+
+
+def write(path: Path, cards: int, seed: int = 0) -> Path:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(generate(cards, seed), ensure_ascii=False), encoding="utf-8")
+    return path
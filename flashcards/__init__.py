@@ -0,0 +1,2 @@
+# flashcards/__init__.py
+"""Deck loading and page rendering helpers shared by ``api/index.py``."""
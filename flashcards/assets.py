@@ -0,0 +1,72 @@
+# flashcards/assets.py
+"""Content-hashed static assets (``static/app.js``, ``static/app.css``).
+
+Each file is read once and published as ``<stem>.<hash><suffix>``; because the
+name changes whenever the content does, responses can be cached forever.
+Compression is left to the render cache, so it happens on first request
+rather than at import. The service worker (``static/sw.js``) is the one
+exception: browsers need it at a fixed URL, so it is kept out of the
+hashed set and served as ``/sw.js``.
+"""
+from __future__ import annotations
+
+import hashlib
+from dataclasses import dataclass, field
+from pathlib import Path
+
+STATIC_DIR = Path(__file__).resolve().parent.parent / "static"
+
+ASSET_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+SERVICE_WORKER = "sw.js"
+
+MEDIA_TYPES = {
+    ".js": "text/javascript",
+    ".css": "text/css",
+}
+
+
+@dataclass(frozen=True)
+class Asset:
+    name: str           # "app.js"
+    hashed_name: str    # "app.3f2c9a1b7d04.js"
+    digest: str
+    body: bytes = field(repr=False)
+    media_type: str = "text/javascript"
+
+    @property
+    def url(self) -> str:
+        return f"/static/{self.hashed_name}"
+
+
+def load_asset(path: Path) -> Asset:
+    body = path.read_bytes()
+    digest = hashlib.sha256(body).hexdigest()[:12]
+    hashed_name = f"{path.stem}.{digest}{path.suffix}"
+    return Asset(
+        name=path.name,
+        hashed_name=hashed_name,
+        digest=digest,
+        body=body,
+        media_type=MEDIA_TYPES[path.suffix],
+    )
+
+
+class AssetBundle:
+    """All static assets, addressable by plain or hashed file name."""
+
+    def __init__(self, directory: Path = STATIC_DIR) -> None:
+        self.assets = [
+            load_asset(p) for p in sorted(Path(directory).iterdir())
+            if p.suffix in MEDIA_TYPES and p.name != SERVICE_WORKER
+        ]
+        worker = Path(directory) / SERVICE_WORKER
+        self.service_worker = load_asset(worker) if worker.exists() else None
+        self._by_name = {a.name: a for a in self.assets}
+        self._by_hashed_name = {a.hashed_name: a for a in self.assets}
+
+    def url(self, name: str) -> str:
+        return self._by_name[name].url
+
+    def lookup(self, hashed_name: str) -> Asset | None:
+        return self._by_hashed_name.get(hashed_name)
@@ -0,0 +1,175 @@
+# flashcards/binary.py
+"""Compact binary deck files, read in place through ``mmap``.
+
+One file per deck, little-endian, every section 4-byte aligned::
+
+    header    magic "FCDB", u16 format, u8 kind (0 pinyin, 1 hsk), u8 0,
+              u32 cards, u32 options, u32 strings
+    offsets   u32[strings + 1]      byte offset of each string in ``data``
+    records   u32[cards * 4]        pinyin: text, en, correct, distractor
+                                    hsk:    english, correct option, first distractor, count
+    options   u32[options * 2]      hsk only: chinese, pinyin
+    data      UTF-8 bytes of every distinct string, concatenated
+
+:class:`BinaryDeck` maps the file read-only and hands out lightweight
+:class:`~collections.abc.Mapping` views over the records, so every worker
+process shares one page-cache copy and nothing is decoded until a field is
+read. The views answer the same keys as the ``data.json`` dicts, so
+projection, card ids and distractor generation work on them unchanged.
+"""
+from __future__ import annotations
+
+import mmap
+import struct
+import sys
+from array import array
+from collections.abc import Mapping, Sequence
+from pathlib import Path
+from typing import Any, Iterator
+
+MAGIC = b"FCDB"
+FORMAT = 1
+KINDS = ("pinyin", "hsk")
+
+_HEADER = struct.Struct("<4sHBBIII")
+_U32 = "I"
+
+
+def _u32_array(values: list[int]) -> bytes:
+    out = array(_U32, values)
+    if sys.byteorder != "little":
+        out.byteswap()
+    return out.tobytes()
+
+
+def encode(kind: str, cards: list[Mapping[str, Any]]) -> bytes:
+    """Serialize validated cards (see :mod:`flashcards.schema`) into one deck file."""
+    index: dict[str, int] = {}
+
+    def ref(s: str) -> int:
+        return index.setdefault(s, len(index))
+
+    records: list[int] = []
+    options: list[int] = []
+    for card in cards:
+        if kind == "pinyin":
+            records += [ref(card["text"]), ref(card["en"]), ref(card["correct"]), ref(card["distractor"])]
+            continue
+        first = len(options) // 2
+        for option in (card["correct"], *card["distractors"]):
+            options += [ref(option["chinese"]), ref(option["pinyin"])]
+        records += [ref(card["english"]), first, first + 1, len(card["distractors"])]
+
+    offsets, data = [0], bytearray()
+    for s in index:
+        data += s.encode("utf-8")
+        offsets.append(len(data))
+    header = _HEADER.pack(MAGIC, FORMAT, KINDS.index(kind), 0, len(cards), len(options) // 2, len(index))
+    return b"".join([header, _u32_array(offsets), _u32_array(records), _u32_array(options), bytes(data)])
+
+
+class BinaryDeck(Sequence):
+    """A deck file mapped into memory; indexing yields record views."""
+
+    def __init__(self, buffer: Any) -> None:
+        self._buffer = buffer
+        view = memoryview(buffer)
+        magic, fmt, kind, _, cards, options, strings = _HEADER.unpack_from(view)
+        if magic != MAGIC or fmt != FORMAT:
+            raise ValueError("not a binary deck file")
+        self.kind = KINDS[kind]
+        self._cards = cards
+        pos = _HEADER.size
+        self._offsets, pos = self._array(view, pos, strings + 1)
+        self._records, pos = self._array(view, pos, cards * 4)
+        self._options, pos = self._array(view, pos, options * 2)
+        self._data = view[pos:]
+
+    @staticmethod
+    def _array(view: memoryview, pos: int, count: int) -> tuple[Any, int]:
+        end = pos + count * 4
+        if sys.byteorder == "little":
+            return view[pos:end].cast(_U32), end
+        # Big-endian hosts pay for one swapped copy.
+        out = array(_U32, view[pos:end].tobytes())
+        out.byteswap()
+        return out, end
+
+    @classmethod
+    def open(cls, path: Path) -> "BinaryDeck":
+        with open(path, "rb") as f:
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def string(self, i: int) -> str:
+        return str(self._data[self._offsets[i]:self._offsets[i + 1]], "utf-8")
+
+    def __len__(self) -> int:
+        return self._cards
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self._cards))]
+        if i < 0:
+            i += self._cards
+        if not 0 <= i < self._cards:
+            raise IndexError(i)
+        return PinyinView(self, i) if self.kind == "pinyin" else HskView(self, i)
+
+
+class _View(Mapping):
+    __slots__ = ("_deck", "_i")
+    FIELDS: tuple[str, ...] = ()
+
+    def __init__(self, deck: BinaryDeck, i: int) -> None:
+        self._deck, self._i = deck, i
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.FIELDS)
+
+    def __len__(self) -> int:
+        return len(self.FIELDS)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({dict(self)!r})"
+
+
+class PinyinView(_View):
+    __slots__ = ()
+    FIELDS = ("text", "en", "correct", "distractor")
+
+    def __getitem__(self, key: str) -> str:
+        try:
+            field = self.FIELDS.index(key)
+        except ValueError:
+            raise KeyError(key) from None
+        deck = self._deck
+        return deck.string(deck._records[self._i * 4 + field])
+
+
+class OptionView(_View):
+    __slots__ = ()
+    FIELDS = ("chinese", "pinyin")
+
+    def __getitem__(self, key: str) -> str:
+        try:
+            field = self.FIELDS.index(key)
+        except ValueError:
+            raise KeyError(key) from None
+        deck = self._deck
+        return deck.string(deck._options[self._i * 2 + field])
+
+
+class HskView(_View):
+    __slots__ = ()
+    FIELDS = ("english", "correct", "distractors")
+
+    def __getitem__(self, key: str) -> Any:
+        deck, base = self._deck, self._i * 4
+        if key == "english":
+            return deck.string(deck._records[base])
+        if key == "correct":
+            return OptionView(deck, deck._records[base + 1])
+        if key == "distractors":
+            first = deck._records[base + 2]
+            return [OptionView(deck, j) for j in range(first, first + deck._records[base + 3])]
+        raise KeyError(key)
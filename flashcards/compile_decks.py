@@ -0,0 +1,70 @@
+# flashcards/compile_decks.py
+"""Validate ``data.json`` and compile it into per-deck artifacts.
+
+    python -m flashcards.compile_decks                    # data.json -> build/decks
+    python -m flashcards.compile_decks data.json --out build/decks --keep-going
+
+Every deck in :data:`~flashcards.decks.DECKS` is checked against the models
+in :mod:`flashcards.schema`. Invalid cards (missing fields, wrong types, a
+distractor equal to the correct answer) are errors: the command exits 1 and
+writes nothing, unless ``--keep-going`` is given, in which case they are left
+out of the artifacts. Exact duplicates are dropped; pinyin that is not a
+Mandarin syllable is reported as a warning.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from flashcards import compiled
+from flashcards.decks import DECKS
+from flashcards.schema import validate_deck
+from flashcards.store import DEFAULT_DATA_PATH, data_version
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m flashcards.compile_decks",
+                                     description="Validate data.json and write compiled deck artifacts.")
+    parser.add_argument("data", nargs="?", type=Path, default=DEFAULT_DATA_PATH)
+    parser.add_argument("--out", type=Path, default=compiled.DEFAULT_COMPILED_DIR)
+    parser.add_argument("--keep-going", action="store_true",
+                        help="drop invalid cards instead of failing")
+    parser.add_argument("--quiet", action="store_true", help="do not print warnings")
+    args = parser.parse_args(argv)
+
+    raw = args.data.read_bytes()
+    data = json.loads(raw)
+    if not isinstance(data, dict):
+        print(f"{args.data}: top-level JSON value must be an object", file=sys.stderr)
+        return 1
+
+    decks, errors = [], 0
+    for deck in DECKS.values():
+        if deck.key not in data:
+            continue
+        report = validate_deck(deck.kind, deck.key, data[deck.key])
+        for line in report.errors:
+            print(f"ERROR   {line}", file=sys.stderr)
+        if not args.quiet:
+            for line in report.warnings:
+                print(f"warning {line}", file=sys.stderr)
+        errors += len(report.errors)
+        decks.append((deck, [card.model_dump() for card in report.cards]))
+        print(f"{deck.id:<12} {len(report.cards):>6} cards  "
+              f"{report.duplicates} duplicates  {len(report.errors)} invalid")
+
+    if errors and not args.keep_going:
+        print(f"{errors} invalid cards; nothing written (use --keep-going to drop them)",
+              file=sys.stderr)
+        return 1
+    manifest = compiled.write(args.out, data_version(raw), decks)
+    total = sum(entry["bytes"] for entry in manifest["decks"].values())
+    print(f"Wrote {len(manifest['decks'])} decks ({total} bytes), version {manifest['version']}, "
+          f"to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
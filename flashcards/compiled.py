@@ -0,0 +1,171 @@
+# flashcards/compiled.py
+"""Pre-validated per-deck artifacts written by ``python -m flashcards.compile_decks``.
+
+Layout of the output directory (default ``build/decks``, or ``$FLASHCARDS_COMPILED``)::
+
+    manifest.json     {"format", "source_version", "version", "decks": {id: {file, sha256, binary, ...}}}
+    <deck id>.json    {"deck", "key", "kind", "strings": [...], "cards": [[i, j, ...], ...]}
+    <deck id>.bin     the same deck in the mmap-able format of :mod:`flashcards.binary`
+
+Each deck stores every distinct string once in ``strings``; a card is a flat
+list of indices into it (``text, en, correct, distractor`` for pinyin pairs,
+``english, chinese, pinyin`` followed by ``chinese, pinyin`` per distractor for
+HSK cards). Loading rebuilds the card dicts the rest of the app reads, with
+strings interned so repeated pinyin and hanzi share one object across decks.
+When the ``.bin`` file is listed, it is mapped instead and nothing is
+materialized: all worker processes share one page-cache copy of each deck.
+Files are replaced by rename, never rewritten in place, so a running
+process keeps a consistent mapping of the old generation.
+
+:meth:`~flashcards.store.DeckStore.reload` uses the artifacts instead of
+parsing ``data.json`` when the manifest was compiled from the same file
+contents and every artifact still matches its recorded hash.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import mmap
+import os
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Mapping, Sequence
+
+from flashcards import binary
+from flashcards.decks import DECKS, Deck
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_COMPILED_DIR = Path(
+    os.environ.get("FLASHCARDS_COMPILED")
+    or Path(__file__).resolve().parent.parent / "build" / "decks"
+)
+
+MANIFEST = "manifest.json"
+FORMAT = 1
+
+
+def encode_card(kind: str, card: Mapping[str, Any]) -> list[str]:
+    if kind == "pinyin":
+        return [card["text"], card["en"], card["correct"], card["distractor"]]
+    out = [card["english"], card["correct"]["chinese"], card["correct"]["pinyin"]]
+    for d in card["distractors"]:
+        out += [d["chinese"], d["pinyin"]]
+    return out
+
+
+def decode_card(kind: str, s: list[str]) -> dict[str, Any]:
+    if kind == "pinyin":
+        return {"text": s[0], "en": s[1], "correct": s[2], "distractor": s[3]}
+    return {
+        "english": s[0],
+        "correct": {"chinese": s[1], "pinyin": s[2]},
+        "distractors": [{"chinese": s[i], "pinyin": s[i + 1]} for i in range(3, len(s), 2)],
+    }
+
+
+def encode_deck(deck: Deck, cards: list[Mapping[str, Any]]) -> dict[str, Any]:
+    index: dict[str, int] = {}
+    rows = [[index.setdefault(s, len(index)) for s in encode_card(deck.kind, c)] for c in cards]
+    return {"deck": deck.id, "key": deck.key, "kind": deck.kind,
+            "strings": list(index), "cards": rows}
+
+
+def _replace(path: Path, body: bytes) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(body)
+    tmp.replace(path)
+
+
+def write(directory: Path, source_version: str,
+          decks: list[tuple[Deck, list[Mapping[str, Any]]]]) -> dict[str, Any]:
+    """Write every deck artifact, then the manifest; return the manifest."""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    entries = {}
+    for deck, cards in decks:
+        document = encode_deck(deck, cards)
+        body = json.dumps(document, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        packed = binary.encode(deck.kind, cards)
+        name = f"{deck.id}.json"
+        _replace(directory / name, body)
+        _replace(directory / f"{deck.id}.bin", packed)
+        entries[deck.id] = {
+            "file": name,
+            "sha256": hashlib.sha256(body).hexdigest(),
+            "cards": len(cards),
+            "strings": len(document["strings"]),
+            "bytes": len(body),
+            "binary": {"file": f"{deck.id}.bin", "sha256": hashlib.sha256(packed).hexdigest(),
+                       "bytes": len(packed)},
+        }
+    digest = hashlib.sha256(source_version.encode())
+    for deck_id in sorted(entries):
+        digest.update(entries[deck_id]["sha256"].encode())
+    manifest = {"format": FORMAT, "source_version": source_version,
+                "version": digest.hexdigest()[:16], "decks": entries}
+    _replace(directory / MANIFEST, (json.dumps(manifest, indent=2) + "\n").encode("utf-8"))
+    return manifest
+
+
+@dataclass(frozen=True)
+class CompiledDecks:
+    directory: Path
+    version: str
+    decks: dict[str, Any]       # deck id -> JSON artifact bytes, or a mapped .bin file
+
+    def load(self) -> dict[str, Sequence[Mapping[str, Any]]]:
+        """Cards keyed by ``data.json`` key, as the parsed file would have them."""
+        data: dict[str, Sequence[Mapping[str, Any]]] = {}
+        for deck_id, body in self.decks.items():
+            if isinstance(body, mmap.mmap):
+                data[DECKS[deck_id].key] = binary.BinaryDeck(body)
+                continue
+            document = json.loads(body)
+            strings = [sys.intern(s) for s in document["strings"]]
+            kind = document["kind"]
+            data[document["key"]] = [decode_card(kind, [strings[i] for i in row])
+                                     for row in document["cards"]]
+        return data
+
+
+def _read(path: Path, use_mmap: bool) -> Any:
+    if not use_mmap:
+        return path.read_bytes()
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def load_manifest(directory: Path, source_version: str,
+                  use_binary: bool = True) -> CompiledDecks | None:
+    """The compiled decks for ``source_version``, or ``None`` if absent, stale or damaged."""
+    directory = Path(directory)
+    try:
+        manifest = json.loads((directory / MANIFEST).read_bytes())
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning("Ignoring compiled decks in %s: %s", directory, e)
+        return None
+    if manifest.get("format") != FORMAT or manifest.get("source_version") != source_version:
+        return None
+    decks = {}
+    for deck_id, entry in manifest["decks"].items():
+        if deck_id not in DECKS:
+            continue
+        mapped = use_binary and "binary" in entry
+        if mapped:
+            entry = entry["binary"]
+        try:
+            body = _read(directory / entry["file"], mapped)
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring compiled decks in %s: %s", directory, e)
+            return None
+        if hashlib.sha256(body).hexdigest() != entry["sha256"]:
+            logger.warning("Ignoring compiled decks in %s: %s does not match the manifest",
+                           directory, entry["file"])
+            return None
+        decks[deck_id] = body
+    return CompiledDecks(directory=directory, version=manifest["version"], decks=decks)
@@ -0,0 +1,89 @@
+# flashcards/decks.py
+"""Registry of playable decks.
+
+Every game page, homepage card and deck lookup is driven from :data:`DECKS`,
+so adding a lesson range means adding one :class:`Deck` entry (and its
+``data.json`` key) rather than another route handler.
+"""
+from __future__ import annotations
+
+import hashlib
+from dataclasses import dataclass
+from html import escape
+from typing import Any, Mapping
+
+
+@dataclass(frozen=True)
+class Deck:
+    id: str
+    key: str            # top-level key in data.json
+    kind: str           # "pinyin" or "hsk"; selects the template
+    title: str
+    blurb: str
+    icon: str
+    accent: str         # Tailwind colour for border, heading and button
+    accent_to: str      # Tailwind colour the card gradient fades to
+
+    @property
+    def path(self) -> str:
+        if self.kind == "hsk":
+            return f"/game/hsk/{self.lesson}"
+        return f"/game/{self.id}"
+
+    @property
+    def lesson(self) -> str:
+        return self.id.removeprefix("hsk-")
+
+
+DECKS: dict[str, Deck] = {d.id: d for d in (
+    Deck("pinyin", "pinyinPairs", "pinyin", "Pinyin Listening Game",
+         "Listen to Chinese words and choose the correct pinyin pronunciation.",
+         "🎵", "indigo", "purple"),
+    Deck("hsk-4-6", "hskLesson4to6", "hsk", "HSK 1 Lesson 4-6",
+         "Learn vocabulary with English to Chinese flash cards including pinyin.",
+         "📚", "green", "blue"),
+    Deck("hsk-7-9", "hskLesson7to9", "hsk", "HSK 1 Lesson 7-9",
+         "Continue learning with more vocabulary flash cards and pinyin practice.",
+         "📖", "orange", "pink"),
+    Deck("hsk-10-12", "hskLesson10to12", "hsk", "HSK 1 Lesson 10-12",
+         "Advanced vocabulary with numbers, actions, and daily activities.",
+         "🎯", "purple", "indigo"),
+    Deck("hsk-13-15", "hskLesson13to15", "hsk", "HSK 1 Lesson 13-15",
+         "Learn food vocabulary, restaurants, and directional words.",
+         "🍽️", "teal", "cyan"),
+)}
+
+
+def get_deck(deck_id: str) -> Deck | None:
+    return DECKS.get(deck_id)
+
+
+def get_hsk_deck(lesson: str) -> Deck | None:
+    deck = DECKS.get(f"hsk-{lesson}")
+    return deck if deck is not None and deck.kind == "hsk" else None
+
+
+def card_id(card: Mapping[str, Any]) -> str:
+    """Stable id for a card, derived from its prompt and answer (not its position)."""
+    if "english" in card:
+        correct = card.get("correct")
+        answer = correct.get("chinese", "") if isinstance(correct, Mapping) else ""
+        key = f"{card['english']}\x1f{answer}"
+    else:
+        key = f"{card.get('text', '')}\x1f{card.get('correct', '')}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:12]
+
+
+def render_deck_cards(decks: dict[str, Deck] = DECKS) -> str:
+    """Homepage card list, one card per registered deck."""
+    cards = []
+    for deck in decks.values():
+        a, b = deck.accent, deck.accent_to
+        cards.append(f"""      <div class="bg-gradient-to-br from-{a}-50 to-{b}-50 rounded-xl p-6 border border-{a}-200">
+        <h2 class="text-xl font-bold text-{a}-900 mb-3">{deck.icon} {escape(deck.title)}</h2>
+        <p class="text-gray-700 mb-4">{escape(deck.blurb)}</p>
+        <a href="{deck.path}" class="w-full bg-{a}-600 text-white px-6 py-3 rounded-lg font-semibold hover:bg-{a}-700 btn block text-center">
+          Play Game
+        </a>
+      </div>""")
+    return "\n\n".join(cards)
@@ -0,0 +1,200 @@
+# flashcards/distractors.py
+"""Generated distractors for pinyin and HSK cards.
+
+:class:`DistractorEngine` holds two indexes:
+
+* syllable -> confusable syllables: other tones of the same syllable, plus
+  initial swaps (zh/z, n/l, ...) and final swaps (in/ing, an/ang, ...) that
+  are real Mandarin syllables;
+* Chinese length -> answer options from every HSK card, so a two-character
+  word is offered alongside other two-character words.
+
+The syllable table is built once per process and each deck's answers are
+extracted once per deck version (:meth:`DistractorEngine.answers`), so an
+edit to one deck only re-reads that deck's cards.
+
+Each card then gets ``n`` fresh, deduplicated distractors by sampling from
+those indexes, in O(1) amortized time per distractor. The random stream is
+derived from ``(seed, card id)``, so a given seed always yields the same
+distractors for a card regardless of batch order. :meth:`DistractorEngine.regenerate`
+regenerates a whole deck in a single pass over the shared indexes.
+"""
+from __future__ import annotations
+
+import random
+import re
+from collections import defaultdict
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Iterable, Mapping, Sequence
+
+from flashcards.decks import card_id
+from flashcards.tones import SYLLABLES
+
+VALID_SYLLABLES = frozenset(SYLLABLES)
+
+INITIALS = sorted(
+    "b p m f d t n l g k h j q x zh ch sh r z c s y w".split(), key=len, reverse=True,
+)
+
+INITIAL_CONFUSIONS = [
+    ("zh", "z"), ("ch", "c"), ("sh", "s"), ("n", "l"), ("f", "h"), ("r", "l"),
+    ("zh", "j"), ("ch", "q"), ("sh", "x"), ("b", "p"), ("d", "t"), ("g", "k"),
+]
+FINAL_CONFUSIONS = [
+    ("in", "ing"), ("en", "eng"), ("an", "ang"), ("ian", "iang"), ("uan", "uang"),
+    ("ao", "ou"), ("ie", "üe"), ("u", "ü"), ("un", "ong"), ("ei", "ui"),
+]
+
+# Attempts per requested distractor before giving up on a sparse card.
+MAX_TRIES_PER_DISTRACTOR = 8
+
+_TOKEN_RE = re.compile(r"^([a-zü]+)([1-5])?$")
+
+
+def _pairs_to_map(pairs: list[tuple[str, str]]) -> dict[str, list[str]]:
+    out: dict[str, list[str]] = defaultdict(list)
+    for a, b in pairs:
+        out[a].append(b)
+        out[b].append(a)
+    return out
+
+
+_INITIAL_MAP = _pairs_to_map(INITIAL_CONFUSIONS)
+_FINAL_MAP = _pairs_to_map(FINAL_CONFUSIONS)
+
+
+def split_syllable(base: str) -> tuple[str, str]:
+    for initial in INITIALS:
+        if base.startswith(initial) and len(base) > len(initial):
+            return initial, base[len(initial):]
+    return "", base
+
+
+def parse_token(token: str) -> tuple[str, int] | None:
+    """``"lv4"`` -> ``("lü", 4)``; neutral ``"ma"`` -> ``("ma", 5)``; ``None`` if not pinyin."""
+    t = token.lower().replace("u:", "ü").replace("v", "ü")
+    m = _TOKEN_RE.match(t)
+    if m is None or m.group(1) not in VALID_SYLLABLES:
+        return None
+    return m.group(1), int(m.group(2) or 5)
+
+
+def format_syllable(base: str, tone: int) -> str:
+    base = base.replace("ü", "v")
+    return base if tone == 5 else f"{base}{tone}"
+
+
+def _confusions(base: str, tone: int) -> list[str]:
+    """Every valid syllable a learner might confuse with ``base``+``tone``."""
+    out = [format_syllable(base, t) for t in (1, 2, 3, 4) if t != tone]
+    initial, final = split_syllable(base)
+    for alt in _INITIAL_MAP.get(initial, ()):
+        if alt + final in VALID_SYLLABLES:
+            out.append(format_syllable(alt + final, tone))
+    for alt in _FINAL_MAP.get(final, ()):
+        if initial + alt in VALID_SYLLABLES:
+            out.append(format_syllable(initial + alt, tone))
+    return out
+
+
+@lru_cache(maxsize=1)
+def _syllable_index() -> dict[tuple[str, int], list[str]]:
+    return {(base, tone): _confusions(base, tone) for base in SYLLABLES for tone in range(1, 6)}
+
+
+@dataclass
+class DistractorEngine:
+    syllable_index: dict[tuple[str, int], list[str]] = field(default_factory=dict)
+    length_buckets: dict[int, list[dict[str, str]]] = field(default_factory=dict)
+
+    @classmethod
+    def build(cls, decks: Iterable[tuple[str, Iterable[Mapping[str, Any]]]]) -> "DistractorEngine":
+        """Index every ``(kind, cards)`` deck; syllables cover the full syllable table."""
+        return cls.combine(cls.answers(cards) for kind, cards in decks if kind == "hsk")
+
+    @staticmethod
+    def answers(cards: Iterable[Mapping[str, Any]]) -> list[dict[str, str]]:
+        """The distinct answer options of one HSK deck, in card order."""
+        seen: set[str] = set()
+        out = []
+        for card in cards:
+            correct = card.get("correct") if isinstance(card, Mapping) else None
+            if not isinstance(correct, Mapping) or not correct.get("chinese"):
+                continue
+            if correct["chinese"] in seen:
+                continue
+            seen.add(correct["chinese"])
+            out.append({"chinese": correct["chinese"], "pinyin": correct.get("pinyin", "")})
+        return out
+
+    @classmethod
+    def combine(cls, decks: Iterable[Sequence[dict[str, str]]]) -> "DistractorEngine":
+        """An engine over several decks' :meth:`answers` (first occurrence of a word wins)."""
+        seen: set[str] = set()
+        buckets: dict[int, list[dict[str, str]]] = defaultdict(list)
+        for answers in decks:
+            for option in answers:
+                if option["chinese"] not in seen:
+                    seen.add(option["chinese"])
+                    buckets[len(option["chinese"])].append(option)
+        return cls(syllable_index=_syllable_index(), length_buckets=dict(buckets))
+
+    @staticmethod
+    def _rng(seed: int, card: Mapping[str, Any]) -> random.Random:
+        return random.Random(f"{seed}:{card_id(card)}")
+
+    def pinyin_distractors(self, correct: str, n: int, rng: random.Random) -> list[str]:
+        tokens = correct.split()
+        slots = [(i, parsed) for i, t in enumerate(tokens) if (parsed := parse_token(t))]
+        out: list[str] = []
+        if not slots:
+            return out
+        seen = {correct}
+        for _ in range(n * MAX_TRIES_PER_DISTRACTOR):
+            if len(out) >= n:
+                break
+            i, key = rng.choice(slots)
+            options = self.syllable_index.get(key)
+            if not options:
+                continue
+            candidate = " ".join(tokens[:i] + [rng.choice(options)] + tokens[i + 1:])
+            if candidate not in seen:
+                seen.add(candidate)
+                out.append(candidate)
+        return out
+
+    def hsk_distractors(self, correct: Mapping[str, Any], n: int,
+                        rng: random.Random) -> list[dict[str, str]]:
+        answer = correct.get("chinese", "")
+        length = len(answer)
+        # Prefer same-length words, widening one character at a time if the bucket is thin.
+        pool: list[dict[str, str]] = []
+        for spread in range(0, 4):
+            for size in {length - spread, length + spread}:
+                pool.extend(self.length_buckets.get(size, ()))
+            if len(pool) > n:
+                break
+        out: list[dict[str, str]] = []
+        seen = {answer}
+        for _ in range(n * MAX_TRIES_PER_DISTRACTOR):
+            if len(out) >= n or not pool:
+                break
+            option = rng.choice(pool)
+            if option["chinese"] not in seen:
+                seen.add(option["chinese"])
+                out.append(dict(option))
+        return out
+
+    def generate(self, kind: str, card: Mapping[str, Any], n: int, seed: int = 0) -> list[Any]:
+        rng = self._rng(seed, card)
+        if kind == "pinyin":
+            return self.pinyin_distractors(card.get("correct", ""), n, rng)
+        correct = card.get("correct")
+        return self.hsk_distractors(correct, n, rng) if isinstance(correct, Mapping) else []
+
+    def regenerate(self, kind: str, cards: Iterable[Mapping[str, Any]], n: int,
+                   seed: int = 0) -> list[list[Any]]:
+        """Fresh distractors for every card of a deck, in one pass."""
+        generate = self.generate
+        return [generate(kind, card, n, seed) for card in cards]
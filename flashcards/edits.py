@@ -0,0 +1,205 @@
+# flashcards/edits.py
+"""Append-only log of individual card edits, applied on top of ``data.json``.
+
+Every admin change (add, update or delete one card) is a row in SQLite with
+the deck's next version number, so a deck's version is simply the number
+of edits made to it. :class:`~flashcards.store.DeckStore` overlays the edited
+decks on the file snapshot; untouched decks keep their cards, version and
+every cache built from them. Other processes writing to the same database
+are picked up through ``PRAGMA data_version``, which costs no disk read when
+nothing changed.
+
+Edits are addressed by :func:`~flashcards.decks.card_id` and survive a new
+``data.json``: an update whose card is gone is added instead, a delete of a
+missing card does nothing.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterable, Mapping, Sequence
+
+from flashcards.decks import card_id
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = Path(
+    os.environ.get("FLASHCARDS_EDITS_DB")
+    or Path(tempfile.gettempdir()) / "flashcards-edits.sqlite3"
+)
+
+OPS = ("add", "update", "delete")
+# After the database cannot be opened or read, polls are skipped for this long.
+RETRY_AFTER = 30.0
+
+
+@dataclass(frozen=True)
+class CardEdit:
+    seq: int
+    deck: str              # data.json key
+    version: int           # the deck's version after this edit
+    op: str                # "add", "update" or "delete"
+    card_id: str           # card replaced or deleted ("" for add)
+    card: dict[str, Any] | None
+    actor: str
+    at: float
+
+    @property
+    def touched(self) -> set[str]:
+        """Ids whose presence or content this edit may have changed."""
+        ids = {self.card_id} if self.card_id else set()
+        if self.card is not None:
+            ids.add(card_id(self.card))
+        return ids
+
+
+def apply_edits(cards: Sequence[Mapping[str, Any]], edits: Iterable[CardEdit]) -> list[Mapping[str, Any]]:
+    """A deck's cards after ``edits``, in file order with added cards at the end."""
+    out: list[Mapping[str, Any] | None] = list(cards)
+    position: dict[str, int] = {}
+    for i, card in enumerate(out):
+        if isinstance(card, Mapping):
+            position.setdefault(card_id(card), i)
+    for edit in edits:
+        i = position.pop(edit.card_id, None) if edit.op != "add" else None
+        if edit.op == "delete":
+            if i is not None:
+                out[i] = None
+            continue
+        new_id = card_id(edit.card)
+        if i is None:
+            i = position.get(new_id)
+        if i is None:
+            i = len(out)
+            out.append(edit.card)
+        else:
+            out[i] = edit.card
+        position[new_id] = i
+    return [card for card in out if card is not None]
+
+
+class EditLog:
+    """SQLite-backed edit log with an in-memory copy of every entry."""
+
+    def __init__(self, path: Path = DEFAULT_DB_PATH) -> None:
+        self.path = Path(path)
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+        self._data_version: int | None = None
+        self._retry_at = 0.0
+        self._seq = 0
+        self._by_deck: dict[str, list[CardEdit]] = {}
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            try:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS card_edits ("
+                    " seq INTEGER PRIMARY KEY AUTOINCREMENT, deck TEXT NOT NULL,"
+                    " version INTEGER NOT NULL, op TEXT NOT NULL, card_id TEXT NOT NULL,"
+                    " card TEXT, actor TEXT NOT NULL, at REAL NOT NULL,"
+                    " UNIQUE (deck, version))"
+                )
+            except sqlite3.Error:
+                conn.close()
+                raise
+            self._conn = conn
+        return self._conn
+
+    def _remember(self, rows: Iterable[tuple]) -> set[str]:
+        decks = set()
+        for seq, deck, version, op, cid, card, actor, at in rows:
+            edit = CardEdit(seq, deck, version, op, cid, json.loads(card) if card else None, actor, at)
+            self._by_deck.setdefault(deck, []).append(edit)
+            self._seq = max(self._seq, seq)
+            decks.add(deck)
+        return decks
+
+    def poll(self) -> set[str]:
+        """Load entries committed by any process since the last poll; returns the decks they touch.
+
+        A failing database is logged once and not tried again for :data:`RETRY_AFTER`
+        seconds; the decks keep the edits loaded so far.
+        """
+        with self._lock:
+            if time.monotonic() < self._retry_at:
+                return set()
+            try:
+                conn = self._connect()
+                data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+                if data_version == self._data_version:
+                    return set()
+                self._data_version = data_version
+                rows = conn.execute(
+                    "SELECT seq, deck, version, op, card_id, card, actor, at FROM card_edits"
+                    " WHERE seq > ? ORDER BY seq", (self._seq,),
+                ).fetchall()
+            except (sqlite3.Error, OSError) as e:
+                logger.warning("Cannot read card edits from %s: %s; retrying in %.0fs", self.path, e, RETRY_AFTER)
+                self._disconnect()
+                self._retry_at = time.monotonic() + RETRY_AFTER
+                return set()
+            return self._remember(rows)
+
+    def append(self, deck: str, op: str, cid: str, card: Mapping[str, Any] | None, actor: str) -> CardEdit:
+        """Record one edit as the deck's next version."""
+        if op not in OPS:
+            raise ValueError(f"unknown op {op!r}")
+        body = json.dumps(card, ensure_ascii=False) if card is not None else None
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Catch up first so versions stay dense even with several writers.
+                rows = conn.execute(
+                    "SELECT seq, deck, version, op, card_id, card, actor, at FROM card_edits"
+                    " WHERE seq > ? ORDER BY seq", (self._seq,),
+                ).fetchall()
+                version = (conn.execute("SELECT MAX(version) FROM card_edits WHERE deck = ?",
+                                        (deck,)).fetchone()[0] or 0) + 1
+                at = time.time()
+                seq = conn.execute(
+                    "INSERT INTO card_edits (deck, version, op, card_id, card, actor, at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)", (deck, version, op, cid, body, actor, at),
+                ).lastrowid
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            self._remember(rows)
+            self._remember([(seq, deck, version, op, cid, body, actor, at)])
+            return self._by_deck[deck][-1]
+
+    @property
+    def seq(self) -> int:
+        return self._seq
+
+    def deck(self, deck: str) -> list[CardEdit]:
+        return self._by_deck.get(deck, [])
+
+    def decks(self) -> list[str]:
+        return list(self._by_deck)
+
+    def version(self, deck: str) -> int:
+        edits = self._by_deck.get(deck)
+        return edits[-1].version if edits else 0
+
+    def _disconnect(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def close(self) -> None:
+        with self._lock:
+            self._disconnect()
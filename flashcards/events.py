@@ -0,0 +1,363 @@
+# flashcards/events.py
+"""Answer events -> rolling per-card and per-distractor difficulty counters.
+
+``/api/events`` puts each posted batch on an :class:`asyncio.Queue` and
+returns at once; a consumer task on the event loop drains the queue into
+:class:`AnswerCounts`. Counts are kept in hourly buckets over a rolling
+window, with running window totals beside them, so an answer is an O(1)
+update and a bucket leaving the window is subtracted in one pass.
+
+Every checkpoint interval the per-bucket increments since the last
+checkpoint are added to SQLite (:class:`EventStore`) in one ``executemany``,
+and a restarted process rebuilds its window from there. The increments are
+additive, so several workers can share one database; each worker's
+``/api/stats`` reflects the history it loaded plus its own traffic.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterable
+
+from flashcards.metrics import ANSWER_EVENTS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = Path(
+    os.environ.get("FLASHCARDS_EVENTS_DB")
+    or Path(tempfile.gettempdir()) / "flashcards-events.sqlite3"
+)
+
+BUCKET = 3600.0          # seconds per bucket
+WINDOW_BUCKETS = 7 * 24  # rolling window: the last seven days
+# Posted batches waiting for the consumer; further batches are dropped (and counted).
+MAX_QUEUED_BATCHES = 10_000
+
+# (deck, card, option): option "" counts the card's answers and misses, any other
+# value counts how often that wrong option was picked.
+Key = tuple[str, str, str]
+
+
+@dataclass(frozen=True)
+class Answer:
+    deck: str
+    card: str
+    correct: bool
+    chosen: str | None = None   # the option picked, when it was wrong
+
+
+def _bucket(now: float) -> int:
+    return int(now // BUCKET)
+
+
+class AnswerCounts:
+    """``[answers, misses]`` per key, per bucket and over the whole window."""
+
+    def __init__(self, window_buckets: int = WINDOW_BUCKETS) -> None:
+        self.window_buckets = window_buckets
+        self._buckets: deque[tuple[int, dict[Key, list[int]]]] = deque()
+        self._totals: dict[str, dict[str, dict[str, list[int]]]] = {}  # deck -> card -> option
+        self._pending: dict[tuple[int, Key], list[int]] = {}           # increments since checkpoint
+        self._lock = threading.Lock()
+
+    def _add(self, bucket: int, key: Key, answers: int, misses: int) -> None:
+        for target in (self._counts(bucket).setdefault(key, [0, 0]),
+                       self._totals.setdefault(key[0], {}).setdefault(key[1], {}).setdefault(key[2], [0, 0])):
+            target[0] += answers
+            target[1] += misses
+
+    def _counts(self, bucket: int) -> dict[Key, list[int]]:
+        """The bucket's counts, inserted in order if missing (restored rows can arrive after live ones)."""
+        i = len(self._buckets)
+        while i and self._buckets[i - 1][0] > bucket:
+            i -= 1
+        if i and self._buckets[i - 1][0] == bucket:
+            return self._buckets[i - 1][1]
+        counts: dict[Key, list[int]] = {}
+        self._buckets.insert(i, (bucket, counts))
+        return counts
+
+    def _expire(self, now_bucket: int) -> None:
+        oldest = now_bucket - self.window_buckets
+        while self._buckets and self._buckets[0][0] <= oldest:
+            _, counts = self._buckets.popleft()
+            for (deck, card, option), (answers, misses) in counts.items():
+                cards = self._totals[deck]
+                options = cards[card]
+                total = options[option]
+                total[0] -= answers
+                total[1] -= misses
+                if total[0] <= 0:
+                    del options[option]
+                    if not options:
+                        del cards[card]
+
+    def record(self, answers: Iterable[Answer], now: float | None = None) -> int:
+        bucket = _bucket(time.time() if now is None else now)
+        n = 0
+        with self._lock:
+            self._expire(bucket)
+            for a in answers:
+                miss = 0 if a.correct else 1
+                keys = [((a.deck, a.card, ""), miss)]
+                if miss and a.chosen:
+                    keys.append(((a.deck, a.card, a.chosen), 1))
+                for key, m in keys:
+                    self._add(bucket, key, 1, m)
+                    pending = self._pending.setdefault((bucket, key), [0, 0])
+                    pending[0] += 1
+                    pending[1] += m
+                n += 1
+        return n
+
+    def restore(self, rows: Iterable[tuple[int, str, str, str, int, int]], now: float | None = None) -> None:
+        """Rebuild the window from checkpointed ``(bucket, deck, card, option, answers, misses)`` rows."""
+        now_bucket = _bucket(time.time() if now is None else now)
+        with self._lock:
+            for bucket, deck, card, option, answers, misses in sorted(rows):
+                if bucket > now_bucket - self.window_buckets:
+                    self._add(bucket, (deck, card, option), answers, misses)
+            self._expire(now_bucket)
+
+    def take_pending(self) -> dict[tuple[int, Key], list[int]]:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        return pending
+
+    def restore_pending(self, pending: dict[tuple[int, Key], list[int]]) -> None:
+        """Put back increments whose checkpoint failed."""
+        with self._lock:
+            for key, (answers, misses) in pending.items():
+                current = self._pending.setdefault(key, [0, 0])
+                current[0] += answers
+                current[1] += misses
+
+    def deck(self, deck: str, now: float | None = None) -> dict[str, dict[str, tuple[int, int]]]:
+        """Window totals for one deck: card -> option -> ``(answers, misses)``."""
+        with self._lock:
+            self._expire(_bucket(time.time() if now is None else now))
+            cards = self._totals.get(deck, {})
+            return {card: {o: (t[0], t[1]) for o, t in options.items()} for card, options in cards.items()}
+
+
+def difficulty(answers: int, misses: int) -> float:
+    """Miss rate with one imaginary hit and one miss, so a single answer is not 0 or 1."""
+    return (misses + 1) / (answers + 2)
+
+
+def deck_stats(deck: str, totals: dict[str, dict[str, tuple[int, int]]],
+               known: Iterable[str] | None = None) -> dict[str, Any]:
+    """Answered cards of ``deck``, hardest first, each with its most-picked wrong options."""
+    known = None if known is None else set(known)
+    cards = []
+    for card, options in totals.items():
+        if known is not None and card not in known:
+            continue
+        answers, misses = options.get("", (0, 0))
+        if not answers:
+            continue
+        picked = sorted(((o, t[0]) for o, t in options.items() if o), key=lambda p: (-p[1], p[0]))
+        cards.append({
+            "id": card,
+            "answers": answers,
+            "misses": misses,
+            "difficulty": round(difficulty(answers, misses), 4),
+            "distractors": [{"option": o, "picks": n} for o, n in picked],
+        })
+    cards.sort(key=lambda c: (-c["difficulty"], -c["answers"], c["id"]))
+    return {
+        "deck": deck,
+        "window": int(WINDOW_BUCKETS * BUCKET),
+        "answers": sum(c["answers"] for c in cards),
+        "misses": sum(c["misses"] for c in cards),
+        "cards": cards,
+    }
+
+
+class EventStore:
+    """Additive per-bucket checkpoints in SQLite."""
+
+    def __init__(self, path: Path = DEFAULT_DB_PATH) -> None:
+        self.path = Path(path)
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS answer_counts ("
+                " bucket INTEGER NOT NULL, deck TEXT NOT NULL, card TEXT NOT NULL,"
+                " option TEXT NOT NULL, answers INTEGER NOT NULL, misses INTEGER NOT NULL,"
+                " PRIMARY KEY (bucket, deck, card, option))"
+            )
+            self._conn = conn
+        return self._conn
+
+    def load(self, since_bucket: int) -> list[tuple[int, str, str, str, int, int]]:
+        with self._lock:
+            return self._connect().execute(
+                "SELECT bucket, deck, card, option, answers, misses FROM answer_counts"
+                " WHERE bucket > ?", (since_bucket,),
+            ).fetchall()
+
+    def write(self, pending: dict[tuple[int, Key], list[int]], prune_before: int) -> int:
+        rows = [(b, d, c, o, a, m) for (b, (d, c, o)), (a, m) in pending.items()]
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.executemany(
+                    "INSERT INTO answer_counts (bucket, deck, card, option, answers, misses)"
+                    " VALUES (?, ?, ?, ?, ?, ?)"
+                    " ON CONFLICT (bucket, deck, card, option) DO UPDATE SET"
+                    " answers = answers + excluded.answers, misses = misses + excluded.misses",
+                    rows,
+                )
+                conn.execute("DELETE FROM answer_counts WHERE bucket <= ?", (prune_before,))
+        return len(rows)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class EventPipeline:
+    """Queue, consumer task and periodic checkpoints around :class:`AnswerCounts`."""
+
+    def __init__(self, store: EventStore, checkpoint_interval: float = 30.0) -> None:
+        self.store = store
+        self.counts = AnswerCounts()
+        self.checkpoint_interval = checkpoint_interval
+        self._queue: asyncio.Queue[list[Answer]] | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._tasks: list[asyncio.Task] = []
+        self._restored = False
+
+    def _restore(self) -> None:
+        if not self._restored:
+            self._restored = True
+            try:
+                rows = self.store.load(_bucket(time.time()) - self.counts.window_buckets)
+            except (sqlite3.Error, OSError) as e:
+                logger.warning("Could not restore answer counts from %s: %s; counting in memory",
+                               self.store.path, e)
+                return
+            self.counts.restore(rows)
+
+    def start(self) -> None:
+        """Start the consumer on the running loop; a no-op if it already runs there."""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        self._drain()
+        self._loop = loop
+        self._queue = asyncio.Queue(MAX_QUEUED_BATCHES)
+        self._tasks = [loop.create_task(self._consume()), loop.create_task(self._checkpoints())]
+        if not self._restored:
+            # Off the loop: startup and the first requests do not wait for SQLite.
+            self._tasks.append(loop.create_task(asyncio.to_thread(self._restore)))
+
+    def _drain(self) -> None:
+        """Record whatever is still queued and drop the tasks (e.g. their loop has ended)."""
+        if self._queue is not None:
+            while not self._queue.empty():
+                self.counts.record(self._queue.get_nowait())
+        for task in self._tasks:
+            task.cancel()
+        self._tasks, self._queue, self._loop = [], None, None
+
+    def submit(self, answers: list[Answer]) -> bool:
+        """Queue a batch; ``False`` (and nothing recorded) when the queue is full."""
+        self.start()
+        try:
+            self._queue.put_nowait(answers)
+        except asyncio.QueueFull:
+            ANSWER_EVENTS.inc(len(answers), result="dropped")
+            return False
+        ANSWER_EVENTS.inc(len(answers), result="accepted")
+        return True
+
+    async def _consume(self) -> None:
+        while True:
+            batch = await self._queue.get()
+            self.counts.record(batch)
+            self._queue.task_done()
+
+    async def _checkpoints(self) -> None:
+        while True:
+            await asyncio.sleep(self.checkpoint_interval)
+            await asyncio.to_thread(self.checkpoint)
+
+    def checkpoint(self) -> int:
+        pending = self.counts.take_pending()
+        if not pending:
+            return 0
+        try:
+            return self.store.write(pending, _bucket(time.time()) - self.counts.window_buckets)
+        except (sqlite3.Error, OSError) as e:
+            logger.warning("Answer count checkpoint to %s failed: %s; will retry", self.store.path, e)
+            self.counts.restore_pending(pending)
+            return 0
+
+    def stats(self, deck: str, known: Iterable[str] | None = None) -> dict[str, Any]:
+        self._restore()
+        return deck_stats(deck, self.counts.deck(deck), known)
+
+    async def close(self) -> None:
+        """Drain queued batches, stop the tasks and write a final checkpoint."""
+        self._drain()
+        self.checkpoint()
+        self.store.close()
+
+
+def check() -> list[str]:
+    """Window totals must not depend on whether restored rows or live answers come first."""
+    now = 1000 * BUCKET
+    now_bucket = _bucket(now)
+    rows = [(now_bucket - 5, "pinyin", "x", "", 10, 7), (now_bucket - 5, "pinyin", "x", "a", 7, 7),
+            (now_bucket, "pinyin", "x", "", 2, 1), (now_bucket - WINDOW_BUCKETS, "pinyin", "x", "", 50, 50)]
+    live = [Answer("pinyin", "x", False, "a")]
+    expected = {"x": {"": (13, 9), "a": (8, 8)}}
+    failures = []
+    for order in ("restore first", "live first"):
+        counts = AnswerCounts()
+        if order == "live first":
+            counts.record(live, now)
+        counts.restore(rows, now)
+        if order == "restore first":
+            counts.record(live, now)
+        got = counts.deck("pinyin", now)
+        if got != expected:
+            failures.append(f"{order}: {got} != {expected}")
+        later = counts.deck("pinyin", now + (WINDOW_BUCKETS - 5) * BUCKET)
+        if later != {"x": {"": (3, 2), "a": (1, 1)}}:
+            failures.append(f"{order}, after the restored hour expires: {later}")
+    return failures
+
+
+def main() -> int:
+    failures = check()
+    for failure in failures:
+        print(failure, file=sys.stderr)
+    if failures:
+        return 1
+    print("window totals match with restored rows before and after live answers")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+# flashcards/export.py
+"""Static site export: write every data-derived response to ``dist/``.
+
+    python -m flashcards.export [--out dist] [--verify]
+
+Pages, deck JSON and hashed assets are taken from ``api.index.static_routes()``,
+so each file holds exactly the bytes the FastAPI app would serve, together with
+``.gz`` / ``.br`` siblings and a ``manifest.json`` of content hashes. Serve
+``dist/`` from a CDN with clean URLs and keep the Python function only for the
+dynamic ``/api`` endpoints. ``--verify`` requests every exported URL from a
+fresh interpreter that renders from ``data.json`` (no render cache, no frozen
+snapshot) and fails if any file differs from that live response.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from flashcards import asgi
+from flashcards.freeze import ROOT
+from flashcards.render import Rendered
+
+ENCODING_SUFFIXES = {"gzip": ".gz", "br": ".br"}
+
+
+def output_path(url: str, rendered: Rendered) -> str:
+    """Relative file for a URL: pages as ``<url>/index.html``, JSON as ``<url>.json``."""
+    rel = url.strip("/")
+    if rendered.media_type == "text/html":
+        return f"{rel}/index.html" if rel else "index.html"
+    if rendered.media_type == "application/json" and not rel.endswith(".json"):
+        return f"{rel}.json"
+    return rel
+
+
+def export(out: Path) -> dict[str, dict]:
+    from api.index import static_routes
+
+    if out.exists():
+        if any(out.iterdir()) and not (out / "manifest.json").exists():
+            raise SystemExit(f"{out} is not empty and is not a previous export; refusing to overwrite")
+        shutil.rmtree(out)
+    manifest: dict[str, dict] = {}
+    for url, rendered in static_routes():
+        rel = output_path(url, rendered)
+        target = out / rel
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(rendered.body)
+        encodings = []
+        for encoding in rendered.variants:
+            if encoding in ENCODING_SUFFIXES:
+                body, _ = rendered.variant(encoding)
+                target.with_name(target.name + ENCODING_SUFFIXES[encoding]).write_bytes(body)
+                encodings.append(encoding)
+        manifest[url] = {
+            "file": rel,
+            "sha256": hashlib.sha256(rendered.body).hexdigest(),
+            "etag": rendered.etag,
+            "bytes": len(rendered.body),
+            "contentType": rendered.media_type,
+            "encodings": encodings,
+        }
+    (out / "manifest.json").write_text(json.dumps(manifest, indent=2, ensure_ascii=False) + "\n",
+                                       encoding="utf-8")
+    return manifest
+
+
+def compare(out: Path) -> list[str]:
+    """Return the URLs in ``out/manifest.json`` whose files differ from this process's app."""
+    from api.index import app
+
+    manifest = json.loads((out / "manifest.json").read_text(encoding="utf-8"))
+    mismatches = []
+    for url, entry in manifest.items():
+        live = asgi.get(app, url, headers={"accept-encoding": "identity"})
+        if live.status != 200 or live.body != (out / entry["file"]).read_bytes():
+            mismatches.append(url)
+    return mismatches
+
+
+def verify(out: Path) -> list[str]:
+    """:func:`compare` in a fresh interpreter, so nothing rendered for the export is reused."""
+    with tempfile.TemporaryDirectory() as tmp:
+        # A snapshot path that does not exist: every response is rendered from scratch.
+        env = {**os.environ, "FLASHCARDS_FROZEN": str(Path(tmp) / "none.marshal"),
+               "PYTHONPATH": os.pathsep.join(filter(None, [str(ROOT), os.environ.get("PYTHONPATH")]))}
+        result = subprocess.run(
+            [sys.executable, "-m", "flashcards.export", "--out", str(out.resolve()), "--compare"],
+            env=env, cwd=ROOT, capture_output=True, text=True,
+        )
+    if result.returncode not in (0, 1) or not result.stdout.startswith("compared"):
+        raise SystemExit(f"verification failed to run:\n{result.stderr}")
+    return result.stdout.splitlines()[1:]
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m flashcards.export", description=__doc__.splitlines()[0])
+    parser.add_argument("--out", type=Path, default=Path("dist"))
+    parser.add_argument("--verify", action="store_true", help="compare every file against the live app")
+    parser.add_argument("--compare", action="store_true", help=argparse.SUPPRESS)  # run by --verify
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        mismatches = compare(args.out)
+        print("compared", *mismatches, sep="\n")
+        return 1 if mismatches else 0
+
+    manifest = export(args.out)
+    total = sum(e["bytes"] for e in manifest.values())
+    print(f"Exported {len(manifest)} URLs ({total} bytes) to {args.out}")
+    if args.verify:
+        mismatches = verify(args.out)
+        for url in mismatches:
+            print(f"MISMATCH {url}", file=sys.stderr)
+        if mismatches:
+            return 1
+        print("All exported files match the live responses byte for byte")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+# flashcards/freeze.py
+"""Build-time snapshot of every pre-renderable response.
+
+    python -m flashcards.freeze                  # writes build/frozen.marshal
+    python -m flashcards.freeze --out /tmp/frozen.marshal
+
+The snapshot holds the finished bytes (and compressed variants) of every
+route in :func:`api.index.static_routes`, plus the version of the deck
+snapshot it was rendered from. At import, ``api.index`` preloads the
+render cache from it and marks that data version as trusted, so a cold
+process serves its first pages without parsing JSON, projecting decks or
+running brotli.
+
+A snapshot is ignored unless its code fingerprint matches the running
+source tree; a changed ``data.json`` simply misses the preloaded entries.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import logging
+import marshal
+import os
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+
+from flashcards.render import Rendered
+
+logger = logging.getLogger(__name__)
+
+ROOT = Path(__file__).resolve().parent.parent
+
+DEFAULT_FROZEN_PATH = Path(
+    os.environ.get("FLASHCARDS_FROZEN") or ROOT / "build" / "frozen.marshal"
+)
+
+FORMAT = 1
+
+
+def code_fingerprint(root: Path = ROOT) -> str:
+    """Hash of every source file that can change rendered output."""
+    files = [root / "api" / "index.py", *sorted((root / "flashcards").glob("*.py")),
+             *sorted(p for p in (root / "static").iterdir() if p.is_file())]
+    h = hashlib.sha256()
+    for path in files:
+        h.update(path.relative_to(root).as_posix().encode())
+        h.update(b"\0")
+        h.update(path.read_bytes())
+    return h.hexdigest()[:16]
+
+
+@dataclass(frozen=True)
+class Frozen:
+    data_version: str
+    entries: dict[str, Rendered]
+
+
+def _dump_entry(r: Rendered) -> tuple:
+    return (r.body, r.etag, r.version, r.media_type, r.variants)
+
+
+def _load_entry(t: tuple) -> Rendered:
+    body, etag, version, media_type, variants = t
+    return Rendered(body=body, etag=etag, version=version, media_type=media_type, variants=variants)
+
+
+def build(out: Path = DEFAULT_FROZEN_PATH) -> Frozen:
+    """Render every static route from the current tree and write the snapshot."""
+    import api.index as index
+
+    snapshot = index.store.snapshot()
+    index.static_routes()
+    # The file's own version: card edits are overlaid at runtime, not trusted here.
+    frozen = Frozen(data_version=snapshot.base or snapshot.version, entries=index.pages.entries())
+    document = {
+        "format": FORMAT,
+        "fingerprint": code_fingerprint(),
+        "data_version": frozen.data_version,
+        "entries": {key: _dump_entry(r) for key, r in frozen.entries.items()},
+    }
+    out = Path(out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out.with_suffix(out.suffix + ".tmp")
+    tmp.write_bytes(marshal.dumps(document))
+    tmp.replace(out)
+    return frozen
+
+
+def load(path: Path = DEFAULT_FROZEN_PATH) -> Frozen | None:
+    """Read a snapshot, or ``None`` if it is missing, unreadable or stale."""
+    try:
+        document = marshal.loads(Path(path).read_bytes())
+    except FileNotFoundError:
+        return None
+    except (OSError, EOFError, ValueError, TypeError) as e:
+        logger.warning("Ignoring frozen snapshot %s: %s", path, e)
+        return None
+    if not isinstance(document, dict) or document.get("format") != FORMAT:
+        logger.warning("Ignoring frozen snapshot %s: unknown format", path)
+        return None
+    if document.get("fingerprint") != code_fingerprint():
+        logger.info("Ignoring frozen snapshot %s: built from different code", path)
+        return None
+    entries = {key: _load_entry(t) for key, t in document["entries"].items()}
+    return Frozen(data_version=document["data_version"], entries=entries)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m flashcards.freeze",
+                                     description="Pre-render every static route into a snapshot.")
+    parser.add_argument("--out", type=Path, default=DEFAULT_FROZEN_PATH)
+    args = parser.parse_args(argv)
+    frozen = build(args.out)
+    size = args.out.stat().st_size
+    print(f"Froze {len(frozen.entries)} entries for data {frozen.data_version} "
+          f"into {args.out} ({size} bytes)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
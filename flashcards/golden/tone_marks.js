@@ -0,0 +1,51 @@
+// flashcards/golden/tone_marks.js
+// The toToneMarks helper the game pages ran before flashcards/tones.py, copied
+// unchanged from the original api/index.py. Regenerate the golden file with:
+//   python -m flashcards.tones --inputs | node flashcards/golden/tone_marks.js > flashcards/golden/tone_marks.tsv
+function toToneMarks(pinyinStr){
+  if(!pinyinStr) return "";
+  // Per-syllable: find trailing tone digit 1-4 (0/5 = neutral), apply to vowel.
+  const toneMap = {
+    'a': ['ā','á','ǎ','à'], 'e': ['ē','é','ě','è'], 'i': ['ī','í','ǐ','ì'],
+    'o': ['ō','ó','ǒ','ò'], 'u': ['ū','ú','ǔ','ù'], 'ü': ['ǖ','ǘ','ǚ','ǜ']
+  };
+  function convertSyllable(syl){
+    if(!syl) return syl;
+    // Handle ü written as "u:" or "v"
+    syl = syl.replace(/u:/gi,'ü').replace(/v/gi,'ü');
+    const m = syl.match(/^([a-zāēīōūǖü]+)([1-5])$/i);
+    let base = syl, tone = 0;
+    if(m){
+      base = m[1];
+      tone = parseInt(m[2],10);
+    }
+    if(tone===0 || tone===5 || !/[aeiouü]/i.test(base)) return base;
+    const lower = base.toLowerCase();
+    // Priority: a > e > o; for iu/ui mark second vowel
+    let idx = -1;
+    if(lower.includes('a')) idx = lower.indexOf('a');
+    else if(lower.includes('e')) idx = lower.indexOf('e');
+    else if(lower.includes('ou')) idx = lower.indexOf('o');
+    else if(lower.includes('o')) idx = lower.indexOf('o');
+    else if(lower.includes('iu')) idx = lower.indexOf('u'); // second in "iu"
+    else if(lower.includes('ui')) idx = lower.indexOf('i'); // second in "ui"
+    else {
+      // pick last vowel
+      const last = Math.max(lower.lastIndexOf('i'), lower.lastIndexOf('u'), lower.lastIndexOf('ü'));
+      idx = last;
+    }
+    if(idx < 0) return base;
+    const ch = base[idx];
+    const key = ch.toLowerCase();
+    const rep = toneMap[key] ? toneMap[key][tone-1] : ch;
+    // preserve case
+    const repFinal = (ch===ch.toUpperCase()) ? rep.toUpperCase() : rep;
+    return base.slice(0,idx) + repFinal + base.slice(idx+1);
+  }
+  // Split by space to keep multi-syllable spacing intact
+  return pinyinStr.split(/\s+/).map(convertSyllable).join(' ');
+}
+
+const lines = require('fs').readFileSync(0, 'utf8').split('\n');
+if(lines[lines.length - 1] === '') lines.pop();
+process.stdout.write(lines.map(line => line + '\t' + toToneMarks(line) + '\n').join(''));
@@ -0,0 +1,335 @@
+# flashcards/importer.py
+"""Build decks from large vocabulary files (CC-CEDICT or CSV), streaming.
+
+    python -m flashcards.importer cedict_ts.u8 --levels hsk.tsv --deck hskLevel1=1 --deck hskLevel2=2
+    python -m flashcards.importer words.csv --deck hskLevel3=3 --pinyin-deck pinyinLevel3=3 --out data.json
+
+The source is read one row at a time (:func:`read_cedict`, :func:`read_csv`),
+so a 120k-line dictionary costs no more memory than the decks being built.
+Pinyin is normalized to the numbered form the decks store (``"nǐhǎo"`` ->
+``"ni3 hao3"``). Each ``--deck KEY=LEVELS`` collects the rows whose HSK level
+is in ``LEVELS`` (comma-separated, ``*`` for every row); levels come from a
+CSV ``level`` column or a ``--levels`` word list. HSK cards get same-length
+distractors and pinyin cards a confusable-syllable distractor, both from
+:class:`~flashcards.distractors.DistractorEngine` over the deck being built.
+
+Only the listed keys of ``--out`` are replaced: their values are spliced into
+the existing text one card per line, so the rest of a hand-edited file keeps
+its bytes and layout. ``<out>.import.json`` keeps the
+hash of every source row per deck; a deck whose rows hash the same as on the
+last run is not rebuilt, and an unchanged source rewrites nothing. New keys are
+served once they are registered in :data:`flashcards.decks.DECKS`.
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import hashlib
+import json
+import re
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterable, Iterator, TextIO
+
+from flashcards.distractors import DistractorEngine
+from flashcards.schema import validate_deck
+from flashcards.store import DEFAULT_DATA_PATH
+from flashcards.tones import to_numbered
+
+# Options offered per HSK card besides the correct one (as in the hand-written decks).
+HSK_DISTRACTORS = 3
+# Longest English prompt kept; CC-CEDICT glosses can run to whole sentences.
+MAX_ENGLISH = 60
+
+_CEDICT_RE = re.compile(r"^(\S+) (\S+) \[([^\]]*)\] /(.*)/\s*$")
+# Glosses that make poor prompts.
+_SKIP_GLOSS_RE = re.compile(r"^(CL:|(old )?variant of|see |surname |abbr\. for|used in )", re.IGNORECASE)
+
+CSV_COLUMNS = {
+    "word": ("simplified", "chinese", "hanzi", "word"),
+    "traditional": ("traditional",),
+    "pinyin": ("pinyin",),
+    "english": ("english", "definition", "meaning", "en"),
+    "level": ("level", "hsk", "hsk_level"),
+}
+
+
+@dataclass(frozen=True)
+class Row:
+    word: str
+    pinyin: str        # numbered, see flashcards.tones.to_numbered
+    english: str
+    level: str | None = None
+    traditional: str = ""
+
+    @property
+    def hash(self) -> str:
+        fields = (self.word, self.traditional, self.pinyin, self.english, self.level or "")
+        return hashlib.sha1("\x1f".join(fields).encode("utf-8")).hexdigest()[:16]
+
+
+def _english(glosses: Iterable[str]) -> str:
+    for gloss in glosses:
+        gloss = re.sub(r"\s*\([^)]*\)", "", gloss).strip()
+        if gloss and not _SKIP_GLOSS_RE.match(gloss) and len(gloss) <= MAX_ENGLISH:
+            return gloss
+    return ""
+
+
+def read_cedict(lines: Iterable[str]) -> Iterator[Row]:
+    """``Traditional Simplified [pin1 yin1] /gloss/gloss/`` lines; comments and bad lines skipped."""
+    for line in lines:
+        if line.startswith("#"):
+            continue
+        m = _CEDICT_RE.match(line)
+        if m is None:
+            continue
+        traditional, simplified, pinyin, glosses = m.groups()
+        english = _english(glosses.split("/"))
+        if english:
+            yield Row(simplified, to_numbered(pinyin), english, traditional=traditional)
+
+
+def read_csv(f: TextIO, delimiter: str = ",") -> Iterator[Row]:
+    """CSV with a header naming the word, pinyin and English columns (and optionally the level)."""
+    reader = csv.reader(f, delimiter=delimiter)
+    header = [h.strip().lower() for h in next(reader, [])]
+    columns = {
+        name: next((header.index(a) for a in aliases if a in header), None)
+        for name, aliases in CSV_COLUMNS.items()
+    }
+    missing = [n for n in ("word", "pinyin", "english") if columns[n] is None]
+    if missing:
+        raise ValueError(f"CSV header lacks column(s): {', '.join(missing)}")
+
+    def cell(row: list[str], name: str) -> str:
+        i = columns[name]
+        return row[i].strip() if i is not None and i < len(row) else ""
+
+    for row in reader:
+        word, english = cell(row, "word"), _english(cell(row, "english").split(";"))
+        if word and english:
+            yield Row(word, to_numbered(cell(row, "pinyin")), english,
+                      cell(row, "level") or None, cell(row, "traditional"))
+
+
+def read_levels(f: TextIO) -> dict[str, str]:
+    """``word<TAB or comma>level`` lines (a header line, if any, is ignored)."""
+    levels = {}
+    for line in f:
+        parts = re.split(r"[\t,]", line.strip())
+        if len(parts) >= 2 and parts[0] and not parts[0].startswith("#"):
+            levels.setdefault(parts[0].strip(), parts[1].strip())
+    return levels
+
+
+def read_rows(path: Path) -> Iterator[Row]:
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        if path.suffix.lower() in (".csv", ".tsv"):
+            yield from read_csv(f, "\t" if path.suffix.lower() == ".tsv" else ",")
+        else:
+            yield from read_cedict(f)
+
+
+@dataclass
+class DeckSpec:
+    key: str
+    kind: str                   # "hsk" or "pinyin"
+    levels: frozenset[str]      # empty = every row
+
+    @classmethod
+    def parse(cls, spec: str, kind: str) -> "DeckSpec":
+        key, sep, levels = spec.partition("=")
+        if not sep or not key:
+            raise argparse.ArgumentTypeError(f"expected KEY=LEVELS, got {spec!r}")
+        wanted = frozenset(l.strip() for l in levels.split(",") if l.strip() and l.strip() != "*")
+        return cls(key, kind, wanted)
+
+    def wants(self, row: Row) -> bool:
+        return not self.levels or row.level in self.levels
+
+    def fingerprint(self) -> str:
+        return f"{self.kind}:{','.join(sorted(self.levels)) or '*'}"
+
+
+def collect(rows: Iterable[Row], specs: list[DeckSpec],
+            levels: dict[str, str] | None = None) -> dict[str, list[Row]]:
+    """One pass over the source: each deck's rows, first reading of a word wins."""
+    selected: dict[str, list[Row]] = {s.key: [] for s in specs}
+    seen: dict[str, set[str]] = {s.key: set() for s in specs}
+    for row in rows:
+        if levels and row.level is None:
+            level = levels.get(row.word) or levels.get(row.traditional)
+            if level is None:
+                continue
+            row = Row(row.word, row.pinyin, row.english, level, row.traditional)
+        for spec in specs:
+            if spec.wants(row) and row.word not in seen[spec.key]:
+                seen[spec.key].add(row.word)
+                selected[spec.key].append(row)
+    return selected
+
+
+def build_deck(spec: DeckSpec, rows: list[Row], seed: int = 0) -> tuple[list[dict[str, Any]], list[str]]:
+    """Cards in the shape the routes consume, plus validation messages for dropped rows."""
+    if spec.kind == "pinyin":
+        drafts = [{"text": r.word, "en": r.english, "correct": r.pinyin} for r in rows if r.pinyin]
+    else:
+        drafts = [{"english": r.english, "correct": {"chinese": r.word, "pinyin": r.pinyin}}
+                  for r in rows if r.pinyin]
+    engine = DistractorEngine.build([(spec.kind, drafts)])
+    cards = []
+    for draft in drafts:
+        if spec.kind == "pinyin":
+            options = engine.generate("pinyin", draft, 1, seed)
+            if options:
+                cards.append({**draft, "distractor": options[0]})
+        else:
+            options = engine.generate("hsk", draft, HSK_DISTRACTORS, seed)
+            if options:
+                cards.append({**draft, "distractors": options})
+    report = validate_deck(spec.kind, spec.key, cards)
+    dropped = len(drafts) - len(cards)
+    messages = report.errors + ([f"{spec.key}: {dropped} rows without a usable distractor"] if dropped else [])
+    return [card.model_dump() for card in report.cards], messages
+
+
+def _inline(value: Any) -> str:
+    """JSON on one line in the hand-written data.json style: ``{ "k": v, ... }``."""
+    if isinstance(value, dict):
+        if not value:
+            return "{}"
+        items = ", ".join(f"{json.dumps(k, ensure_ascii=False)}: {_inline(v)}" for k, v in value.items())
+        return "{ " + items + " }"
+    if isinstance(value, list):
+        return "[ " + ", ".join(_inline(v) for v in value) + " ]" if value else "[]"
+    return json.dumps(value, ensure_ascii=False)
+
+
+def format_deck(cards: list[Any]) -> str:
+    return "[\n" + ",\n".join(_inline(card) for card in cards) + "\n]" if cards else "[]"
+
+
+def _value_spans(text: str) -> dict[str, tuple[int, int]]:
+    """Character span of each top-level value of the JSON object ``text``."""
+    decoder = json.JSONDecoder()
+    ws = re.compile(r"\s*")
+    i = ws.match(text, 0).end()
+    if text[i:i + 1] != "{":
+        raise ValueError("top level is not a JSON object")
+    spans = {}
+    i = ws.match(text, i + 1).end()
+    while text[i:i + 1] != "}":
+        key, i = decoder.raw_decode(text, i)
+        i = ws.match(text, i).end()
+        if text[i:i + 1] != ":":
+            raise ValueError(f"expected ':' at offset {i}")
+        start = ws.match(text, i + 1).end()
+        _, end = decoder.raw_decode(text, start)
+        spans[key] = (start, end)
+        i = ws.match(text, end).end()
+        if text[i:i + 1] == ",":
+            i = ws.match(text, i + 1).end()
+    return spans
+
+
+def splice(text: str, decks: dict[str, list[Any]]) -> str:
+    """``text`` with the value of each key in ``decks`` replaced (new keys appended at the end)."""
+    if not text.strip():
+        body = ",\n".join(f"{json.dumps(k, ensure_ascii=False)}: {format_deck(v)}" for k, v in decks.items())
+        return "{\n" + body + "\n}\n"
+    spans = _value_spans(text)
+    new = {k: v for k, v in decks.items() if k not in spans}
+    for key, (start, end) in sorted(((k, spans[k]) for k in decks if k in spans),
+                                    key=lambda kv: kv[1][0], reverse=True):
+        text = text[:start] + format_deck(decks[key]) + text[end:]
+    if new:
+        close = text.rindex("}")
+        head = text[:close].rstrip()
+        sep = "," if spans else ""
+        added = ",\n".join(f"{json.dumps(k, ensure_ascii=False)}: {format_deck(v)}" for k, v in new.items())
+        text = f"{head}{sep}\n{added}\n" + text[close:]
+    return text
+
+
+def state_path(out: Path) -> Path:
+    return out.with_name(out.name + ".import.json")
+
+
+def run(source: Path, specs: list[DeckSpec], out: Path, levels: dict[str, str] | None = None,
+        force: bool = False, log: TextIO = sys.stdout) -> dict[str, str]:
+    """Import ``source`` into ``out``; returns each deck key's outcome."""
+    selected = collect(read_rows(source), specs, levels)
+    try:
+        state = json.loads(state_path(out).read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        state = {}
+    try:
+        text = out.read_text(encoding="utf-8")
+    except FileNotFoundError:
+        text = ""
+    data = json.loads(text) if text.strip() else {}
+
+    outcome, changed = {}, {}
+    for spec in specs:
+        rows = selected[spec.key]
+        hashes = [r.hash for r in rows]
+        digest = hashlib.sha256(f"{spec.fingerprint()}\n{' '.join(hashes)}".encode()).hexdigest()[:16]
+        previous = state.get(spec.key, {})
+        if not force and previous.get("digest") == digest and spec.key in data:
+            outcome[spec.key] = "unchanged"
+            continue
+        before = set(previous.get("rows", ()))
+        added = sum(1 for h in hashes if h not in before)
+        removed = len(before - set(hashes))
+        cards, messages = build_deck(spec, rows)
+        for line in messages:
+            print(f"warning {line}", file=sys.stderr)
+        changed[spec.key] = cards
+        state[spec.key] = {"digest": digest, "rows": hashes}
+        outcome[spec.key] = f"{len(cards)} cards (+{added} -{removed} rows)"
+    for key, result in outcome.items():
+        print(f"{key:<16} {result}", file=log)
+
+    if changed:
+        state_text = json.dumps(state, ensure_ascii=False, indent=2) + "\n"
+        for path, document in ((out, splice(text, changed)), (state_path(out), state_text)):
+            tmp = path.with_name(path.name + ".tmp")
+            tmp.write_text(document, encoding="utf-8")
+            tmp.replace(path)
+    return outcome
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m flashcards.importer",
+                                     description="Build decks from a CC-CEDICT or CSV vocabulary file.")
+    parser.add_argument("source", type=Path, help="CC-CEDICT file, or .csv/.tsv with a header row")
+    parser.add_argument("--deck", action="append", default=[], metavar="KEY=LEVELS",
+                        type=lambda s: DeckSpec.parse(s, "hsk"), help="HSK flash card deck")
+    parser.add_argument("--pinyin-deck", action="append", default=[], metavar="KEY=LEVELS",
+                        type=lambda s: DeckSpec.parse(s, "pinyin"), help="pinyin listening deck")
+    parser.add_argument("--levels", type=Path, help="word<TAB>level list (e.g. the HSK vocabulary)")
+    parser.add_argument("--out", type=Path, default=DEFAULT_DATA_PATH)
+    parser.add_argument("--force", action="store_true", help="rebuild decks even if their rows are unchanged")
+    args = parser.parse_args(argv)
+
+    specs = args.deck + args.pinyin_deck
+    if not specs:
+        parser.error("give at least one --deck or --pinyin-deck")
+    if len({s.key for s in specs}) != len(specs):
+        parser.error("deck keys must be unique")
+    levels = None
+    if args.levels is not None:
+        with open(args.levels, encoding="utf-8-sig") as f:
+            levels = read_levels(f)
+    try:
+        run(args.source, specs, args.out, levels, args.force)
+    except ValueError as e:
+        print(f"{args.source}: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
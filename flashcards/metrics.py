@@ -0,0 +1,241 @@
+# flashcards/metrics.py
+"""Hot-path instrumentation: request spans, counters, histograms, profiling.
+
+``span("parse")`` times a phase and attaches it to the current request, which
+:class:`MetricsMiddleware` reports as a ``Server-Timing`` header. Counters and
+histograms live in :data:`REGISTRY` and are rendered in the Prometheus text
+format for ``/metrics``. Everything is in-process and lock-light, cheap
+enough to leave on in production.
+
+Set ``FLASHCARDS_PROFILE_SAMPLE`` (e.g. ``0.01``) to run a stack-sampling
+profiler on that fraction of requests; folded stacks, ready for
+``flamegraph.pl`` or speedscope, are written to ``FLASHCARDS_PROFILE_DIR``.
+"""
+from __future__ import annotations
+
+import bisect
+import contextvars
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter as _Tally
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator
+
+_spans: contextvars.ContextVar[list[tuple[str, float]] | None] = contextvars.ContextVar(
+    "flashcards_spans", default=None,
+)
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+def _label_str(labels: tuple[tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    parts = []
+    for k, v in labels:
+        v = str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{k}="{v}"')
+    return "{" + ",".join(parts) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help: str) -> None:
+        self.name, self.help = name, help
+        self._values: dict[tuple[tuple[str, str], ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(tuple(sorted(labels.items())), 0.0)
+
+    def expose(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = list(self._values.items())
+        lines += [f"{self.name}{_label_str(k)} {v:g}" for k, v in items]
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.name, self.help, self.buckets = name, help, buckets
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self._values: dict[tuple[tuple[str, str], ...], list[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            row[i] += 1
+            row[-1] += value
+
+    def expose(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._values.items()]
+        for key, row in items:
+            cumulative = 0.0
+            for bound, count in zip((*self.buckets, float("inf")), row):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                lines.append(f"{self.name}_bucket{_label_str(key + (('le', le),))} {cumulative:g}")
+            lines.append(f"{self.name}_sum{_label_str(key)} {row[-1]:.6f}")
+            lines.append(f"{self.name}_count{_label_str(key)} {cumulative:g}")
+        return lines
+
+
+class Registry:
+    def __init__(self) -> None:
+        self.metrics: dict[str, Counter | Histogram] = {}
+
+    def counter(self, name: str, help: str) -> Counter:
+        return self.metrics.setdefault(name, Counter(name, help))
+
+    def histogram(self, name: str, help: str, buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self.metrics.setdefault(name, Histogram(name, help, buckets))
+
+    def expose(self) -> str:
+        lines: list[str] = []
+        for metric in self.metrics.values():
+            lines += metric.expose()
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+REQUESTS = REGISTRY.counter("flashcards_requests_total", "HTTP requests by route and status.")
+RESPONSE_BYTES = REGISTRY.counter("flashcards_response_bytes_total", "Response body bytes sent by route.")
+REQUEST_SECONDS = REGISTRY.histogram("flashcards_request_duration_seconds", "Time to response start by route.")
+PHASE_SECONDS = REGISTRY.histogram("flashcards_phase_duration_seconds", "Time spent in each hot-path phase.")
+CACHE_LOOKUPS = REGISTRY.counter("flashcards_render_cache_total", "Render cache lookups by result (hit/miss).")
+ANSWER_EVENTS = REGISTRY.counter("flashcards_answer_events_total", "Answer events by result (accepted/dropped).")
+RELOADS = REGISTRY.counter("flashcards_deck_reloads_total", "data.json reload attempts by result.")
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Time a phase; recorded in the phase histogram and the request's Server-Timing."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        PHASE_SECONDS.observe(elapsed, phase=name)
+        spans = _spans.get()
+        if spans is not None:
+            spans.append((name, elapsed))
+
+
+def server_timing(spans: list[tuple[str, float]], total: float) -> str:
+    merged: dict[str, float] = {}
+    for name, elapsed in spans:
+        merged[name] = merged.get(name, 0.0) + elapsed
+    merged["app"] = total
+    return ", ".join(f"{name};dur={elapsed * 1000:.3f}" for name, elapsed in merged.items())
+
+
+class StackSampler:
+    """Poll every thread's stack at ``interval`` and tally folded stacks."""
+
+    def __init__(self, interval: float = 0.001) -> None:
+        self.interval = interval
+        self.stacks: _Tally[str] = _Tally()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                names = []
+                while frame is not None:
+                    code = frame.f_code
+                    names.append(f"{code.co_name} ({Path(code.co_filename).name}:{frame.f_lineno})")
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(names))] += 1
+
+    def start(self) -> "StackSampler":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def write(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("".join(f"{stack} {n}\n" for stack, n in self.stacks.items()), encoding="utf-8")
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware: Server-Timing header, request metrics, sampled profiling."""
+
+    def __init__(self, app: Any, profile_sample: float | None = None,
+                 profile_dir: Path | None = None) -> None:
+        self.app = app
+        if profile_sample is None:
+            profile_sample = float(os.environ.get("FLASHCARDS_PROFILE_SAMPLE") or 0)
+        self.profile_sample = profile_sample
+        self.profile_dir = Path(
+            profile_dir or os.environ.get("FLASHCARDS_PROFILE_DIR")
+            or Path(tempfile.gettempdir()) / "flashcards-profiles"
+        )
+
+    async def __call__(self, scope: dict, receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        spans: list[tuple[str, float]] = []
+        token = _spans.set(spans)
+        start = time.perf_counter()
+        status = 0
+        sent = 0
+        sampler = None
+        if self.profile_sample and random.random() < self.profile_sample:
+            sampler = StackSampler().start()
+
+        async def send_wrapper(message: dict) -> None:
+            nonlocal status, sent
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                elapsed = time.perf_counter() - start
+                REQUEST_SECONDS.observe(elapsed, route=_route(scope))
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", server_timing(spans, elapsed).encode()))
+                message = {**message, "headers": headers}
+            elif message["type"] == "http.response.body":
+                sent += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _spans.reset(token)
+            route = _route(scope)
+            REQUESTS.inc(route=route, status=str(status))
+            RESPONSE_BYTES.inc(sent, route=route)
+            if sampler is not None:
+                sampler.stop()
+                name = route.strip("/").replace("/", "_").replace("{", "").replace("}", "") or "root"
+                sampler.write(self.profile_dir / f"{int(time.time() * 1000)}-{name}.folded")
+
+
+def _route(scope: dict) -> str:
+    # The matched route template keeps label cardinality bounded.
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
@@ -0,0 +1,32 @@
+# flashcards/precache.py
+"""Precache manifest for the offline service worker (``static/sw.js``).
+
+The manifest lists every URL the worker should keep locally — pages, deck
+JSON, hashed assets and the first quiz batches — with the content hash of
+its current response (the entry's ETag), plus the third-party URLs the
+pages load (Tailwind, Google Fonts). The worker re-fetches the manifest in
+the background and downloads only the entries whose hash changed, so an
+unchanged deck costs one small request per check.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+from typing import Iterable
+
+from flashcards.render import Rendered
+
+_EXTERNAL_RE = re.compile(r'(?:src|href)="(https://[^"]+)"')
+
+
+def external_urls(templates: Iterable[str]) -> list[str]:
+    """Third-party scripts and stylesheets referenced by the page templates."""
+    return sorted({url for t in templates for url in _EXTERNAL_RE.findall(t)})
+
+
+def build_manifest(routes: Iterable[tuple[str, Rendered]], external: Iterable[str] = ()) -> dict:
+    entries = {url: rendered.etag.strip('"') for url, rendered in routes}
+    external = sorted(external)
+    version = hashlib.sha256(json.dumps([entries, external], sort_keys=True).encode()).hexdigest()[:16]
+    return {"version": version, "entries": entries, "external": external}
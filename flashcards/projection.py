@@ -0,0 +1,145 @@
+# flashcards/projection.py
+"""Per-route deck projections: serialize only what clients read.
+
+``/api/decks/<id>`` serves ``pinyinPairs[*].{text,en,correct,distractor}`` or
+``hskFlashcards[*].{english,correct,distractors}`` with ``{chinese,pinyin}``
+options, plus each card's ``id``; quiz questions (:mod:`flashcards.quiz`) are
+assembled from the same single-card projection. Anything else in ``data.json`` (other decks,
+authoring notes, future fields) stays on the server. Pinyin fields are
+converted to tone-marked display strings here, so the pages render them as-is.
+
+Run ``python -m flashcards.projection [data.json]`` to print the payload of
+every registered deck's routes (the first quiz batch a game page embeds, and
+``/api/decks/<id>``); it exits non-zero if any is over its byte budget.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import sys
+from pathlib import Path
+from typing import Any, Iterable, Mapping
+
+from flashcards.decks import card_id
+from flashcards.tones import to_tone_marks
+
+logger = logging.getLogger(__name__)
+
+PINYIN_FIELDS = ("text", "en", "correct", "distractor")
+HSK_FIELDS = ("english",)
+OPTION_FIELDS = ("chinese", "pinyin")
+
+# Upper bound on each route's serialized payload, in bytes, by (route, deck kind):
+# "page" is the ``__DATA__`` a game page embeds, "deck" is ``/api/decks/<id>``.
+PAYLOAD_BUDGETS = {
+    ("page", "pinyin"): 8 * 1024,
+    ("page", "hsk"): 16 * 1024,
+    ("deck", "pinyin"): 16 * 1024,
+    ("deck", "hsk"): 32 * 1024,
+}
+
+
+def _pick(obj: Mapping[str, Any], fields: Iterable[str]) -> dict[str, Any]:
+    return {k: obj[k] for k in fields if k in obj}
+
+
+def _project_pair(card: Mapping[str, Any]) -> dict[str, Any]:
+    out = _pick(card, PINYIN_FIELDS)
+    out["id"] = card_id(card)
+    for k in ("correct", "distractor"):
+        if k in out:
+            out[k] = to_tone_marks(out[k])
+    return out
+
+
+def project_pinyin(cards: Iterable[Mapping[str, Any]]) -> dict[str, Any]:
+    return {"pinyinPairs": [_project_pair(c) for c in cards]}
+
+
+def _project_option(option: Any) -> dict[str, Any]:
+    if not isinstance(option, Mapping):
+        return {}
+    out = _pick(option, OPTION_FIELDS)
+    if "pinyin" in out:
+        out["pinyin"] = to_tone_marks(out["pinyin"])
+    return out
+
+
+def project_hsk(cards: Iterable[Mapping[str, Any]]) -> dict[str, Any]:
+    out = []
+    for c in cards:
+        card = _pick(c, HSK_FIELDS)
+        card["id"] = card_id(c)
+        card["correct"] = _project_option(c.get("correct"))
+        card["distractors"] = [_project_option(d) for d in c.get("distractors") or ()]
+        out.append(card)
+    return {"hskFlashcards": out}
+
+
+def project_deck(kind: str, cards: Iterable[Mapping[str, Any]]) -> dict[str, Any]:
+    """The ``/api/decks/<id>`` projection for a deck of ``kind``."""
+    return project_pinyin(cards) if kind == "pinyin" else project_hsk(cards)
+
+
+def project_options(kind: str, options: Iterable[Any]) -> list[Any]:
+    """Answer options as a page shows them: tone-marked pinyin strings, or ``{chinese,pinyin}``."""
+    if kind == "pinyin":
+        return [to_tone_marks(o) for o in options]
+    return [_project_option(o) for o in options]
+
+
+def project_card(kind: str, card: Mapping[str, Any]) -> dict[str, Any]:
+    """Project a single card the way its deck's page would."""
+    if kind == "pinyin":
+        return _project_pair(card)
+    return project_hsk([card])["hskFlashcards"][0]
+
+
+def dumps(payload: Any) -> str:
+    """Serialize a projection for embedding into a template."""
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+
+
+def check_budget(route: str, kind: str, name: str, payload: str) -> bool:
+    """Log (and return ``False``) when a route's payload exceeds its budget."""
+    size = len(payload.encode("utf-8"))
+    budget = PAYLOAD_BUDGETS[route, kind]
+    if size > budget:
+        logger.warning("Payload for %s is %d bytes, over the %d byte budget", name, size, budget)
+        return False
+    return True
+
+
+def main(argv: list[str] | None = None) -> int:
+    # The quiz module builds on this one; import it (and the store) only for the check.
+    from flashcards.decks import DECKS
+    from flashcards.quiz import DEFAULT_BATCH, DEFAULT_SEED, Quiz
+    from flashcards.store import DEFAULT_DATA_PATH, DeckStore
+
+    argv = sys.argv[1:] if argv is None else argv
+    snapshot = DeckStore(Path(argv[0]) if argv else DEFAULT_DATA_PATH).snapshot()
+    routes = []
+    for deck in DECKS.values():
+        cards = snapshot.deck(deck.key)
+        by_id: dict[str, Mapping[str, Any]] = {}
+        for card in cards:
+            if isinstance(card, Mapping):
+                by_id.setdefault(card_id(card), card)
+        # What the server embeds: the first default-seed batch, and the deck with its versions.
+        batch = Quiz.build(deck, by_id, DEFAULT_SEED).batch(0, DEFAULT_BATCH)
+        projected = project_deck(deck.kind, cards)
+        projected["base"] = snapshot.base or snapshot.version
+        projected["version"] = snapshot.edit_version(deck.key)
+        routes.append(("page", deck.kind, deck.path, dumps(batch)))
+        routes.append(("deck", deck.kind, f"/api/decks/{deck.id}", dumps(projected)))
+    ok = True
+    for route, kind, name, payload in routes:
+        size = len(payload.encode("utf-8"))
+        within = check_budget(route, kind, name, payload)
+        ok = ok and within
+        print(f"{name:<24} {size:>8} / {PAYLOAD_BUDGETS[route, kind]} bytes {'ok' if within else 'OVER'}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
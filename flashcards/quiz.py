@@ -0,0 +1,84 @@
+# flashcards/quiz.py
+"""Server-assembled quiz batches: a seeded card order with pre-shuffled options.
+
+A quiz is a deck in an order derived from ``seed``: cards sort by a hash of
+``(seed, card id)``, so a seed always yields the same sequence, and adding or
+removing a card leaves the relative order of the others untouched. A batch is
+``n`` consecutive questions starting at ``cursor``; each question carries its
+options already shuffled (again from ``(seed, card id)``) and the index of the
+correct one, so the page only renders and the same session can be replayed,
+shared or graded.
+"""
+from __future__ import annotations
+
+import hashlib
+import random
+from dataclasses import dataclass
+from typing import Any, Mapping
+
+from flashcards.decks import Deck
+from flashcards.projection import project_card
+
+DEFAULT_SEED = 0
+DEFAULT_BATCH = 20
+MAX_BATCH = 100
+
+
+def _rank(seed: int, cid: str) -> bytes:
+    return hashlib.blake2b(f"{seed}:{cid}".encode(), digest_size=8).digest()
+
+
+def _options(kind: str, projected: Mapping[str, Any]) -> list[Any]:
+    if kind == "pinyin":
+        options = [projected.get("correct", "")]
+        if projected.get("distractor"):
+            options.append(projected["distractor"])
+        return options
+    return [projected["correct"], *projected["distractors"]]
+
+
+def choices(kind: str, card: Mapping[str, Any]) -> set[str]:
+    """What the game reports as the chosen option: the pinyin, or an option's hanzi."""
+    options = _options(kind, project_card(kind, card))
+    return set(options) if kind == "pinyin" else {o.get("chinese", "") for o in options}
+
+
+def question(kind: str, cid: str, card: Mapping[str, Any], seed: int) -> dict[str, Any]:
+    """One card as a ready-to-render question: prompt, shuffled options, answer index."""
+    projected = project_card(kind, card)
+    if kind == "pinyin":
+        prompt = {"text": projected.get("text", ""), "en": projected.get("en", "")}
+    else:
+        prompt = {"english": projected.get("english", "")}
+    options = _options(kind, projected)
+    order = list(range(len(options)))
+    random.Random(f"{seed}:{cid}").shuffle(order)
+    return {"id": cid, **prompt, "options": [options[k] for k in order], "answer": order.index(0)}
+
+
+@dataclass
+class Quiz:
+    deck: Deck
+    seed: int
+    ids: list[str]                          # card ids in quiz order
+    cards: Mapping[str, Mapping[str, Any]]  # card id -> card
+
+    @classmethod
+    def build(cls, deck: Deck, cards: Mapping[str, Mapping[str, Any]], seed: int) -> "Quiz":
+        return cls(deck, seed, sorted(cards, key=lambda cid: _rank(seed, cid)), cards)
+
+    def position(self, cid: str) -> int:
+        """Cursor of the card with id ``cid``; ``ValueError`` if it is not in the deck."""
+        return self.ids.index(cid)
+
+    def batch(self, cursor: int = 0, n: int = DEFAULT_BATCH) -> dict[str, Any]:
+        ids = self.ids[cursor:cursor + n]
+        end = cursor + len(ids)
+        return {
+            "deck": self.deck.id,
+            "seed": self.seed,
+            "total": len(self.ids),
+            "cursor": cursor,
+            "next": end if end < len(self.ids) else None,
+            "questions": [question(self.deck.kind, cid, self.cards[cid], self.seed) for cid in ids],
+        }
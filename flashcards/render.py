@@ -0,0 +1,178 @@
+# flashcards/render.py
+"""Cache of finished page bytes, keyed by route and data version.
+
+Pages are a pure function of the templates and the deck snapshot, so each
+route is rendered once per snapshot version and the encoded bytes are reused
+until the version changes. Every cached page carries a strong, content-derived
+``ETag`` so clients and CDNs can revalidate with ``If-None-Match``.
+
+Compressed variants (gzip, and brotli when the ``brotli`` package is
+installed) are built at maximum level when an entry is populated, so serving
+a compressed page costs no CPU beyond picking the variant.
+"""
+from __future__ import annotations
+
+import gzip
+import hashlib
+import threading
+from dataclasses import dataclass, field
+from typing import Callable
+
+from fastapi import Request, Response
+
+from flashcards.metrics import CACHE_LOOKUPS, span
+
+try:
+    import brotli
+except ImportError:  # optional; gzip alone is still served
+    brotli = None
+
+# Browsers and CDNs may keep a copy but must revalidate it; a matching ETag
+# turns that revalidation into a body-less 304.
+HTML_CACHE_CONTROL = "public, max-age=0, must-revalidate"
+
+# Server preference when the client accepts several encodings equally.
+ENCODING_PREFERENCE = ("br", "gzip", "identity")
+
+# Bodies this small are not worth a compressed variant.
+MIN_COMPRESS_SIZE = 512
+
+
+def _compress(body: bytes) -> dict[str, bytes]:
+    variants = {"identity": body}
+    if len(body) < MIN_COMPRESS_SIZE:
+        return variants
+    with span("compress"):
+        # mtime=0 keeps the gzip bytes a pure function of the body.
+        variants["gzip"] = gzip.compress(body, compresslevel=9, mtime=0)
+        if brotli is not None:
+            variants["br"] = brotli.compress(body, quality=11)
+    return {k: v for k, v in variants.items() if k == "identity" or len(v) < len(body)}
+
+
+@dataclass(frozen=True)
+class Rendered:
+    body: bytes
+    etag: str
+    version: str
+    media_type: str = "text/html"
+    variants: dict[str, bytes] = field(default_factory=dict, compare=False, repr=False)
+
+    def variant(self, encoding: str) -> tuple[bytes, str]:
+        """Body and strong ETag for ``encoding`` (each encoding is its own representation)."""
+        if encoding == "identity":
+            return self.body, self.etag
+        return self.variants[encoding], self.etag[:-1] + "-" + encoding + '"'
+
+    @property
+    def etags(self) -> list[str]:
+        return [self.variant(enc)[1] for enc in self.variants]
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def make_rendered(body: bytes, version: str, media_type: str = "text/html") -> Rendered:
+    return Rendered(body=body, etag=make_etag(body), version=version,
+                    media_type=media_type, variants=_compress(body))
+
+
+class RenderCache:
+    """Hold the most recent :class:`Rendered` page for each route key.
+
+    With ``max_entries``, the oldest keys are dropped once the cache is full,
+    for routes whose keys come from query parameters.
+    """
+
+    def __init__(self, max_entries: int | None = None) -> None:
+        self._entries: dict[str, Rendered] = {}
+        # Re-entrant: a build may render other keys (the precache manifest renders every page).
+        self._lock = threading.RLock()
+        self.max_entries = max_entries
+
+    def get(self, key: str, version: str, build: Callable[[], str | bytes],
+            media_type: str = "text/html") -> Rendered:
+        entry = self._entries.get(key)
+        if entry is not None and entry.version == version:
+            CACHE_LOOKUPS.inc(result="hit")
+            return entry
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.version == version:
+                CACHE_LOOKUPS.inc(result="hit")
+                return entry
+            CACHE_LOOKUPS.inc(result="miss")
+            body = build()
+            if isinstance(body, str):
+                body = body.encode("utf-8")
+            entry = make_rendered(body, version, media_type)
+            self._entries.pop(key, None)
+            if self.max_entries is not None:
+                while len(self._entries) >= self.max_entries:
+                    del self._entries[next(iter(self._entries))]
+            self._entries[key] = entry
+            return entry
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def entries(self) -> dict[str, Rendered]:
+        return dict(self._entries)
+
+    def preload(self, entries: dict[str, Rendered]) -> None:
+        """Install already-rendered entries (e.g. from a frozen build snapshot)."""
+        with self._lock:
+            self._entries.update(entries)
+
+
+def etag_matches(if_none_match: str | None, etags: list[str]) -> bool:
+    """Evaluate an ``If-None-Match`` header (weak comparison, per RFC 9110)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    bare = {e.removeprefix("W/") for e in etags}
+    return any(c.strip().removeprefix("W/") in bare for c in if_none_match.split(","))
+
+
+def negotiate_encoding(accept_encoding: str | None, available) -> str:
+    """Pick the best of ``available`` for an ``Accept-Encoding`` header."""
+    if not accept_encoding:
+        return "identity"
+    qualities: dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        qualities[name] = q
+    wildcard = qualities.get("*", 0.0)
+    best, best_q = "identity", 0.0
+    for enc in ENCODING_PREFERENCE:
+        if enc not in available:
+            continue
+        q = qualities.get(enc, 1.0 if enc == "identity" else wildcard)
+        if q > best_q:
+            best, best_q = enc, q
+    return best
+
+
+def cached_response(request: Request, rendered: Rendered,
+                    cache_control: str = HTML_CACHE_CONTROL) -> Response:
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"), rendered.variants)
+    body, etag = rendered.variant(encoding)
+    headers = {"ETag": etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+    if etag_matches(request.headers.get("if-none-match"), rendered.etags):
+        return Response(status_code=304, headers=headers)
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type=rendered.media_type, headers=headers)
@@ -0,0 +1,260 @@
+# flashcards/review.py
+"""SM-2 spaced-repetition scheduler with a write-behind SQLite store.
+
+Each (learner, deck) pair gets an in-memory min-heap of ``(due, order, card)``
+so the next card is an O(log n) pop. Answers update the in-memory state at
+once and are queued for a background flush that writes them to SQLite in one
+``executemany`` batch, so ``/api/review/answer`` never waits on disk. A
+learner's stored states are read once per deck version, outside the
+scheduler lock, so that read delays only that learner.
+
+Cards are identified by :func:`flashcards.decks.card_id`, so the scheduler
+works unchanged over ``pinyinPairs`` and every ``hskLesson*`` deck.
+"""
+from __future__ import annotations
+
+import heapq
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Iterable
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = Path(
+    os.environ.get("FLASHCARDS_REVIEW_DB")
+    or Path(tempfile.gettempdir()) / "flashcards-reviews.sqlite3"
+)
+
+DAY = 86400.0
+MIN_EASE = 1.3
+# Grade used for a plain correct / incorrect answer on the 0-5 SM-2 scale.
+GRADE_CORRECT = 4
+GRADE_INCORRECT = 1
+# A card failed in this session comes back after this many seconds.
+RELEARN_DELAY = 60.0
+
+
+@dataclass(frozen=True)
+class CardState:
+    card: str
+    ease: float = 2.5
+    interval: float = 0.0   # days
+    reps: int = 0
+    lapses: int = 0
+    due: float = 0.0        # epoch seconds; 0 = never seen
+
+    @property
+    def is_new(self) -> bool:
+        return self.reps == 0 and self.lapses == 0
+
+
+def schedule(state: CardState, grade: int, now: float) -> CardState:
+    """Apply one SM-2 review with ``grade`` in 0..5."""
+    grade = max(0, min(5, grade))
+    ease = max(MIN_EASE, state.ease + 0.1 - (5 - grade) * (0.08 + (5 - grade) * 0.02))
+    if grade < 3:
+        return replace(state, ease=ease, interval=0.0, reps=0,
+                       lapses=state.lapses + 1, due=now + RELEARN_DELAY)
+    if state.reps == 0:
+        interval = 1.0
+    elif state.reps == 1:
+        interval = 6.0
+    else:
+        interval = round(state.interval * ease, 2)
+    return replace(state, ease=ease, interval=interval, reps=state.reps + 1, due=now + interval * DAY)
+
+
+class ReviewStore:
+    """SQLite persistence with batched, write-behind upserts."""
+
+    def __init__(self, path: Path = DEFAULT_DB_PATH, flush_interval: float = 2.0,
+                 max_pending: int = 500) -> None:
+        self.path = Path(path)
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending: dict[tuple[str, str, str], CardState] = {}
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread: threading.Thread | None = None
+        self._conn: sqlite3.Connection | None = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            try:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS reviews ("
+                    " learner TEXT NOT NULL, deck TEXT NOT NULL, card TEXT NOT NULL,"
+                    " ease REAL NOT NULL, interval REAL NOT NULL, reps INTEGER NOT NULL,"
+                    " lapses INTEGER NOT NULL, due REAL NOT NULL,"
+                    " PRIMARY KEY (learner, deck, card))"
+                )
+            except sqlite3.Error:
+                conn.close()
+                raise
+            self._conn = conn
+        return self._conn
+
+    def load(self, learner: str, deck: str) -> dict[str, CardState]:
+        """Stored states plus unflushed answers; raises ``sqlite3.Error``/``OSError`` if the database is unusable."""
+        with self._db_lock:
+            rows = self._connect().execute(
+                "SELECT card, ease, interval, reps, lapses, due FROM reviews"
+                " WHERE learner = ? AND deck = ?", (learner, deck),
+            ).fetchall()
+        states = {r[0]: CardState(*r) for r in rows}
+        with self._lock:
+            for (l, d, card), state in self._pending.items():
+                if l == learner and d == deck:
+                    states[card] = state
+        return states
+
+    def save(self, learner: str, deck: str, state: CardState) -> None:
+        with self._lock:
+            self._pending[(learner, deck, state.card)] = state
+            backlog = len(self._pending)
+        if self._thread is None:
+            self._start()
+        if backlog >= self.max_pending:
+            self._wake.set()
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._closed = False
+                self._thread = threading.Thread(target=self._run, name="review-flush", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except (sqlite3.Error, OSError) as e:
+                logger.warning("Review flush to %s failed: %s; will retry", self.path, e)
+
+    def flush(self) -> int:
+        with self._lock:
+            batch, self._pending = self._pending, {}
+        if not batch:
+            return 0
+        rows = [(l, d, s.card, s.ease, s.interval, s.reps, s.lapses, s.due)
+                for (l, d, _), s in batch.items()]
+        try:
+            with self._db_lock:
+                conn = self._connect()
+                with conn:
+                    conn.executemany(
+                        "INSERT INTO reviews (learner, deck, card, ease, interval, reps, lapses, due)"
+                        " VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+                        " ON CONFLICT (learner, deck, card) DO UPDATE SET"
+                        " ease = excluded.ease, interval = excluded.interval, reps = excluded.reps,"
+                        " lapses = excluded.lapses, due = excluded.due",
+                        rows,
+                    )
+        except (sqlite3.Error, OSError):
+            # Put the batch back, without clobbering newer answers.
+            with self._lock:
+                self._pending = {**batch, **self._pending}
+            raise
+        return len(rows)
+
+    def close(self) -> None:
+        self._closed = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        try:
+            self.flush()
+        except (sqlite3.Error, OSError) as e:
+            logger.warning("Final review flush to %s failed: %s; %d answers not saved",
+                           self.path, e, len(self._pending))
+        with self._db_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class _Queue:
+    """Due-ordered heap for one learner's deck, with lazy deletion of stale entries."""
+
+    def __init__(self, cards: Iterable[str], states: dict[str, CardState], version: str) -> None:
+        self.version = version
+        self.order = {c: i for i, c in enumerate(dict.fromkeys(cards))}
+        self.states = {c: states.get(c) or CardState(card=c) for c in self.order}
+        self.heap = [(s.due, self.order[c], c) for c, s in self.states.items()]
+        heapq.heapify(self.heap)
+
+    def peek(self) -> CardState | None:
+        while self.heap:
+            due, _, card = self.heap[0]
+            state = self.states.get(card)
+            if state is not None and state.due == due:
+                return state
+            heapq.heappop(self.heap)
+        return None
+
+    def update(self, state: CardState) -> None:
+        self.states[state.card] = state
+        heapq.heappush(self.heap, (state.due, self.order[state.card], state.card))
+
+
+class Scheduler:
+    """Pick and grade cards per learner; keeps up to ``max_queues`` queues in memory."""
+
+    def __init__(self, store: ReviewStore, max_queues: int = 10_000) -> None:
+        self.store = store
+        self.max_queues = max_queues
+        self._queues: OrderedDict[tuple[str, str], _Queue] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _queue(self, learner: str, deck: str, cards: Iterable[str], version: str) -> _Queue:
+        """The learner's queue for this deck version, loading stored states outside the lock."""
+        key = (learner, deck)
+        with self._lock:
+            queue = self._queues.get(key)
+            if queue is not None and queue.version == version:
+                self._queues.move_to_end(key)
+                return queue
+        # Only this learner waits for SQLite; a queue installed meanwhile wins.
+        loaded = _Queue(cards, self.store.load(learner, deck), version)
+        with self._lock:
+            queue = self._queues.get(key)
+            if queue is None or queue.version != version:
+                queue = self._queues[key] = loaded
+                if len(self._queues) > self.max_queues:
+                    self._queues.popitem(last=False)
+            self._queues.move_to_end(key)
+            return queue
+
+    def next(self, learner: str, deck: str, cards: Iterable[str], version: str) -> CardState | None:
+        """Earliest-due card; it may not be due yet if the learner is ahead of schedule."""
+        queue = self._queue(learner, deck, cards, version)
+        with self._lock:
+            return queue.peek()
+
+    def answer(self, learner: str, deck: str, cards: Iterable[str], version: str,
+               card: str, grade: int, now: float | None = None) -> CardState:
+        now = time.time() if now is None else now
+        queue = self._queue(learner, deck, cards, version)
+        with self._lock:
+            if card not in queue.states:
+                raise KeyError(card)
+            state = schedule(queue.states[card], grade, now)
+            queue.update(state)
+        self.store.save(learner, deck, state)
+        return state
@@ -0,0 +1,135 @@
+# flashcards/schema.py
+"""Typed models for the decks in ``data.json``, used at build time and for admin edits.
+
+:func:`validate_deck` checks every card of one deck and returns the valid ones
+together with per-card errors (the card is unusable) and warnings (the card is
+usable but probably wrong, e.g. a pinyin token that is not a Mandarin
+syllable). The server loads the artifacts that ``python -m flashcards.compile_decks``
+writes from the validated cards; it imports this module only on the first admin
+card edit, to validate the posted card with :data:`MODELS`.
+"""
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from typing import Annotated, Any
+
+from pydantic import BaseModel, ConfigDict, Field, ValidationError, model_validator
+
+from flashcards.decks import card_id
+from flashcards.distractors import parse_token
+
+NonEmpty = Annotated[str, Field(min_length=1)]
+
+# Sentence pinyin carries punctuation ("shi4...", "le?"); it is not a syllable error.
+_PUNCTUATION_RE = re.compile(r"[^\w:ü]+")
+
+
+def same_pinyin(a: str, b: str) -> bool:
+    """Compare pinyin ignoring case, spacing and the ``v``/``u:`` spellings of ü."""
+    def norm(s: str) -> str:
+        return " ".join(s.lower().replace("u:", "ü").replace("v", "ü").split())
+    return norm(a) == norm(b)
+
+
+def bad_syllables(pinyin: str) -> list[str]:
+    out = []
+    for token in pinyin.split():
+        bare = _PUNCTUATION_RE.sub("", token)
+        if bare and parse_token(bare) is None:
+            out.append(token)
+    return out
+
+
+class PinyinPair(BaseModel):
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
+    text: NonEmpty
+    en: NonEmpty
+    correct: NonEmpty
+    distractor: NonEmpty
+
+    @model_validator(mode="after")
+    def _distractor_differs(self) -> "PinyinPair":
+        if same_pinyin(self.correct, self.distractor):
+            raise ValueError(f"distractor {self.distractor!r} equals the correct answer")
+        return self
+
+    def pinyin(self) -> list[str]:
+        return [self.correct, self.distractor]
+
+
+class Option(BaseModel):
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
+    chinese: NonEmpty
+    pinyin: NonEmpty
+
+
+class HskCard(BaseModel):
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
+    english: NonEmpty
+    correct: Option
+    distractors: list[Option] = Field(min_length=1)
+
+    @model_validator(mode="after")
+    def _distractors_differ(self) -> "HskCard":
+        for i, d in enumerate(self.distractors):
+            if d.chinese == self.correct.chinese:
+                raise ValueError(f"distractors.{i} {d.chinese!r} equals the correct answer")
+        return self
+
+    def pinyin(self) -> list[str]:
+        return [self.correct.pinyin, *(d.pinyin for d in self.distractors)]
+
+
+MODELS: dict[str, type[PinyinPair] | type[HskCard]] = {"pinyin": PinyinPair, "hsk": HskCard}
+
+
+@dataclass
+class DeckReport:
+    cards: list[PinyinPair | HskCard] = field(default_factory=list)
+    errors: list[str] = field(default_factory=list)
+    warnings: list[str] = field(default_factory=list)
+    duplicates: int = 0
+
+
+def _describe(e: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(p) for p in err['loc']) or 'card'}: {err['msg']}" for err in e.errors()
+    )
+
+
+def validate_deck(kind: str, key: str, cards: Any) -> DeckReport:
+    """Validate one deck; exact duplicate cards are dropped, conflicting ones are errors."""
+    report = DeckReport()
+    if not isinstance(cards, list):
+        report.errors.append(f"{key}: expected a list of cards, got {type(cards).__name__}")
+        return report
+    model = MODELS[kind]
+    seen: dict[str, tuple[int, PinyinPair | HskCard]] = {}
+    for i, raw in enumerate(cards):
+        where = f"{key}[{i}]"
+        try:
+            card = model.model_validate(raw)
+        except ValidationError as e:
+            report.errors.append(f"{where}: {_describe(e)}")
+            continue
+        cid = card_id(card.model_dump())
+        if cid in seen:
+            first, other = seen[cid]
+            if other == card:
+                report.duplicates += 1
+                report.warnings.append(f"{where}: duplicate of {key}[{first}] dropped")
+            else:
+                # Both would get the same card id, so review state could not tell them apart.
+                report.errors.append(f"{where}: same prompt and answer as {key}[{first}], different options")
+            continue
+        seen[cid] = (i, card)
+        bad = [token for p in card.pinyin() for token in bad_syllables(p)]
+        if bad:
+            report.warnings.append(f"{where}: not Mandarin syllables: {', '.join(bad)}")
+        report.cards.append(card)
+    return report
+
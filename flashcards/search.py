@@ -0,0 +1,326 @@
+# flashcards/search.py
+"""Word lookup across every deck: English, hanzi and pinyin with or without tones.
+
+:meth:`SearchIndex.build` indexes each card's prompt and answer, one index
+per deck version, so editing a deck rebuilds only that deck's index:
+
+* English: an inverted index from lower-cased tokens to cards; the last query
+  token also matches as a prefix ("restau" finds "restaurant").
+* Hanzi: character unigram and bigram postings; a multi-character query
+  intersects its bigrams and is then confirmed against the actual text.
+* Pinyin: a prefix index over the toneless spelling of the whole answer and of
+  every syllable-initial suffix ("nihao", "hao"). Tone numbers or tone marks
+  in the query ("hao3", "hǎo") narrow the matches to those tones.
+
+Results are ranked in tiers: exact matches, then fields that start with the
+query (shortest and alphabetically first), then matches anywhere in deck
+order. Ranking is a lazy walk over sorted keys and posting lists, so a page
+costs roughly ``offset + limit`` steps however many cards match.
+:func:`search_all` merges the ranked walks of several indexes in the order
+one index over all their decks would produce.
+"""
+from __future__ import annotations
+
+import bisect
+import heapq
+import re
+import unicodedata
+from collections import defaultdict
+from collections.abc import Iterable, Iterator, Mapping, Sequence
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Any
+
+from flashcards.decks import Deck, card_id
+from flashcards.tones import to_tone_marks
+
+_WORD_RE = re.compile(r"[^\W_]+(?:'[^\W_]+)*")
+_CJK_RE = re.compile("[\u3400-\u9fff\uf900-\ufaff]")
+_SYLLABLE_RE = re.compile(r"([a-zü]+)([1-5]?)")
+_QUERY_SYLLABLE_RE = re.compile(r"([a-zü])([1-5]?)")
+
+# Last-token prefix expansions considered per English query.
+MAX_PREFIX_TERMS = 64
+
+# Combining marks left by NFD decomposition of tone-marked vowels.
+_TONE_MARKS = {"\u0304": "1", "\u0301": "2", "\u030c": "3", "\u0300": "4"}
+
+
+def _fold(s: str) -> str:
+    return s.lower().replace("u:", "ü").replace("v", "ü")
+
+
+def _untone(token: str) -> tuple[str, str]:
+    """``"hǎo"`` -> ``("hao", "3")``; a token without a single tone mark keeps tone ``""``."""
+    base, tones = [], []
+    for ch in unicodedata.normalize("NFD", token):
+        mark = _TONE_MARKS.get(ch)
+        if mark:
+            tones.append(mark)
+        else:
+            base.append(ch)
+    plain = unicodedata.normalize("NFC", "".join(base))
+    return plain, tones[0] if len(tones) == 1 else ""
+
+
+def pinyin_keys(pinyin: str) -> list[tuple[str, str]]:
+    """``(toneless, toned)`` compact keys for the whole answer and each syllable-initial suffix."""
+    syllables = _SYLLABLE_RE.findall(_fold(pinyin))
+    toneless = "".join(b for b, _ in syllables)
+    toned = "".join(b + (t or "5") for b, t in syllables)
+    keys, i, j = [], 0, 0
+    for base, _ in syllables:
+        keys.append((toneless[i:], toned[j:]))
+        i += len(base)
+        j += len(base) + 1
+    return keys
+
+
+def normalize_pinyin_query(q: str) -> tuple[str, re.Pattern[str] | None]:
+    """Toneless compact query, plus a pattern over toned keys when the query gives tones."""
+    parts = []
+    for token in _fold(q).split():
+        plain, mark = _untone(token)
+        parts.append(plain + mark if mark and not plain[-1:].isdigit() else plain)
+    query = "".join(parts)
+    toneless = re.sub(r"[^a-zü]", "", query)
+    if not re.search(r"[1-5]", query):
+        return toneless, None
+    # Every query letter may be followed by the card's tone digit; given digits must match.
+    pattern = "".join(
+        re.escape(letter) + (tone if tone else "[1-5]?")
+        for letter, tone in _QUERY_SYLLABLE_RE.findall(query)
+    )
+    return toneless, re.compile(pattern)
+
+
+class PrefixIndex:
+    """Sorted keys with their cards; every key starting with a prefix is one bisected range."""
+
+    def __init__(self, entries: Iterable[tuple[str, int, str]]) -> None:
+        rows = sorted(entries)
+        self.keys = [k for k, _, _ in rows]
+        self.docs = [d for _, d, _ in rows]
+        self.toned = [t for _, _, t in rows]
+
+    def range(self, prefix: str) -> range:
+        lo = bisect.bisect_left(self.keys, prefix)
+        hi = bisect.bisect_left(self.keys, prefix + "\uffff")
+        return range(lo, hi)
+
+    def match(self, prefix: str, tones: re.Pattern[str] | None = None) -> set[int]:
+        if tones is None:
+            return {self.docs[i] for i in self.range(prefix)}
+        return {self.docs[i] for i in self.range(prefix) if tones.match(self.toned[i])}
+
+
+# (index, prefix, tone pattern): one "starts with" source for ranking.
+_StartSource = tuple[PrefixIndex, str, "re.Pattern[str] | None"]
+# (tier, source, key): exact matches, then "starts with" by key, then anywhere.
+_Rank = tuple[int, int, str]
+
+
+@dataclass
+class SearchIndex:
+    decks: list[tuple[Deck, Sequence[Any], int]] = field(default_factory=list)  # deck, cards, first doc
+    docs: list[tuple[int, int]] = field(default_factory=list)                    # doc -> (deck slot, position)
+    hanzi: list[str] = field(default_factory=list)                               # doc -> answer hanzi
+    english_terms: dict[str, list[int]] = field(default_factory=dict)
+    english_vocab: list[str] = field(default_factory=list)
+    english_start: PrefixIndex | None = None
+    hanzi_grams: dict[str, list[int]] = field(default_factory=dict)
+    hanzi_start: PrefixIndex | None = None
+    pinyin_whole: PrefixIndex | None = None
+    pinyin_any: PrefixIndex | None = None
+
+    @staticmethod
+    def fields(kind: str, card: Mapping[str, Any]) -> tuple[str, str, str]:
+        """``(english, hanzi, numbered pinyin)`` of a card's prompt and answer."""
+        if kind == "pinyin":
+            return card.get("en") or "", card.get("text") or "", card.get("correct") or ""
+        correct = card.get("correct")
+        if not isinstance(correct, Mapping):
+            correct = {}
+        return card.get("english") or "", correct.get("chinese") or "", correct.get("pinyin") or ""
+
+    @classmethod
+    def build(cls, decks: Iterable[tuple[Deck, Sequence[Any]]]) -> "SearchIndex":
+        index = cls()
+        terms: defaultdict[str, list[int]] = defaultdict(list)
+        grams: defaultdict[str, list[int]] = defaultdict(list)
+        english_start: list[tuple[str, int, str]] = []
+        hanzi_start: list[tuple[str, int, str]] = []
+        whole: list[tuple[str, int, str]] = []
+        any_: list[tuple[str, int, str]] = []
+        for slot, (deck, cards) in enumerate(decks):
+            index.decks.append((deck, cards, len(index.docs)))
+            for position, card in enumerate(cards):
+                if type(card) is not dict and not isinstance(card, Mapping):
+                    continue
+                doc = len(index.docs)
+                index.docs.append((slot, position))
+                english, hanzi, pinyin = cls.fields(deck.kind, card)
+
+                folded = english.lower().strip()
+                english_start.append((folded, doc, ""))
+                for term in set(_WORD_RE.findall(folded)):
+                    terms[term].append(doc)
+
+                index.hanzi.append(hanzi)
+                hanzi_start.append((hanzi, doc, ""))
+                for gram in set(hanzi) | {hanzi[i:i + 2] for i in range(len(hanzi) - 1)}:
+                    grams[gram].append(doc)
+
+                keys = pinyin_keys(pinyin)
+                if keys:
+                    whole.append((keys[0][0], doc, keys[0][1]))
+                    any_ += [(toneless, doc, toned) for toneless, toned in keys]
+        index.english_terms = dict(terms)
+        index.english_vocab = sorted(terms)
+        index.english_start = PrefixIndex(english_start)
+        index.hanzi_grams = dict(grams)
+        index.hanzi_start = PrefixIndex(hanzi_start)
+        index.pinyin_whole = PrefixIndex(whole)
+        index.pinyin_any = PrefixIndex(any_)
+        return index
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    # -- matching ---------------------------------------------------------
+
+    # Each matcher returns its "starts with" sources and every matching doc
+    # (a superset of the sources), either as a posting list in doc order or a set.
+
+    def _english(self, q: str) -> tuple[list[_StartSource], Sequence[int] | set[int]]:
+        folded = q.lower().strip()
+        starts: list[_StartSource] = [(self.english_start, folded, None)]
+        terms = _WORD_RE.findall(folded)
+        if not terms:
+            return starts, self.english_start.match(folded)
+        *full, last = terms
+        postings: list[Sequence[int] | set[int]] = [self.english_terms.get(t, ()) for t in full]
+        lo = bisect.bisect_left(self.english_vocab, last)
+        expansions = [
+            self.english_terms[term]
+            for term in self.english_vocab[lo:lo + MAX_PREFIX_TERMS] if term.startswith(last)
+        ]
+        postings.append(expansions[0] if len(expansions) == 1 else set().union(*expansions))
+        if len(postings) == 1:
+            return starts, postings[0]
+        postings.sort(key=len)
+        anywhere = set(postings[0])
+        for p in postings[1:]:
+            if not anywhere:
+                break
+            anywhere.intersection_update(p)
+        return starts, anywhere
+
+    def _hanzi(self, q: str) -> tuple[list[_StartSource], Sequence[int] | set[int]]:
+        q = "".join(q.split())
+        starts: list[_StartSource] = [(self.hanzi_start, q, None)]
+        if len(q) == 1:
+            return starts, self.hanzi_grams.get(q, ())
+        postings = sorted((self.hanzi_grams.get(q[i:i + 2], ()) for i in range(len(q) - 1)), key=len)
+        found = set(postings[0])
+        for p in postings[1:]:
+            if not found:
+                break
+            found.intersection_update(p)
+        return starts, {d for d in found if q in self.hanzi[d]}
+
+    def _pinyin(self, q: str) -> tuple[list[_StartSource], set[int]]:
+        toneless, tones = normalize_pinyin_query(q)
+        if not toneless:
+            return [], set()
+        return [(self.pinyin_whole, toneless, tones)], self.pinyin_any.match(toneless, tones)
+
+    def _ranked(self, starts: list[_StartSource], anywhere: Sequence[int] | set[int],
+                lo: int, hi: int) -> Iterator[tuple[_Rank, int]]:
+        """Matching docs in rank order, each with its rank (non-decreasing)."""
+        emitted: set[int] = set()
+        ranges = [(index, index.range(prefix), prefix, tones) for index, prefix, tones in starts]
+        for exact in (True, False):
+            for source, (index, r, prefix, tones) in enumerate(ranges):
+                keys, docs, toned = index.keys, index.docs, index.toned
+                for i in r:
+                    if exact and keys[i] != prefix:
+                        break  # exact keys sort first in the range
+                    d = docs[i]
+                    if not lo <= d < hi or d in emitted:
+                        continue
+                    if tones is not None and not (tones.fullmatch if exact else tones.match)(toned[i]):
+                        continue
+                    emitted.add(d)
+                    yield ((0, source, "") if exact else (1, source, keys[i])), d
+        for d in anywhere if not isinstance(anywhere, set) else sorted(anywhere):
+            if lo <= d < hi and d not in emitted:
+                yield (2, 0, ""), d
+
+    def matches(self, q: str, deck: str | None = None) -> tuple[int, Iterator[tuple[_Rank, int]]]:
+        """``(total matches, lazily ranked (rank, doc) pairs)``."""
+        q = q.strip()
+        if not q:
+            return 0, iter(())
+        if _CJK_RE.search(q):
+            starts, anywhere = self._hanzi(q)
+        else:
+            e_starts, e_any = self._english(q)
+            p_starts, p_any = self._pinyin(q)
+            starts = e_starts + p_starts
+            anywhere = e_any if not p_any else p_any if not e_any else set(e_any) | p_any
+        lo, hi = self._deck_bounds(deck) if deck is not None else (0, len(self.docs))
+        if isinstance(anywhere, set):
+            total = len(anywhere) if deck is None else sum(1 for d in anywhere if lo <= d < hi)
+        else:
+            total = bisect.bisect_left(anywhere, hi) - bisect.bisect_left(anywhere, lo)
+        return total, self._ranked(starts, anywhere, lo, hi)
+
+    def search(self, q: str, limit: int = 20, offset: int = 0,
+               deck: str | None = None) -> tuple[int, list[int]]:
+        """``(total matches, doc ids for the page)``."""
+        total, ranked = self.matches(q, deck)
+        return total, [d for _, d in islice(ranked, offset, offset + limit)]
+
+    def _deck_bounds(self, deck_id: str) -> tuple[int, int]:
+        for slot, (deck, _, first) in enumerate(self.decks):
+            if deck.id == deck_id:
+                end = self.decks[slot + 1][2] if slot + 1 < len(self.decks) else len(self.docs)
+                return first, end
+        return 0, 0
+
+    # -- results ----------------------------------------------------------
+
+    def result(self, doc: int) -> dict[str, Any]:
+        slot, position = self.docs[doc]
+        deck, cards, _ = self.decks[slot]
+        card = cards[position]
+        english, hanzi, pinyin = self.fields(deck.kind, card)
+        cid = card_id(card)
+        return {
+            "deck": deck.id,
+            "id": cid,
+            "english": english,
+            "chinese": hanzi,
+            "pinyin": to_tone_marks(pinyin),
+            "url": f"{deck.path}?card={cid}",
+        }
+
+
+def _tagged(slot: int, index: SearchIndex,
+            ranked: Iterator[tuple[_Rank, int]]) -> Iterator[tuple[tuple, SearchIndex, int]]:
+    for rank, doc in ranked:
+        yield (*rank, slot, doc), index, doc
+
+
+def search_all(indexes: Sequence[SearchIndex], q: str, limit: int = 20,
+               offset: int = 0) -> tuple[int, list[tuple[SearchIndex, int]]]:
+    """:meth:`SearchIndex.search` over several indexes: ``(total, (index, doc) for the page)``."""
+    total, streams = 0, []
+    for slot, index in enumerate(indexes):
+        n, ranked = index.matches(q)
+        total += n
+        streams.append(_tagged(slot, index, ranked))
+    # (rank, slot, doc) is unique, so the merge never compares the indexes themselves.
+    merged = heapq.merge(*streams)
+    return total, [(index, doc) for _, index, doc in islice(merged, offset, offset + limit)]
@@ -0,0 +1,138 @@
+# flashcards/startup.py
+"""Cold-start report: import time, init phases and first-request latency.
+
+    python -m flashcards.startup
+    python -m flashcards.startup --runs 5 --budget-ms 900 --app-budget-ms 150   # exit 1 if over budget
+
+Every measurement runs in a fresh interpreter, the way a serverless instance
+starts. The first request is timed twice: rendering from ``data.json``, and
+served from a snapshot built by ``python -m flashcards.freeze``. ``--budget-ms``
+applies to the median wall time of the whole ``import api.index``;
+``--app-budget-ms`` to our share of it (``api.index`` after ``fastapi`` is
+imported), which third-party import time cannot hide.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+FIRST_ROUTE = "/game/pinyin"
+
+# Runs in the child interpreter; prints one JSON line of timings in ms.
+_PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+import fastapi
+t1 = time.perf_counter()
+import api.index as index
+t2 = time.perf_counter()
+from flashcards import asgi
+response = asgi.get(index.app, sys.argv[1], headers={"accept-encoding": "gzip, br"})
+t3 = time.perf_counter()
+assert response.status == 200, response.status
+print(json.dumps({
+    "fastapi": (t1 - t0) * 1000,
+    "app": (t2 - t1) * 1000,
+    "import": (t2 - t0) * 1000,
+    "first_request": (t3 - t2) * 1000,
+    "server_timing": response.headers.get("server-timing", ""),
+}))
+"""
+
+
+def _env(frozen_path: Path) -> dict[str, str]:
+    return {**os.environ, "FLASHCARDS_FROZEN": str(frozen_path),
+            "PYTHONPATH": os.pathsep.join(filter(None, [str(ROOT), os.environ.get("PYTHONPATH")]))}
+
+
+def probe(frozen_path: Path, route: str = FIRST_ROUTE) -> dict:
+    out = subprocess.run([sys.executable, "-c", _PROBE, route], cwd=ROOT, env=_env(frozen_path),
+                         check=True, capture_output=True, text=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def import_breakdown(frozen_path: Path, top: int = 12) -> list[tuple[str, int]]:
+    """Direct imports of ``api.index`` by cumulative microseconds (``-X importtime``)."""
+    err = subprocess.run([sys.executable, "-X", "importtime", "-c", "import api.index"],
+                         cwd=ROOT, env=_env(frozen_path),
+                         check=True, capture_output=True, text=True).stderr
+    totals: dict[str, int] = {}
+    for line in err.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not cumulative.strip().isdigit():
+            continue  # header row
+        # Children are printed before their parent and indented two spaces per level.
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        if depth == 0:
+            if name.strip() == "api.index":
+                break
+            totals = {}
+        elif depth == 1:
+            name = name.strip()
+            # Our own modules individually, third-party packages as a whole.
+            key = name if name.startswith("flashcards.") else name.split(".")[0]
+            totals[key] = totals.get(key, 0) + int(cumulative)
+    return sorted(totals.items(), key=lambda kv: kv[1], reverse=True)[:top]
+
+
+def _median(rows: list[dict], key: str) -> float:
+    return statistics.median(r[key] for r in rows)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m flashcards.startup",
+                                     description="Measure cold-start cost in fresh interpreters.")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--route", default=FIRST_ROUTE)
+    parser.add_argument("--budget-ms", type=float, help="fail if importing api.index takes longer")
+    parser.add_argument("--app-budget-ms", type=float,
+                        help="fail if importing api.index, minus import fastapi, takes longer")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="flashcards-startup-") as tmp:
+        missing = Path(tmp) / "none.marshal"
+        frozen_path = Path(tmp) / "frozen.marshal"
+        subprocess.run([sys.executable, "-m", "flashcards.freeze", "--out", str(frozen_path)],
+                       cwd=ROOT, env=_env(missing), check=True, capture_output=True)
+
+        print("Imports of api.index (-X importtime, cumulative):")
+        for name, us in import_breakdown(missing):
+            print(f"  {name:<24} {us / 1000:8.1f} ms")
+
+        plain = [probe(missing, args.route) for _ in range(args.runs)]
+        frozen = [probe(frozen_path, args.route) for _ in range(args.runs)]
+
+    print(f"\nMedian of {args.runs} fresh interpreters:")
+    print(f"  {'':<26} {'from data.json':>15} {'frozen':>10}")
+    for key, label in (("fastapi", "import fastapi"), ("app", "import api.index (ours)"),
+                       ("import", "import total"), ("first_request", f"first GET {args.route}")):
+        print(f"  {label:<26} {_median(plain, key):12.1f} ms {_median(frozen, key):7.1f} ms")
+    print(f"  server-timing (data.json): {plain[-1]['server_timing']}")
+    print(f"  server-timing (frozen):    {frozen[-1]['server_timing']}")
+
+    status = 0
+    for key, label, budget in (("import", "import api.index", args.budget_ms),
+                               ("app", "import api.index (ours)", args.app_budget_ms)):
+        if budget is None:
+            continue
+        worst = max(_median(plain, key), _median(frozen, key))
+        if worst > budget:
+            print(f"OVER BUDGET: {label} {worst:.1f} ms > {budget:g} ms", file=sys.stderr)
+            status = 1
+        else:
+            print(f"Within budget: {label} {worst:.1f} ms <= {budget:g} ms")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
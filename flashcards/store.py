@@ -0,0 +1,204 @@
+# flashcards/store.py
+"""Process-wide, hot-reloading view of ``data.json``.
+
+The file is parsed once and kept as an immutable :class:`Snapshot`. Each call to
+:meth:`DeckStore.snapshot` costs a single ``os.stat``; only when the file's
+mtime or size changes is it re-read, and the new snapshot is swapped in with a
+single attribute assignment so concurrent readers always see a consistent
+deck set. A file that fails to parse keeps the last good snapshot live.
+
+Nothing is read until the first :meth:`DeckStore.snapshot` call. Versions in
+``trusted_versions`` (already validated by a build step, see
+:mod:`flashcards.freeze`) are hashed but not parsed until ``.data`` is used.
+When ``python -m flashcards.compile_decks`` has compiled the same file, the
+validated per-deck artifacts (:mod:`flashcards.compiled`) are loaded instead.
+
+With an :class:`~flashcards.edits.EditLog`, card edits are overlaid on the
+file snapshot deck by deck. :meth:`Snapshot.deck_version` changes only for an
+edited deck, so per-deck caches keyed by it survive edits to other decks;
+``version`` changes with every edit, for caches that span all decks.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass, field, replace
+from functools import cached_property
+from pathlib import Path
+from typing import Any, Sequence
+
+from flashcards.binary import BinaryDeck
+from flashcards.compiled import DEFAULT_COMPILED_DIR, CompiledDecks, load_manifest
+from flashcards.edits import EditLog, apply_edits
+from flashcards.metrics import RELOADS, span
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DATA_PATH = Path(
+    os.environ.get("FLASHCARDS_DATA")
+    or Path(__file__).resolve().parent.parent / "data.json"
+)
+
+
+def data_version(raw: bytes) -> str:
+    """Content version of a deck file; the same bytes always give the same version."""
+    return hashlib.sha256(raw).hexdigest()[:16]
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """One never-mutated generation of the deck file."""
+
+    version: str
+    mtime_ns: int = 0
+    size: int = -1
+    generation: int = 0
+    raw: bytes | None = field(default=None, repr=False, compare=False)
+    parsed: dict[str, Any] | None = field(default=None, repr=False, compare=False)
+    compiled: CompiledDecks | None = field(default=None, repr=False, compare=False)
+    # Edited decks: data key -> (edit version, cards); ``base`` is the file's own version.
+    overlay: dict[str, tuple[int, list[Any]]] = field(default_factory=dict, repr=False, compare=False)
+    base: str | None = None
+
+    @cached_property
+    def data(self) -> dict[str, Any]:
+        if self.parsed is not None:
+            return self.parsed
+        if self.compiled is not None:
+            with span("load"):
+                return self.compiled.load()
+        with span("parse"):
+            return json.loads(self.raw) if self.raw is not None else {}
+
+    def deck(self, key: str) -> Sequence[Any]:
+        edited = self.overlay.get(key)
+        if edited is not None:
+            return edited[1]
+        cards = self.data.get(key, [])
+        return cards if isinstance(cards, (list, BinaryDeck)) else []
+
+    def edit_version(self, key: str) -> int:
+        """Number of card edits applied to deck ``key`` (0 = as in the file)."""
+        edited = self.overlay.get(key)
+        return edited[0] if edited is not None else 0
+
+    def deck_version(self, key: str) -> str:
+        """Cache version for one deck: unchanged by edits to other decks."""
+        base = self.base or self.version
+        edited = self.overlay.get(key)
+        return base if edited is None else f"{base}.{edited[0]}"
+
+
+EMPTY_SNAPSHOT = Snapshot(version="empty", parsed={})
+
+
+@dataclass
+class DeckStore:
+    """Serve the current :class:`Snapshot`, reloading it when the file changes."""
+
+    path: Path = DEFAULT_DATA_PATH
+    _current: Snapshot = field(default=EMPTY_SNAPSHOT, init=False, repr=False)
+    _stat_key: tuple[int, int] | None = field(default=None, init=False, repr=False)
+    trusted_versions: set[str] = field(default_factory=set, repr=False)
+    compiled_dir: Path | None = DEFAULT_COMPILED_DIR
+    edits: EditLog | None = None
+    _base: Snapshot = field(default=EMPTY_SNAPSHOT, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.path = Path(self.path)
+
+    def snapshot(self) -> Snapshot:
+        try:
+            with span("stat"):
+                st = os.stat(self.path)
+        except OSError:
+            return self._current
+        if (st.st_mtime_ns, st.st_size) != self._stat_key:
+            self.reload()
+        elif self.edits is not None and self.edits.poll():
+            with self._lock:
+                self._current = self._overlay(self._base)
+        return self._current
+
+    def _overlay(self, base: Snapshot) -> Snapshot:
+        """``base`` with every logged edit applied; unchanged decks reuse their cards."""
+        if self.edits is None or not self.edits.decks():
+            return base
+        previous = self._current.overlay if self._current.base == base.version else {}
+        overlay = {}
+        for key in self.edits.decks():
+            version = self.edits.version(key)
+            kept = previous.get(key)
+            if kept is not None and kept[0] == version:
+                overlay[key] = kept
+            else:
+                with span("edits"):
+                    overlay[key] = (version, apply_edits(base.deck(key), self.edits.deck(key)))
+        return replace(base, version=f"{base.version}+{self.edits.seq}", base=base.version,
+                       raw=None, parsed=base.data, compiled=None, overlay=overlay)
+
+    def edit(self, key: str, op: str, cid: str, card: dict[str, Any] | None, actor: str) -> Snapshot:
+        """Log one card edit to deck ``key`` and return the snapshot that includes it."""
+        if self.edits is None:
+            raise RuntimeError("this store has no edit log")
+        self.snapshot()
+        self.edits.append(key, op, cid, card, actor)
+        with self._lock:
+            self._current = self._overlay(self._base)
+            return self._current
+
+    def reload(self) -> bool:
+        """Re-read the file; return ``True`` if a new snapshot was installed."""
+        with self._lock:
+            try:
+                st = os.stat(self.path)
+            except OSError as e:
+                logger.error("Cannot stat deck file %s: %s", self.path, e)
+                return False
+            stat_key = (st.st_mtime_ns, st.st_size)
+            if stat_key == self._stat_key:
+                # Another thread reloaded while we were waiting for the lock.
+                return False
+            try:
+                with span("read"):
+                    raw = self.path.read_bytes()
+                version = data_version(raw)
+                data = None
+                compiled = load_manifest(self.compiled_dir, version) if self.compiled_dir else None
+                if compiled is not None:
+                    # Artifacts can differ from the file (invalid cards dropped).
+                    version = compiled.version
+                elif version not in self.trusted_versions:
+                    with span("parse"):
+                        data = json.loads(raw)
+                    if not isinstance(data, dict):
+                        raise ValueError("top-level JSON value must be an object")
+            except (OSError, ValueError) as e:
+                # Remember the bad stat so we do not re-parse it on every request.
+                self._stat_key = stat_key
+                RELOADS.inc(result="error")
+                logger.error(
+                    "Keeping deck snapshot %s; failed to load %s: %s",
+                    self._current.version, self.path, e,
+                )
+                return False
+            self._stat_key = stat_key
+            self._base = Snapshot(
+                version=version,
+                mtime_ns=st.st_mtime_ns,
+                size=st.st_size,
+                generation=self._current.generation + 1,
+                raw=raw if data is None and compiled is None else None,
+                parsed=data,
+                compiled=compiled,
+            )
+            if self.edits is not None:
+                self.edits.poll()
+            self._current = self._overlay(self._base)
+            RELOADS.inc(result="ok")
+            logger.info("Loaded deck snapshot %s from %s", self._current.version, self.path)
+            return True
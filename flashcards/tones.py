@@ -0,0 +1,275 @@
+# flashcards/tones.py
+"""Numbered pinyin ("ni3 hao3") to tone-marked display pinyin ("nǐ hǎo"), and back.
+
+A port of the ``toToneMarks`` helper the game pages used to run in the
+browser, with the same a > e > ou > o > iu/ui placement rules. Every valid
+Mandarin syllable in tones 1-5 is converted once, on first use, into
+:func:`syllable_table`; anything outside the table (capitals, typos) falls
+back to the same algorithm behind a memo. :func:`to_numbered` goes the other
+way for imported vocabulary, splitting run-together syllables ("nǐhǎo").
+
+``python -m flashcards.tones --check`` compares :func:`to_tone_marks` with
+the original JavaScript on every input of ``golden/tone_marks.tsv`` (written
+by ``golden/tone_marks.js``) and checks that :func:`to_numbered` undoes it
+for every syllable and tone.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import re
+import sys
+import unicodedata
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable
+
+TONE_MAP = {
+    "a": "āáǎà", "e": "ēéěè", "i": "īíǐì",
+    "o": "ōóǒò", "u": "ūúǔù", "ü": "ǖǘǚǜ",
+}
+
+# Every standard Mandarin syllable, without tone.
+SYLLABLES = """
+a ai an ang ao
+ba bai ban bang bao bei ben beng bi bian biao bie bin bing bo bu
+ca cai can cang cao ce cen ceng ci cong cou cu cuan cui cun cuo
+cha chai chan chang chao che chen cheng chi chong chou chu chua chuai chuan chuang chui chun chuo
+da dai dan dang dao de dei den deng di dia dian diao die ding diu dong dou du duan dui dun duo
+e ei en eng er
+fa fan fang fei fen feng fo fou fu
+ga gai gan gang gao ge gei gen geng gong gou gu gua guai guan guang gui gun guo
+ha hai han hang hao he hei hen heng hong hou hu hua huai huan huang hui hun huo
+ji jia jian jiang jiao jie jin jing jiong jiu ju juan jue jun
+ka kai kan kang kao ke kei ken keng kong kou ku kua kuai kuan kuang kui kun kuo
+la lai lan lang lao le lei leng li lia lian liang liao lie lin ling liu lo long lou lu luan lun luo lü lüe
+ma mai man mang mao me mei men meng mi mian miao mie min ming miu mo mou mu
+na nai nan nang nao ne nei nen neng ni nian niang niao nie nin ning niu nong nou nu nuan nuo nü nüe
+o ou
+pa pai pan pang pao pei pen peng pi pian piao pie pin ping po pou pu
+qi qia qian qiang qiao qie qin qing qiong qiu qu quan que qun
+ran rang rao re ren reng ri rong rou ru rua ruan rui run ruo
+sa sai san sang sao se sen seng si song sou su suan sui sun suo
+sha shai shan shang shao she shei shen sheng shi shou shu shua shuai shuan shuang shui shun shuo
+ta tai tan tang tao te teng ti tian tiao tie ting tong tou tu tuan tui tun tuo
+wa wai wan wang wei wen weng wo wu
+xi xia xian xiang xiao xie xin xing xiong xiu xu xuan xue xun
+ya yan yang yao ye yi yin ying yo yong you yu yuan yue yun
+za zai zan zang zao ze zei zen zeng zi zong zou zu zuan zui zun zuo
+zha zhai zhan zhang zhao zhe zhei zhen zheng zhi zhong zhou zhu zhua zhuai zhuan zhuang zhui zhun zhuo
+""".split()
+
+_SYLLABLE_RE = re.compile(r"^([a-zāēīōūǖü]+)([1-5])$", re.IGNORECASE)
+_VOWEL_RE = re.compile(r"[aeiouü]", re.IGNORECASE)
+_U_COLON_RE = re.compile(r"u:", re.IGNORECASE)
+_V_RE = re.compile(r"v", re.IGNORECASE)
+_SPACE_RE = re.compile(r"\s+")
+
+
+def _normalize(syl: str) -> str:
+    # ü may be written "u:" or "v".
+    return _V_RE.sub("ü", _U_COLON_RE.sub("ü", syl))
+
+
+def _mark(syl: str) -> str:
+    """Tone-mark one normalized syllable (mirrors the JS ``convertSyllable``)."""
+    m = _SYLLABLE_RE.match(syl)
+    base, tone = (m.group(1), int(m.group(2))) if m else (syl, 0)
+    if tone in (0, 5) or not _VOWEL_RE.search(base):
+        return base
+    lower = base.lower()
+    if "a" in lower:
+        idx = lower.index("a")
+    elif "e" in lower:
+        idx = lower.index("e")
+    elif "ou" in lower:
+        idx = lower.index("o")
+    elif "o" in lower:
+        idx = lower.index("o")
+    elif "iu" in lower:
+        idx = lower.index("u")  # second in "iu"
+    elif "ui" in lower:
+        idx = lower.index("i")  # second in "ui"
+    else:
+        idx = max(lower.rfind("i"), lower.rfind("u"), lower.rfind("ü"))
+    if idx < 0:
+        return base
+    ch = base[idx]
+    marks = TONE_MAP.get(ch.lower())
+    rep = marks[tone - 1] if marks else ch
+    if ch == ch.upper():
+        rep = rep.upper()
+    return base[:idx] + rep + base[idx + 1:]
+
+
+@lru_cache(maxsize=1)
+def syllable_table() -> dict[str, str]:
+    return {f"{syl}{tone}": _mark(f"{syl}{tone}") for syl in SYLLABLES for tone in range(1, 6)}
+
+
+@lru_cache(maxsize=4096)
+def _mark_uncached(syl: str) -> str:
+    return _mark(syl)
+
+
+def convert_syllable(syl: str) -> str:
+    if not syl:
+        return syl
+    syl = _normalize(syl)
+    marked = syllable_table().get(syl)
+    return marked if marked is not None else _mark_uncached(syl)
+
+
+def to_tone_marks(pinyin: str | None) -> str:
+    """Convert space-separated numbered pinyin, e.g. ``"ni3 hao3"`` -> ``"nǐ hǎo"``."""
+    if not pinyin:
+        return ""
+    return " ".join(convert_syllable(s) for s in _SPACE_RE.split(pinyin))
+
+
+def to_tone_marks_many(items: Iterable[str | None]) -> list[str]:
+    return [to_tone_marks(p) for p in items]
+
+
+# Tone-marked vowel -> (plain vowel, tone).
+_MARKED = {m: (v, t) for v, marks in TONE_MAP.items() for t, m in enumerate(marks, 1)}
+_CHUNK_RE = re.compile(r"([a-zü]+)([1-5]?)")
+_SEPARATOR_RE = re.compile(r"[^a-zü0-9āáǎàēéěèīíǐìōóǒòūúǔùǖǘǚǜ]+")
+
+
+@lru_cache(maxsize=1)
+def _syllable_set() -> frozenset[str]:
+    return frozenset(SYLLABLES)
+
+
+def _segment(letters: str) -> list[tuple[int, int]] | None:
+    """Split toneless letters into syllables, longest first with backtracking."""
+    valid = _syllable_set()
+    if letters in valid:
+        return [(0, len(letters))]
+
+    @lru_cache(maxsize=None)
+    def rest(i: int) -> tuple[tuple[int, int], ...] | None:
+        if i == len(letters):
+            return ()
+        for j in range(min(len(letters), i + 6), i, -1):
+            if letters[i:j] in valid:
+                tail = rest(j)
+                if tail is not None:
+                    return ((i, j),) + tail
+        return None
+
+    found = rest(0)
+    return None if found is None else list(found)
+
+
+@lru_cache(maxsize=65536)
+def _numbered_token(token: str) -> tuple[str, ...]:
+    letters, marks = [], []
+    for ch in token:
+        vowel, tone = _MARKED.get(ch, (ch, 0))
+        letters.append(vowel)
+        marks.append(tone)
+    plain, out = "".join(letters), []
+    for m in _CHUNK_RE.finditer(plain):
+        base, digit = m.group(1), int(m.group(2) or 0)
+        start = m.start(1)
+        spans = _segment(base) or [(0, len(base))]
+        for k, (i, j) in enumerate(spans):
+            tone = max(marks[start + i:start + j])
+            if not tone and k == len(spans) - 1:
+                tone = digit
+            syllable = base[i:j].replace("ü", "v")
+            out.append(syllable if tone in (0, 5) else f"{syllable}{tone}")
+    return tuple(out)
+
+
+def to_numbered(pinyin: str | None) -> str:
+    """Any common spelling to the numbered form decks store: ``"Nǐhǎo"``, ``"ni3 hao3"`` ->
+    ``"ni3 hao3"``; ü is written ``v`` and the neutral tone has no digit."""
+    if not pinyin:
+        return ""
+    text = _normalize(unicodedata.normalize("NFC", pinyin).lower())
+    return " ".join(s for token in _SEPARATOR_RE.split(text) if token for s in _numbered_token(token))
+
+
+GOLDEN_PATH = Path(__file__).with_name("golden") / "tone_marks.tsv"
+DATA_PATH = Path(__file__).resolve().parent.parent / "data.json"
+
+
+def _data_pinyin(data: object) -> Iterable[str]:
+    if isinstance(data, dict):
+        for key, value in data.items():
+            if key in ("correct", "distractor", "pinyin") and isinstance(value, str):
+                yield value
+            else:
+                yield from _data_pinyin(value)
+    elif isinstance(data, list):
+        for item in data:
+            yield from _data_pinyin(item)
+
+
+def golden_inputs(data_path: Path = DATA_PATH, seed: int = 0, n_random: int = 5000) -> list[str]:
+    """Every syllable in tones 0-5 (plain, capitalized, with ``v`` / ``u:``), the pinyin
+    strings in ``data.json`` and ``n_random`` seeded random strings of pinyin-like characters."""
+    inputs: dict[str, None] = {}
+    for syl in SYLLABLES:
+        for tone in ("", *"012345"):
+            for spelling in (syl, syl.capitalize(), syl.upper(), syl.replace("ü", "v"), syl.replace("ü", "u:")):
+                inputs[spelling + tone] = None
+    try:
+        inputs.update(dict.fromkeys(_data_pinyin(json.loads(data_path.read_text(encoding="utf-8")))))
+    except FileNotFoundError:
+        pass
+    rng = random.Random(seed)
+    alphabet = "aeiouüvAEIOUV:nghzcsrlwy" + "0123456789" + "  "
+    for _ in range(n_random):
+        inputs["".join(rng.choice(alphabet) for _ in range(rng.randint(1, 12)))] = None
+    return [i for i in inputs if i and "\t" not in i and "\n" not in i]
+
+
+def check(path: Path = GOLDEN_PATH) -> list[str]:
+    """Differences from the golden JS output and round-trip failures; empty if none."""
+    failures = []
+    for line in path.read_text(encoding="utf-8").split("\n"):
+        if not line:
+            continue
+        given, _, expected = line.partition("\t")
+        got = to_tone_marks(given)
+        if got != expected:
+            failures.append(f"to_tone_marks({given!r}) = {got!r}, JS gives {expected!r}")
+    for syl in SYLLABLES:
+        for tone in range(1, 6):
+            numbered = syl.replace("ü", "v") + ("" if tone == 5 else str(tone))
+            for spelling in (f"{syl}{tone}", f"{syl.capitalize()}{tone}"):
+                back = to_numbered(to_tone_marks(spelling))
+                if back != numbered:
+                    failures.append(f"to_numbered(to_tone_marks({spelling!r})) = {back!r}, expected {numbered!r}")
+    return failures
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m flashcards.tones",
+                                     description="Check the tone-mark port against the original JS.")
+    parser.add_argument("--inputs", action="store_true", help="print the golden inputs, one per line")
+    parser.add_argument("--check", action="store_true", help="diff against golden/tone_marks.tsv")
+    args = parser.parse_args(argv)
+    if args.inputs:
+        sys.stdout.write("".join(f"{i}\n" for i in golden_inputs()))
+        return 0
+    if not args.check:
+        parser.error("give --inputs or --check")
+    failures = check()
+    for failure in failures[:50]:
+        print(failure, file=sys.stderr)
+    if failures:
+        print(f"{len(failures)} failures", file=sys.stderr)
+        return 1
+    total = sum(1 for line in GOLDEN_PATH.read_text(encoding="utf-8").split("\n") if line)
+    print(f"{total} golden inputs and {len(SYLLABLES) * 5 * 2} round trips match")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,241 @@
+// static/app.js
+// Game logic shared by every page. Served content-hashed and immutable; the
+// game pages only inline their first quiz batch and call startPinyinGame / startHskGame.
+// Pinyin arrives tone-marked from the server (flashcards/tones.py).
+
+// ---- Offline support ----
+// /sw.js keeps every page, deck payload and default quiz batch cached.
+if('serviceWorker' in navigator){
+  window.addEventListener('load', () => navigator.serviceWorker.register('/sw.js').catch(() => {}));
+}
+
+// ---- Quiz batches (/api/quiz) ----
+// Questions come in seeded order with options already shuffled; `answer` is
+// the index of the correct option. The next batch is fetched in the
+// background while the current one is played. ?seed=<n> replays another
+// session and ?card=<id> (a search result link) starts at that card; such a
+// session continues from the first card after the last, up to where it began.
+function loadQuiz(batch, onReady){
+  const params = new URLSearchParams(location.search);
+  const quiz = {
+    deck: batch.deck, seed: batch.seed, total: batch.total, start: batch.cursor, next: batch.next,
+    size: batch.questions.length || 20, items: batch.questions.slice(0), pending: null, wrapped: false,
+  };
+  const fetchBatch = query =>
+    fetch(`/api/quiz?deck=${encodeURIComponent(quiz.deck)}&seed=${quiz.seed}&n=${quiz.size}&${query}`)
+      .then(r => r.ok ? r.json() : Promise.reject(r.status));
+  // Cursor to fetch after a batch whose `next` is given: wraps to 0 once, stops at `start`.
+  const follow = next => {
+    if(next == null && !quiz.wrapped && quiz.start > 0){ quiz.wrapped = true; return 0; }
+    return quiz.wrapped && next != null && next >= quiz.start ? null : next;
+  };
+  // Position of item `i` in the seeded order, for the counter.
+  quiz.position = i => (quiz.start + i) % Math.max(quiz.total, 1);
+
+  quiz.prefetch = function(){
+    if(quiz.next == null || quiz.pending) return;
+    quiz.pending = fetchBatch(`cursor=${quiz.next}`)
+      .then(b => {
+        quiz.items.push(...(quiz.wrapped ? b.questions.slice(0, Math.max(quiz.start - b.cursor, 0)) : b.questions));
+        quiz.next = follow(b.next);
+      })
+      .catch(() => {})
+      .finally(() => { quiz.pending = null; });
+  };
+  // Show the question after `i`, waiting for a batch in flight rather than wrapping early.
+  quiz.step = function(i, show){
+    const n = i + 1;
+    if(quiz.items.length - n <= quiz.size) quiz.prefetch();
+    if(n < quiz.items.length) return show(n);
+    if(quiz.pending) return quiz.pending.then(() => show(n < quiz.items.length ? n : 0));
+    show(0);
+  };
+
+  const seed = params.get('seed');
+  const card = params.get('card');
+  if(seed !== null && /^-?\d+$/.test(seed)) quiz.seed = Number(seed);
+  const k = card && quiz.seed === batch.seed ? quiz.items.findIndex(q => q.id === card) : -1;
+  if(quiz.seed === batch.seed && (!card || k >= 0)){
+    quiz.next = follow(quiz.next);
+    onReady(quiz, Math.max(k, 0));
+    quiz.prefetch();
+    return;
+  }
+  fetchBatch(card ? `card=${encodeURIComponent(card)}` : 'cursor=0')
+    .then(b => { quiz.items = b.questions.slice(0); quiz.start = b.cursor; quiz.total = b.total; quiz.next = follow(b.next); })
+    .catch(() => { quiz.seed = batch.seed; })  // keep the embedded batch
+    .finally(() => { onReady(quiz, 0); quiz.prefetch(); });
+}
+
+// ---- Answer events (/api/events) ----
+// Answers are buffered and posted in batches with sendBeacon, which also
+// delivers the last batch when the tab is hidden or closed.
+const answerLog = [];
+function logAnswer(deck, card, correct, chosen){
+  answerLog.push({deck, card, correct, chosen});
+  if(answerLog.length >= 20) flushAnswers();
+}
+function flushAnswers(){
+  if(!answerLog.length || !navigator.sendBeacon) return;
+  const body = new Blob([JSON.stringify({events: answerLog.splice(0)})], {type: 'application/json'});
+  navigator.sendBeacon('/api/events', body);
+}
+document.addEventListener('visibilitychange', () => { if(document.visibilityState === 'hidden') flushAnswers(); });
+window.addEventListener('pagehide', flushAnswers);
+
+// ---- Pinyin listening game ----
+function startPinyinGame(DATA){
+  const synth = window.speechSynthesis;
+
+  let quiz = null;
+  let i = 0;
+  let current = null; // {id, text, en, options, answer}
+
+  const playBtn = document.getElementById('play');
+  const repeatBtn = document.getElementById('repeat');
+  const nextBtn = document.getElementById('next');
+  const choicesDiv = document.getElementById('choices');
+  const counter = document.getElementById('counter');
+  const feedback = document.getElementById('feedback');
+  const promptNode = document.getElementById('prompt');
+  const meaningNode = document.getElementById('meaning');
+
+  function speak(text){
+    if(!text) return;
+    if(synth.speaking) synth.cancel();
+    const u = new SpeechSynthesisUtterance(text);
+    u.lang = 'zh-CN';
+    u.rate = 0.95;
+    synth.speak(u);
+  }
+  function setCounter(){
+    counter.textContent = `${quiz.items.length ? quiz.position(i)+1 : 0} / ${quiz.total}`;
+  }
+  function render(){
+    if(!quiz.items.length){
+      choicesDiv.innerHTML = '<p class="text-gray-500 col-span-2">No data found. Provide pinyinPairs in data.json.</p>';
+      counter.textContent = '0 / 0';
+      promptNode.textContent = '';
+      meaningNode.textContent = '';
+      feedback.textContent = '';
+      return;
+    }
+    feedback.textContent = '';
+    feedback.className = 'h-6 text-center font-medium mt-4';
+
+    const q = quiz.items[i];
+    current = q;
+
+    promptNode.textContent = q.text || '';
+    meaningNode.textContent = q.en || '';
+
+    choicesDiv.innerHTML = '';
+    q.options.forEach(opt => {
+      const b = document.createElement('button');
+      b.textContent = opt;
+      b.dataset.val = opt;
+      b.className = 'w-full px-4 py-3 border border-gray-300 rounded-lg text-lg font-semibold bg-white text-gray-800 hover:bg-gray-50 btn';
+      b.onclick = () => check(b.dataset.val);
+      choicesDiv.appendChild(b);
+    });
+
+    setTimeout(()=> speak(q.text || ''), 150);
+    setCounter();
+  }
+  function check(selectedVal){
+    const buttons = choicesDiv.querySelectorAll('button');
+    buttons.forEach(btn => {
+      btn.disabled = true;
+      const isCorrect = btn.dataset.val === current.options[current.answer];
+      if(isCorrect) btn.classList.add('correct');
+      else if(btn.dataset.val === selectedVal) btn.classList.add('incorrect');
+    });
+    logAnswer(quiz.deck, current.id, selectedVal === current.options[current.answer], selectedVal);
+    if(selectedVal === current.options[current.answer]){
+      feedback.textContent = 'Correct';
+      feedback.classList.add('text-green-600');
+    } else {
+      feedback.textContent = 'Incorrect';
+      feedback.classList.add('text-red-600');
+    }
+  }
+
+  playBtn.addEventListener('click', () => speak(current?.text || ''));
+  repeatBtn.addEventListener('click', () => speak(current?.text || ''));
+  nextBtn.addEventListener('click', () => { if(quiz) quiz.step(i, n => { i = n; render(); }); });
+
+  loadQuiz(DATA, (q, start) => { quiz = q; i = start; render(); });
+}
+
+// ---- HSK flash cards game ----
+function startHskGame(DATA){
+  let quiz = null;
+  let i = 0;
+  let current = null; // {id, english, options, answer}
+
+  const choicesDiv = document.getElementById('choices');
+  const counter = document.getElementById('counter');
+  const feedback = document.getElementById('feedback');
+  const englishWordNode = document.getElementById('englishWord');
+  const nextBtn = document.getElementById('next');
+
+  function setCounter(){
+    counter.textContent = `${quiz.items.length ? quiz.position(i)+1 : 0} / ${quiz.total}`;
+  }
+
+  function render(){
+    if(!quiz.items.length){
+      choicesDiv.innerHTML = '<p class="text-gray-500 col-span-2">No data found. Provide hskFlashcards in data.json.</p>';
+      counter.textContent = '0 / 0';
+      englishWordNode.textContent = '';
+      feedback.textContent = '';
+      return;
+    }
+    feedback.textContent = '';
+    feedback.className = 'h-6 text-center font-medium mt-4';
+
+    const q = quiz.items[i];
+    current = q;
+
+    englishWordNode.textContent = q.english || '';
+
+    choicesDiv.innerHTML = '';
+    q.options.forEach(opt => {
+      const button = document.createElement('button');
+      button.innerHTML = `
+        <div class="text-2xl md:text-3xl font-bold mb-2">${opt.chinese}</div>
+        <div class="text-sm text-gray-600">${opt.pinyin}</div>
+      `;
+      button.dataset.chinese = opt.chinese;
+      button.dataset.pinyin = opt.pinyin;
+      button.className = 'w-full px-6 py-4 border border-gray-300 rounded-lg bg-white text-gray-800 hover:bg-gray-50 btn text-center';
+      button.onclick = () => check(opt.chinese);
+      choicesDiv.appendChild(button);
+    });
+
+    setCounter();
+  }
+
+  function check(selectedChinese){
+    const correct = current.options[current.answer];
+    const buttons = choicesDiv.querySelectorAll('button');
+    buttons.forEach(btn => {
+      btn.disabled = true;
+      const isCorrect = btn.dataset.chinese === correct.chinese;
+      if(isCorrect) btn.classList.add('correct');
+      else if(btn.dataset.chinese === selectedChinese) btn.classList.add('incorrect');
+    });
+    logAnswer(quiz.deck, current.id, selectedChinese === correct.chinese, selectedChinese);
+    if(selectedChinese === correct.chinese){
+      feedback.textContent = 'Correct! 🎉';
+      feedback.classList.add('text-green-600');
+    } else {
+      feedback.textContent = 'Incorrect. The correct answer is ' + correct.chinese + ' (' + correct.pinyin + ')';
+      feedback.classList.add('text-red-600');
+    }
+  }
+
+  nextBtn.addEventListener('click', () => { if(quiz) quiz.step(i, n => { i = n; render(); }); });
+
+  loadQuiz(DATA, (q, start) => { quiz = q; i = start; render(); });
+}
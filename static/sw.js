@@ -0,0 +1,111 @@
+// static/sw.js
+// Offline-first service worker, served as /sw.js. Every URL in
+// /precache-manifest.json (flashcards/precache.py) is answered from the
+// cache. The manifest is re-checked in the background and only entries
+// whose hash changed are downloaded again; removed entries are dropped.
+// Tailwind and Google Fonts are kept in a runtime cache and refreshed
+// after being served (stale-while-revalidate).
+
+const CACHE = 'flashcards-precache-v1';
+const RUNTIME = 'flashcards-runtime-v1';
+const MANIFEST_URL = '/precache-manifest.json';
+const STATE_KEY = '/__precache__/state';
+const RUNTIME_HOSTS = ['cdn.tailwindcss.com', 'fonts.googleapis.com', 'fonts.gstatic.com'];
+const CHECK_EVERY_MS = 5 * 60 * 1000;
+
+let lastCheck = 0;
+let updating = null;
+
+// {version, entries: {url: hash}} of what is actually in the cache.
+async function cachedState(cache){
+  const r = await cache.match(STATE_KEY);
+  return r ? r.json() : {version: null, entries: {}};
+}
+
+async function sync(){
+  lastCheck = Date.now();
+  const res = await fetch(MANIFEST_URL, {cache: 'no-cache'});
+  if(!res.ok) return;
+  const manifest = await res.json();
+  const cache = await caches.open(CACHE);
+  const state = await cachedState(cache);
+  if(state.version === manifest.version) return;
+
+  const entries = {};
+  let complete = true;
+  await Promise.all(Object.entries(manifest.entries).map(async ([url, hash]) => {
+    if(state.entries[url] === hash && await cache.match(url)){
+      entries[url] = hash;
+      return;
+    }
+    try {
+      const r = await fetch(url, {cache: 'no-cache'});
+      if(!r.ok) throw r.status;
+      await cache.put(url, r);
+      entries[url] = hash;
+    } catch(e){
+      complete = false;  // retried on the next check
+    }
+  }));
+  await Promise.all(Object.keys(state.entries)
+    .filter(url => !(url in manifest.entries))
+    .map(url => cache.delete(url)));
+
+  const runtime = await caches.open(RUNTIME);
+  await Promise.all(manifest.external.map(async url => {
+    if(await runtime.match(url)) return;
+    try { await runtime.put(url, await fetch(url, {mode: 'no-cors'})); } catch(e){}
+  }));
+
+  const saved = {version: complete ? manifest.version : null, entries};
+  await cache.put(STATE_KEY, new Response(JSON.stringify(saved), {headers: {'content-type': 'application/json'}}));
+}
+
+function checkForUpdates(){
+  if(!updating && Date.now() - lastCheck > CHECK_EVERY_MS){
+    updating = sync().catch(() => {}).finally(() => { updating = null; });
+  }
+  return updating || Promise.resolve();
+}
+
+self.addEventListener('install', event => {
+  self.skipWaiting();
+  event.waitUntil(sync().catch(() => {}));
+});
+
+self.addEventListener('activate', event => {
+  event.waitUntil(caches.keys()
+    .then(keys => Promise.all(keys.filter(k => k !== CACHE && k !== RUNTIME).map(k => caches.delete(k))))
+    .then(() => self.clients.claim()));
+});
+
+self.addEventListener('fetch', event => {
+  const req = event.request;
+  if(req.method !== 'GET') return;
+  const url = new URL(req.url);
+
+  if(url.origin === self.location.origin){
+    if(url.pathname === MANIFEST_URL || url.pathname === '/sw.js') return;
+    // Pages ignore their query (?card=, ?seed=); everything else matches exactly.
+    const key = req.mode === 'navigate' ? url.pathname : url.pathname + url.search;
+    event.respondWith(caches.open(CACHE).then(async cache => {
+      const hit = await cache.match(key, {ignoreVary: true});
+      if(!hit) return fetch(req);
+      event.waitUntil(checkForUpdates());
+      return hit;
+    }));
+    return;
+  }
+
+  if(RUNTIME_HOSTS.includes(url.host)){
+    event.respondWith(caches.open(RUNTIME).then(async cache => {
+      const hit = await cache.match(req);
+      const refresh = fetch(req).then(r => { cache.put(req, r.clone()); return r; });
+      if(hit){
+        event.waitUntil(refresh.catch(() => {}));
+        return hit;
+      }
+      return refresh;
+    }));
+  }
+});